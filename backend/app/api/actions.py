@@ -1,10 +1,12 @@
 """
 Remediation Actions API Endpoints
 """
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
 from typing import List, Optional
+from uuid import UUID
 from app.models.remediation_action import RemediationAction, ActionType
-from app.storage import get_actions_db
+from app.storage import get_action_by_id, get_request_db, query_actions
 
 router = APIRouter()
 
@@ -13,31 +15,20 @@ router = APIRouter()
 async def list_actions(
     action_type: Optional[ActionType] = None,
     executed: Optional[bool] = None,
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    db: Optional[Session] = Depends(get_request_db)
 ):
     """List all remediation actions"""
-    actions_db = get_actions_db()
-    filtered = actions_db
-    
-    if action_type:
-        filtered = [a for a in filtered if a.action_type == action_type]
-    if executed is not None:
-        filtered = [a for a in filtered if a.executed == executed]
-    
-    return filtered[:limit]
+    return query_actions(action_type=action_type, executed=executed, limit=limit, db=db)
 
 
 @router.get("/actions/{action_id}", response_model=RemediationAction)
-async def get_action(action_id: str):
+async def get_action(action_id: str, db: Optional[Session] = Depends(get_request_db)):
     """Get action details by ID"""
-    from uuid import UUID
-    from fastapi import HTTPException
-    
     action_id_uuid = UUID(action_id)
     
-    actions_db = get_actions_db()
-    for action in actions_db:
-        if action.id == action_id_uuid:
-            return action
+    action = get_action_by_id(action_id_uuid, db=db)
+    if action is None:
+        raise HTTPException(status_code=404, detail="Action not found")
     
-    raise HTTPException(status_code=404, detail="Action not found")
+    return action
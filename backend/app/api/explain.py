@@ -4,6 +4,7 @@ Threat Explanation API Endpoints
 from fastapi import APIRouter, HTTPException
 from uuid import UUID
 from app.models.threat_event import ThreatEvent
+from app.storage import get_threat_by_id
 
 router = APIRouter()
 
@@ -14,17 +15,10 @@ async def explain_threat(threat_id: str):
     Get human-readable explanation of a threat
     Uses LLM to generate FRIDAY-style explanations
     """
-    from app.storage import get_threats_db
-    
     threat_id_uuid = UUID(threat_id)
     
     # Find threat
-    threats_db = get_threats_db()
-    threat = None
-    for t in threats_db:
-        if t.id == threat_id_uuid:
-            threat = t
-            break
+    threat = get_threat_by_id(threat_id_uuid)
     
     if not threat:
         raise HTTPException(status_code=404, detail="Threat not found")
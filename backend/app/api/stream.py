@@ -3,33 +3,81 @@ WebSocket Streaming API
 Real-time threat event streaming
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List
+from typing import Dict, Set
+import asyncio
 import json
+import orjson
 
 router = APIRouter()
 
+# Per-client outbound queue size; oldest messages are dropped when a client falls behind
+QUEUE_MAXSIZE = 1000
+# Yield to the event loop after this many clients during a broadcast fan-out
+BROADCAST_BATCH = 50
+
+
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Set[WebSocket] = set()
+        self._queues: Dict[WebSocket, asyncio.Queue] = {}
+        self._senders: Dict[WebSocket, asyncio.Task] = {}
     
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self._queues[websocket] = asyncio.Queue(maxsize=QUEUE_MAXSIZE)
+        self._senders[websocket] = asyncio.create_task(self._sender(websocket))
+        self.active_connections.add(websocket)
     
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        self.active_connections.discard(websocket)
+        self._queues.pop(websocket, None)
+        sender = self._senders.pop(websocket, None)
+        if sender and sender is not asyncio.current_task():
+            sender.cancel()
+    
+    async def _sender(self, websocket: WebSocket):
+        """Drain a client's queue so slow sockets never block broadcast"""
+        queue = self._queues[websocket]
+        while True:
+            payload = await queue.get()
+            try:
+                await websocket.send_bytes(payload)
+            except Exception:
+                # Prune dead sockets so broadcast stops queueing for them
+                self.disconnect(websocket)
+                return
     
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
+        # Nobody is listening: skip serializing the message
+        if not self._queues:
+            return
+        payload = orjson.dumps(message)
+        queues = list(self._queues.values())
+        for i, queue in enumerate(queues, 1):
             try:
-                await connection.send_json(message)
-            except:
-                pass  # Skip failed connections
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                queue.get_nowait()
+                queue.put_nowait(payload)
+            if i % BROADCAST_BATCH == 0:
+                await asyncio.sleep(0)
 
 manager = ConnectionManager()
 
 
+def _batched_pings(data: str):
+    """Return the ping list from a {"pings": [...]} message, or None for a plain ping"""
+    if not data.startswith("{"):
+        return None
+    try:
+        message = orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return None
+    pings = message.get("pings") if isinstance(message, dict) else None
+    return pings if isinstance(pings, list) else None
+
+
 @router.websocket("/stream")
 async def websocket_stream(websocket: WebSocket):
     """WebSocket endpoint for real-time threat streaming"""
@@ -38,6 +86,11 @@ async def websocket_stream(websocket: WebSocket):
         while True:
             # Keep connection alive and wait for client messages
             data = await websocket.receive_text()
+            pings = _batched_pings(data)
+            if pings is not None:
+                # Answer a batch of pings with a single frame
+                await websocket.send_text(orjson.dumps({"type": "pong", "pongs": pings}).decode("utf-8"))
+                continue
             # Echo back or handle client commands
             await websocket.send_json({"type": "ping", "message": "connected"})
     except WebSocketDisconnect:
@@ -1,11 +1,25 @@
 """
 Threats API Endpoints
 """
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import update
+from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
+from uuid import UUID
 from app.models.threat_event import ThreatEvent, ThreatSeverity, ThreatType
-from app.storage import get_threats_db
+from app.storage import (
+    USE_DATABASE,
+    get_request_db,
+    get_threat_by_id,
+    invalidate_threats_cache,
+    mark_threat_resolved,
+    query_threats,
+    resolve_pending_threat,
+    threats_to_json,
+)
+from app.database.connection import AsyncSessionLocal
+from app.database.models import ThreatEventDB
 
 router = APIRouter()
 
@@ -15,70 +29,58 @@ async def list_threats(
     severity: Optional[ThreatSeverity] = None,
     threat_type: Optional[ThreatType] = None,
     resolved: Optional[bool] = None,
-    limit: int = Query(100, ge=1, le=1000)
+    limit: int = Query(100, ge=1, le=1000),
+    db: Optional[Session] = Depends(get_request_db)
 ):
     """List all threats with optional filtering"""
-    threats_db = get_threats_db()
-    filtered = threats_db
-    
-    if severity:
-        filtered = [t for t in filtered if t.severity == severity]
-    if threat_type:
-        filtered = [t for t in filtered if t.threat_type == threat_type]
-    if resolved is not None:
-        filtered = [t for t in filtered if t.resolved == resolved]
-    
-    return filtered[:limit]
+    threats = query_threats(
+        severity=severity,
+        threat_type=threat_type,
+        resolved=resolved,
+        limit=limit,
+        db=db
+    )
+    # Return pre-encoded JSON; response_model is kept for the OpenAPI schema
+    return Response(content=threats_to_json(threats), media_type="application/json")
 
 
 @router.get("/threats/{threat_id}", response_model=ThreatEvent)
-async def get_threat(threat_id: str):
+async def get_threat(threat_id: str, db: Optional[Session] = Depends(get_request_db)):
     """Get threat details by ID"""
-    from uuid import UUID
     threat_id_uuid = UUID(threat_id)
     
-    threats_db = get_threats_db()
-    for threat in threats_db:
-        if threat.id == threat_id_uuid:
-            return threat
+    threat = get_threat_by_id(threat_id_uuid, db=db)
+    if threat is None:
+        raise HTTPException(status_code=404, detail="Threat not found")
     
-    from fastapi import HTTPException
-    raise HTTPException(status_code=404, detail="Threat not found")
+    return threat
 
 
 @router.post("/threats/{threat_id}/resolve")
 async def resolve_threat(threat_id: str):
     """Mark a threat as resolved"""
-    from uuid import UUID
-    from fastapi import HTTPException
-    
     threat_id_uuid = UUID(threat_id)
     
     # Update in database if using database
-    from app.storage import USE_DATABASE
     if USE_DATABASE:
-        from app.database.connection import SessionLocal
-        from app.database.models import ThreatEventDB
-        db = SessionLocal()
-        try:
-            threat_db = db.query(ThreatEventDB).filter(ThreatEventDB.id == threat_id_uuid).first()
-            if threat_db:
-                threat_db.resolved = True
-                threat_db.resolved_at = datetime.utcnow()
-                db.commit()
-                return {"status": "resolved", "threat_id": str(threat_db.id)}
-        finally:
-            db.close()
+        # A threat still queued for the batch writer is inserted already resolved
+        if resolve_pending_threat(threat_id_uuid) is not None:
+            return {"status": "resolved", "threat_id": str(threat_id_uuid)}
+        async with AsyncSessionLocal() as db:
+            # Single UPDATE statement; no row is loaded into the session
+            result = await db.execute(
+                update(ThreatEventDB)
+                .where(ThreatEventDB.id == threat_id_uuid)
+                .values(resolved=True, resolved_at=datetime.utcnow())
+            )
+            await db.commit()
+            if result.rowcount:
+                invalidate_threats_cache()
+                return {"status": "resolved", "threat_id": str(threat_id_uuid)}
     
-    # Fallback to in-memory
-    threats_db = get_threats_db()
-    for threat in threats_db:
-        if threat.id == threat_id_uuid:
-            threat.resolved = True
-            threat.resolved_at = datetime.utcnow()
-            # Update in storage
-            from app.storage import add_threat
-            add_threat(threat)
-            return {"status": "resolved", "threat_id": str(threat.id)}
+    # Fallback to in-memory (the stored object is updated in place)
+    threat = mark_threat_resolved(threat_id_uuid)
+    if threat is None:
+        raise HTTPException(status_code=404, detail="Threat not found")
     
-    raise HTTPException(status_code=404, detail="Threat not found")
+    return {"status": "resolved", "threat_id": str(threat.id)}
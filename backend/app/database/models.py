@@ -1,7 +1,7 @@
 """
 SQLAlchemy database models
 """
-from sqlalchemy import Column, String, Float, Boolean, DateTime, Text, JSON, Enum as SQLEnum
+from sqlalchemy import Column, String, Float, Boolean, DateTime, Text, JSON, Index, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -44,6 +44,13 @@ class ThreatEventDB(Base):
     resolved = Column(Boolean, default=False, nullable=False)
     resolved_at = Column(DateTime, nullable=True)
     
+    # Indexes matching the list_threats filters (newest-first by resolved status)
+    __table_args__ = (
+        Index("ix_threats_resolved_time", "resolved", detected_at.desc()),
+        Index("ix_threats_severity", "severity"),
+        Index("ix_threats_type", "threat_type"),
+    )
+    
     def to_pydantic(self):
         """Convert to Pydantic model"""
         from app.models.threat_event import ThreatEvent
@@ -4,7 +4,8 @@ Main application entry point
 """
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 import uvicorn
 import os
 
@@ -14,6 +15,14 @@ from app.services.rl_service import RLService
 from app.services.ml_service import MLService
 from app.services.llm_service import LLMService
 from app.services.remediation_service import RemediationService
+from app.models.threat_event import ThreatEvent
+from app.storage import (
+    invalidate_threat_json,
+    start_action_writer,
+    start_threat_writer,
+    stop_action_writer,
+    stop_threat_writer,
+)
 from app.utils.logging import setup_logging, get_logger
 
 # Setup logging
@@ -27,18 +36,23 @@ logger = get_logger(__name__)
 app = FastAPI(
     title="SentinelForge",
     description="Autonomous Cybersecurity Platform - FRIDAY-inspired threat detection and response",
-    version="0.1.0"
+    version="0.1.0",
+    default_response_class=ORJSONResponse
 )
 
-# CORS middleware for Streamlit/React frontends
+# CORS middleware for Streamlit/React frontends (comma-separated CORS_ORIGINS)
+cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:8501,http://localhost:3000")
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Configure appropriately for production
+    allow_origins=[origin.strip() for origin in cors_origins.split(",") if origin.strip()],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Compress larger responses such as threat listings
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Initialize services
 falco_processor = FalcoProcessor()
 ml_service = MLService()
@@ -60,6 +74,15 @@ async def startup_event():
     await ml_service.initialize()
     await rl_service.initialize()
     await llm_service.initialize()
+    start_threat_writer()
+    start_action_writer()
+    remediation_service.start_workers()
+    
+    # Warm the detection path so the first Falco event doesn't pay first-call costs
+    warmup_threat = ThreatEvent(description="warmup")
+    await ml_service.detect_anomaly(warmup_threat)
+    await rl_service.decide_action(warmup_threat)
+    
     logger.info("All services initialized")
 
 
@@ -67,6 +90,26 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("SentinelForge backend shutting down...")
+    await remediation_service.stop_workers()
+    await stop_action_writer()
+    await stop_threat_writer()
+    await llm_service.close()
+
+
+async def route_action(action, threat: ThreatEvent) -> None:
+    """Queue a confident low-risk action for the remediation workers, or flag it for human review"""
+    if action.confidence > 0.85 and action.risk_level == "low":
+        await remediation_service.submit_action(action, threat)
+    elif action.risk_level in ["medium", "high"]:
+        # Log for human review
+        logger.warning(
+            "Action requires confirmation",
+            extra={
+                "action_type": action.action_type,
+                "confidence": action.confidence,
+                "threat_id": str(threat.id)
+            }
+        )
 
 
 @app.post("/api/v1/falco/webhook")
@@ -84,42 +127,30 @@ async def falco_webhook(request: Request):
             # Run ML anomaly detection
             ml_score = await ml_service.detect_anomaly(threat)
             threat.ml_score = ml_score
+            invalidate_threat_json(threat.id)
             
             # Get RL agent decision
             action = await rl_service.decide_action(threat)
-            
-            # Execute remediation if confidence is high enough
-            if action.confidence > 0.85 and action.risk_level == "low":
-                await remediation_service.execute_action(action, threat)
-            elif action.risk_level in ["medium", "high"]:
-                # Log for human review
-                logger.warning(
-                    "Action requires confirmation",
-                    extra={
-                        "action_type": action.action_type.value,
-                        "confidence": action.confidence,
-                        "threat_id": str(threat.id)
-                    }
-                )
+            await route_action(action, threat)
             
             logger.info(
                 "Threat processed",
                 extra={
                     "threat_id": str(threat.id),
-                    "severity": threat.severity.value,
-                    "threat_type": threat.threat_type.value,
-                    "action": action.action_type.value if action else "monitor"
+                    "severity": threat.severity,
+                    "threat_type": threat.threat_type,
+                    "action": action.action_type if action else "monitor"
                 }
             )
             
-            return JSONResponse({
+            return ORJSONResponse({
                 "status": "processed",
                 "threat_id": str(threat.id),
                 "severity": threat.severity,
                 "action": action.action_type if action else "monitor"
             })
         
-        return JSONResponse({"status": "processed", "threat": None})
+        return ORJSONResponse({"status": "processed", "threat": None})
     
     except Exception as e:
         logger.error(
@@ -127,7 +158,47 @@ async def falco_webhook(request: Request):
             extra={"error": str(e)},
             exc_info=True
         )
-        return JSONResponse({"error": str(e)}, status_code=500)
+        return ORJSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.post("/api/v1/falco/webhook/batch")
+async def falco_webhook_batch(request: Request):
+    """
+    Receive a list of Falco events in one request
+    Threats are scored with one ML call, stored in bulk and decided with one RL batch
+    """
+    try:
+        events = await request.json()
+        if not isinstance(events, list):
+            return ORJSONResponse({"error": "Expected a JSON array of Falco events"}, status_code=400)
+        
+        threats = [threat for threat in falco_processor.build_threats(events) if threat]
+        if threats:
+            # Score before storing so the persisted rows carry ml_score
+            ml_scores = await ml_service.detect_anomaly_batch(threats)
+            for threat, ml_score in zip(threats, ml_scores.tolist()):
+                threat.ml_score = ml_score
+            await falco_processor.store_threats(threats)
+            
+            actions = await rl_service.decide_actions(threats)
+            for action, threat in zip(actions, threats):
+                await route_action(action, threat)
+        
+        logger.info("Falco batch processed", extra={"events": len(events), "threats": len(threats)})
+        
+        return ORJSONResponse({
+            "status": "processed",
+            "processed": len(events),
+            "threat_ids": [str(threat.id) for threat in threats]
+        })
+    
+    except Exception as e:
+        logger.error(
+            "Error processing Falco batch",
+            extra={"error": str(e)},
+            exc_info=True
+        )
+        return ORJSONResponse({"error": str(e)}, status_code=500)
 
 
 @app.post("/api/v1/simulate")
@@ -139,9 +210,9 @@ async def simulate(request: Request):
     try:
         event = await request.json()
         threat = await falco_processor.process_event(event)
-        return JSONResponse({"status": "processed", "threat_id": str(threat.id) if threat else None})
+        return ORJSONResponse({"status": "processed", "threat_id": str(threat.id) if threat else None})
     except Exception as e:
-        return JSONResponse({"error": str(e)}, status_code=500)
+        return ORJSONResponse({"error": str(e)}, status_code=500)
 
 
 @app.get("/")
@@ -169,4 +240,12 @@ async def health():
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop/httptools come with uvicorn[standard]; each worker keeps its own in-memory store
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WORKERS", "1"))
+    )
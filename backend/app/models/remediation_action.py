@@ -52,9 +52,3 @@ class RemediationAction(BaseModel):
     requires_confirmation: bool = False
     confirmed_by: Optional[str] = None
     confirmed_at: Optional[datetime] = None
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat(),
-            UUID: lambda v: str(v)
-        }
@@ -58,9 +58,3 @@ class ThreatEvent(BaseModel):
     # Status
     resolved: bool = False
     resolved_at: Optional[datetime] = None
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat(),
-            UUID: lambda v: str(v)
-        }
@@ -2,12 +2,18 @@
 Falco Event Processor
 Processes events from Falco and converts them to ThreatEvent objects
 """
-from typing import Optional, Dict, Any
+import re
+from typing import Optional, Dict, Any, List
 from app.models.threat_event import ThreatEvent, ThreatSeverity, ThreatType
 from app.storage import threats_db
 from app.api.stream import manager
 from app.utils.logging import get_logger
 
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
 logger = get_logger(__name__)
 
 
@@ -37,6 +43,35 @@ class FalcoProcessor:
         ThreatType.CONTAINER_ESCAPE: ["container escape", "host mount", "privileged", "escape attempt"]
     }
     
+    # One compiled alternation per threat type, checked in THREAT_KEYWORDS order
+    THREAT_PATTERNS = [
+        (threat_type, re.compile("|".join(re.escape(keyword) for keyword in keywords)))
+        for threat_type, keywords in THREAT_KEYWORDS.items()
+    ]
+    
+    # THREAT_KEYWORDS order, indexed by the hyperscan expression ids below
+    THREAT_TYPE_ORDER = list(THREAT_KEYWORDS)
+    
+    def __init__(self):
+        # With python-hyperscan installed, all keywords are matched in a single scan
+        self._keyword_db = self._compile_keyword_db() if hyperscan is not None else None
+    
+    def _compile_keyword_db(self):
+        """Compile every keyword into one hyperscan database; expression id = threat type priority"""
+        expressions, ids = [], []
+        for priority, keywords in enumerate(self.THREAT_KEYWORDS.values()):
+            for keyword in keywords:
+                expressions.append(re.escape(keyword).encode())
+                ids.append(priority)
+        db = hyperscan.Database()
+        db.compile(
+            expressions=expressions,
+            ids=ids,
+            elements=len(expressions),
+            flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(expressions)
+        )
+        return db
+    
     async def process_event(self, event: Dict[str, Any]) -> Optional[ThreatEvent]:
         """
         Process a Falco event and create a ThreatEvent
@@ -56,65 +91,13 @@ class FalcoProcessor:
         }
         """
         try:
-            # Extract Falco event data
-            output = event.get("output", "")
-            priority = event.get("priority", "Informational")
-            rule = event.get("rule", "Unknown")
-            output_fields = event.get("output_fields", {})
-            
-            # Determine severity
-            severity = self.PRIORITY_TO_SEVERITY.get(priority, ThreatSeverity.LOW)
-            
-            # Detect threat type from keywords
-            threat_type = self._detect_threat_type(output.lower(), rule.lower())
-            
-            # Extract Kubernetes metadata
-            pod_name = output_fields.get("k8s.pod.name") or output_fields.get("k8s.pod.name")
-            namespace = output_fields.get("k8s.ns.name") or output_fields.get("k8s.namespace.name", "default")
-            container = output_fields.get("container.name") or output_fields.get("k8s.container.name")
-            user = output_fields.get("user.name") or output_fields.get("proc.user")
-            
-            # Create threat event
-            threat = ThreatEvent(
-                severity=severity,
-                threat_type=threat_type,
-                source_pod=pod_name,
-                source_namespace=namespace,
-                source_container=container,
-                source_user=user,
-                description=output[:500],  # Truncate long outputs
-                falco_output=output,
-                falco_rule=rule,
-                falco_priority=priority,
-                raw_event=event,
-                confidence=0.7  # Default confidence, will be updated by ML/RL
-            )
+            threat = self._build_threat(event)
             
             # Store threat
             from app.storage import add_threat
             add_threat(threat)
             
-            # Broadcast to WebSocket clients
-            await manager.broadcast({
-                "type": "threat_detected",
-                "threat_id": str(threat.id),
-                "severity": threat.severity.value,
-                "threat_type": threat.threat_type.value,
-                "pod": threat.source_pod,
-                "description": threat.description[:100]
-            })
-            
-            logger.info(
-                "Threat detected",
-                extra={
-                    "threat_id": str(threat.id),
-                    "threat_type": threat.threat_type.value,
-                    "severity": threat.severity.value,
-                    "source_pod": threat.source_pod,
-                    "source_namespace": threat.source_namespace
-                }
-            )
-            
+            await self._announce(threat)
             return threat
         
         except Exception as e:
@@ -125,12 +108,136 @@ class FalcoProcessor:
             )
             return None
     
+    async def process_events(self, events: List[Dict[str, Any]]) -> List[Optional[ThreatEvent]]:
+        """
+        Process a batch of Falco events
+        Events that fail to parse give None in their slot
+        """
+        threats = self.build_threats(events)
+        await self.store_threats([threat for threat in threats if threat is not None])
+        return threats
+    
+    def build_threats(self, events: List[Dict[str, Any]]) -> List[Optional[ThreatEvent]]:
+        """Convert a batch of Falco events without storing them; failures give None"""
+        threats: List[Optional[ThreatEvent]] = []
+        for event in events:
+            try:
+                threats.append(self._build_threat(event))
+            except Exception as e:
+                logger.error(
+                    "Error processing Falco event",
+                    extra={"error": str(e)},
+                    exc_info=True
+                )
+                threats.append(None)
+        return threats
+    
+    async def store_threats(self, threats: List[ThreatEvent]) -> None:
+        """Store built threats with one bulk insert and announce them in one WebSocket message"""
+        if not threats:
+            return
+        from app.storage import add_threats_bulk
+        add_threats_bulk(threats)
+        
+        # One WebSocket message for the whole batch instead of one per threat
+        await manager.broadcast({
+            "type": "threats_batch",
+            "items": [self._threat_message(threat) for threat in threats]
+        })
+        for threat in threats:
+            self._log_threat(threat)
+    
+    def _build_threat(self, event: Dict[str, Any]) -> ThreatEvent:
+        """Convert a Falco event into a ThreatEvent"""
+        # Extract Falco event data
+        output = event.get("output", "")
+        priority = event.get("priority", "Informational")
+        rule = event.get("rule", "Unknown")
+        output_fields = event.get("output_fields", {})
+        
+        # Determine severity
+        severity = self.PRIORITY_TO_SEVERITY.get(priority, ThreatSeverity.LOW)
+        
+        # Detect threat type from keywords
+        threat_type = self._detect_threat_type(output, rule)
+        
+        # Extract Kubernetes metadata
+        pod_name = output_fields.get("k8s.pod.name") or output_fields.get("k8s.pod.name")
+        namespace = output_fields.get("k8s.ns.name") or output_fields.get("k8s.namespace.name", "default")
+        container = output_fields.get("container.name") or output_fields.get("k8s.container.name")
+        user = output_fields.get("user.name") or output_fields.get("proc.user")
+        
+        # Create threat event
+        return ThreatEvent(
+            severity=severity,
+            threat_type=threat_type,
+            source_pod=pod_name,
+            source_namespace=namespace,
+            source_container=container,
+            source_user=user,
+            description=output[:500],  # Truncate long outputs
+            falco_output=output,
+            falco_rule=rule,
+            falco_priority=priority,
+            raw_event=event,
+            confidence=0.7  # Default confidence, will be updated by ML/RL
+        )
+    
+    async def _announce(self, threat: ThreatEvent) -> None:
+        """Broadcast a stored threat to WebSocket clients and log it"""
+        await manager.broadcast(self._threat_message(threat))
+        self._log_threat(threat)
+    
+    @staticmethod
+    def _threat_message(threat: ThreatEvent) -> Dict[str, Any]:
+        """WebSocket message announcing a detected threat"""
+        return {
+            "type": "threat_detected",
+            "threat_id": str(threat.id),
+            "severity": threat.severity,
+            "threat_type": threat.threat_type,
+            "pod": threat.source_pod,
+            "description": threat.description[:100]
+        }
+    
+    @staticmethod
+    def _log_threat(threat: ThreatEvent) -> None:
+        """Log a detected threat"""
+        logger.info(
+            "Threat detected",
+            extra={
+                "threat_id": str(threat.id),
+                "threat_type": threat.threat_type,
+                "severity": threat.severity,
+                "source_pod": threat.source_pod,
+                "source_namespace": threat.source_namespace
+            }
+        )
+    
     def _detect_threat_type(self, output: str, rule: str) -> ThreatType:
         """Detect threat type from output and rule keywords"""
-        combined = f"{output} {rule}"
+        if self._keyword_db is not None:
+            return self._detect_threat_type_hyperscan(f"{output} {rule}")
+        
+        # Join first so the text is lowercased in a single pass (keywords are lowercase)
+        combined = f"{output} {rule}".lower()
         
-        for threat_type, keywords in self.THREAT_KEYWORDS.items():
-            if any(keyword in combined for keyword in keywords):
+        for threat_type, pattern in self.THREAT_PATTERNS:
+            if pattern.search(combined):
                 return threat_type
         
         return ThreatType.UNKNOWN
+    
+    def _detect_threat_type_hyperscan(self, text: str) -> ThreatType:
+        """Single caseless scan; the earliest THREAT_KEYWORDS type that matches wins"""
+        matched = []
+        
+        def on_match(priority, start, end, flags, context):
+            matched.append(priority)
+            return priority == 0  # Nothing outranks the first type, so stop scanning
+        
+        try:
+            self._keyword_db.scan(text.encode("utf-8", "ignore"), match_event_handler=on_match)
+        except hyperscan.ScanTerminated:
+            pass  # Raised when on_match stops the scan early
+        return self.THREAT_TYPE_ORDER[min(matched)] if matched else ThreatType.UNKNOWN
@@ -0,0 +1,49 @@
+"""
+LLM Response Cache
+In-process TTL/LRU cache for threat explanations
+"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class LLMCache:
+    """TTL + LRU cache for LLM responses, keyed by a hash of the prompt inputs"""
+    
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+    
+    @staticmethod
+    def make_key(**fields) -> str:
+        """Build a stable cache key from the fields that shape the prompt"""
+        payload = json.dumps(fields, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    async def get(self, key: str) -> Optional[str]:
+        """Return a cached value, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    
+    async def set(self, key: str, value: str) -> None:
+        """Store a value, evicting the least recently used entry when full"""
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def stats(self) -> dict:
+        """Cache counters for health reporting"""
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -2,22 +2,133 @@
 LLM Service - Threat Explanation
 Supports both cloud APIs (OpenAI/Anthropic) and Ollama
 """
+import asyncio
+import json
 import os
-from typing import Optional
-from app.models.threat_event import ThreatEvent
+import random
+from typing import AsyncIterator, List, Optional
+import httpx
+from app.models.threat_event import ThreatEvent, ThreatSeverity
+from app.services.llm_cache import LLMCache
 from app.utils.logging import get_logger
 
+try:
+    import openai
+except ImportError:
+    openai = None
+
+try:
+    import anthropic
+except ImportError:
+    anthropic = None
+
 logger = get_logger(__name__)
 
 
 class LLMService:
     """LLM service for generating threat explanations"""
     
-    def __init__(self):
+    # Model used per provider
+    MODELS = {
+        "openai": "gpt-3.5-turbo",
+        "anthropic": "claude-3-haiku-20240307",
+        "ollama": "llama2"  # or whatever model is available
+    }
+    
+    # Static instructions sent ahead of every threat so provider prefix caches can reuse them
+    SYSTEM_PROMPT = (
+        "You are FRIDAY, Tony Stark's AI assistant. Explain security threats in a concise, "
+        "professional manner. Provide a brief explanation starting with \"Sir,\" in FRIDAY's style."
+    )
+    
+    # Per-threat fields, appended after the static preamble
+    THREAT_PROMPT = (
+        "Threat Type: {threat_type}\n"
+        "Severity: {severity}\n"
+        "Pod: {pod}\n"
+        "Description: {description}"
+    )
+    
+    # Severity ranking for deciding which threats are worth LLM tokens
+    SEVERITY_RANK = {
+        ThreatSeverity.LOW: 0,
+        ThreatSeverity.MEDIUM: 1,
+        ThreatSeverity.HIGH: 2,
+        ThreatSeverity.CRITICAL: 3
+    }
+    
+    # Retries on provider rate limits, with jittered exponential backoff from this base delay
+    # unless the provider sends Retry-After
+    MAX_RETRIES = 3
+    RETRY_BASE_DELAY = 0.5  # seconds
+    RETRY_MAX_DELAY = 30.0  # seconds
+    
+    def __init__(
+        self,
+        http_client: Optional[httpx.AsyncClient] = None,
+        openai_client=None,
+        anthropic_client=None
+    ):
         self.provider = os.getenv("LLM_PROVIDER", "openai")  # openai, anthropic, ollama
         self.api_key = os.getenv("OPENAI_API_KEY") or os.getenv("ANTHROPIC_API_KEY")
         self.ollama_url = os.getenv("OLLAMA_URL", "http://localhost:11434")
         self.initialized = False
+        
+        # Long-lived clients, created on first use and reused for keep-alive (or injected)
+        self._http: Optional[httpx.AsyncClient] = http_client
+        self._openai = openai_client
+        self._anthropic = anthropic_client
+        
+        # Repeated Falco events (same rule/pod) reuse earlier explanations
+        self.cache = LLMCache(
+            maxsize=int(os.getenv("LLM_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("LLM_CACHE_TTL", "3600"))
+        )
+        
+        # Bound in-flight provider calls so Falco bursts don't flood the API
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "10"))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        # Below this severity (unless ML flags a strong anomaly) the template is good enough
+        self.min_severity = ThreatSeverity(os.getenv("LLM_MIN_SEVERITY", "high").lower())
+        self.min_score = float(os.getenv("LLM_MIN_SCORE", "0.85"))
+        self.calls_skipped = 0
+    
+    def _get_http(self) -> httpx.AsyncClient:
+        """Shared HTTP/2 client with a keep-alive connection pool"""
+        if self._http is None:
+            # HTTP/2 multiplexes concurrent provider calls over one TLS connection;
+            # plain-HTTP endpoints such as a local Ollama stay on HTTP/1.1
+            self._http = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=2000,
+                    max_keepalive_connections=500,
+                    keepalive_expiry=30.0
+                ),
+                timeout=httpx.Timeout(connect=5.0, read=60.0, write=10.0, pool=5.0)
+            )
+        return self._http
+    
+    def _get_openai(self):
+        """Shared OpenAI client"""
+        if self._openai is None:
+            self._openai = openai.AsyncOpenAI(api_key=self.api_key, http_client=self._get_http())
+        return self._openai
+    
+    def _get_anthropic(self):
+        """Shared Anthropic client"""
+        if self._anthropic is None:
+            self._anthropic = anthropic.AsyncAnthropic(api_key=self.api_key, http_client=self._get_http())
+        return self._anthropic
+    
+    async def close(self):
+        """Close the shared HTTP client"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        self._openai = None
+        self._anthropic = None
     
     async def initialize(self):
         """Initialize LLM service"""
@@ -28,14 +139,12 @@ class LLMService:
                 logger.info(f"LLM Service initialized ({self.provider})")
             elif self.provider == "ollama":
                 # Try to connect to Ollama
-                import httpx
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(f"{self.ollama_url}/api/tags", timeout=5.0)
-                    if response.status_code == 200:
-                        self.initialized = True
-                        logger.info("LLM Service initialized (Ollama)")
-                    else:
-                        logger.warning("Ollama not available, LLM service in mock mode")
+                response = await self._get_http().get(f"{self.ollama_url}/api/tags", timeout=5.0)
+                if response.status_code == 200:
+                    self.initialized = True
+                    logger.info("LLM Service initialized (Ollama)")
+                else:
+                    logger.warning("Ollama not available, LLM service in mock mode")
             else:
                 logger.warning("No LLM provider configured, using template-based explanations")
         except Exception as e:
@@ -51,100 +160,180 @@ class LLMService:
             # Fallback to template-based explanation
             return self._template_explanation(threat)
         
+        if self.provider not in self.MODELS:
+            return self._template_explanation(threat)
+        
+        if not self._needs_llm(threat):
+            self.calls_skipped += 1
+            return self._template_explanation(threat)
+        
+        key = self._cache_key(threat)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+        
         try:
-            if self.provider == "openai":
-                return await self._explain_openai(threat)
-            elif self.provider == "anthropic":
-                return await self._explain_anthropic(threat)
-            elif self.provider == "ollama":
-                return await self._explain_ollama(threat)
-            else:
-                return self._template_explanation(threat)
+            explanation = await self._call_provider(threat)
+            
+            # Only successful LLM responses are cached; fallbacks are retried next time
+            await self.cache.set(key, explanation)
+            return explanation
         except Exception as e:
             logger.error(f"Error generating LLM explanation: {e}", exc_info=True)
             return self._template_explanation(threat)
     
+    async def explain_threat_stream(self, threat: ThreatEvent) -> AsyncIterator[str]:
+        """
+        Yield the explanation as it is generated
+        Ollama streams tokens; other providers yield the full explanation once
+        """
+        if not (self.initialized and self.provider == "ollama" and self._needs_llm(threat)):
+            yield await self.explain_threat(threat)
+            return
+        
+        key = self._cache_key(threat)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        tokens = []
+        try:
+            async with self._semaphore:
+                async for token in self._stream_ollama(threat):
+                    tokens.append(token)
+                    yield token
+        except Exception as e:
+            logger.error(f"Error streaming LLM explanation: {e}", exc_info=True)
+            if not tokens:
+                yield self._template_explanation(threat)
+            return
+        
+        await self.cache.set(key, "".join(tokens).strip())
+    
+    def _needs_llm(self, threat: ThreatEvent) -> bool:
+        """Whether a threat is severe or anomalous enough to spend an LLM call on"""
+        if self.SEVERITY_RANK[threat.severity] >= self.SEVERITY_RANK[self.min_severity]:
+            return True
+        return threat.ml_score is not None and threat.ml_score > self.min_score
+    
+    def _cache_key(self, threat: ThreatEvent) -> str:
+        """Cache key covering everything that shapes the prompt"""
+        return LLMCache.make_key(
+            provider=self.provider,
+            model=self.MODELS[self.provider],
+            threat_type=threat.threat_type.value,
+            severity=threat.severity.value,
+            source_pod=threat.source_pod,
+            description=threat.description[:200]
+        )
+    
+    async def explain_threats(self, threats: List[ThreatEvent]) -> List[str]:
+        """Explain a burst of threats concurrently, bounded by max_concurrency"""
+        return await asyncio.gather(*(self.explain_threat(threat) for threat in threats))
+    
+    async def _call_provider(self, threat: ThreatEvent) -> str:
+        """Call the configured provider, retrying with backoff when rate limited"""
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                async with self._semaphore:
+                    if self.provider == "openai":
+                        return await self._explain_openai(threat)
+                    elif self.provider == "anthropic":
+                        return await self._explain_anthropic(threat)
+                    else:
+                        return await self._explain_ollama(threat)
+            except Exception as e:
+                if attempt == self.MAX_RETRIES or not self._is_rate_limited(e):
+                    raise
+                # Back off outside the semaphore so other threats can proceed
+                await asyncio.sleep(self._retry_delay(e, attempt))
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Honour Retry-After when the provider sends it, else full-jitter exponential backoff"""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.RETRY_MAX_DELAY)
+            except ValueError:
+                pass  # HTTP-date form; fall back to backoff
+        return random.uniform(0, min(self.RETRY_BASE_DELAY * 2 ** attempt, self.RETRY_MAX_DELAY))
+    
+    @staticmethod
+    def _is_rate_limited(error: Exception) -> bool:
+        """Whether a provider error is a 429 worth retrying"""
+        if openai is not None and isinstance(error, openai.RateLimitError):
+            return True
+        if anthropic is not None and isinstance(error, anthropic.RateLimitError):
+            return True
+        return isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 429
+    
+    def _threat_prompt(self, threat: ThreatEvent) -> str:
+        """Dynamic part of the prompt describing a single threat"""
+        return self.THREAT_PROMPT.format(
+            threat_type=threat.threat_type.value,
+            severity=threat.severity.value,
+            pod=threat.source_pod,
+            description=threat.description[:200]
+        )
+    
     async def _explain_openai(self, threat: ThreatEvent) -> str:
         """Generate explanation using OpenAI API"""
-        try:
-            import openai
-            
-            prompt = f"""You are FRIDAY, Tony Stark's AI assistant. Explain this security threat in a concise, professional manner:
-
-Threat Type: {threat.threat_type.value}
-Severity: {threat.severity.value}
-Pod: {threat.source_pod}
-Description: {threat.description[:200]}
-
-Provide a brief explanation starting with "Sir," in FRIDAY's style."""
-            
-            client = openai.AsyncOpenAI(api_key=self.api_key)
-            response = await client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=150
-            )
-            
-            return response.choices[0].message.content.strip()
-        except ImportError:
-            return self._template_explanation(threat)
+        if openai is None:
+            raise RuntimeError("openai package not installed")
+        
+        # System message first so the shared prefix hits OpenAI's automatic prompt cache
+        response = await self._get_openai().chat.completions.create(
+            model=self.MODELS["openai"],
+            messages=[
+                {"role": "system", "content": self.SYSTEM_PROMPT},
+                {"role": "user", "content": self._threat_prompt(threat)}
+            ],
+            max_tokens=150
+        )
+        
+        return response.choices[0].message.content.strip()
     
     async def _explain_anthropic(self, threat: ThreatEvent) -> str:
         """Generate explanation using Anthropic API"""
-        try:
-            import anthropic
-            
-            prompt = f"""You are FRIDAY, Tony Stark's AI assistant. Explain this security threat:
-
-Threat Type: {threat.threat_type.value}
-Severity: {threat.severity.value}
-Pod: {threat.source_pod}
-Description: {threat.description[:200]}
-
-Provide a brief explanation starting with "Sir," in FRIDAY's style."""
-            
-            client = anthropic.AsyncAnthropic(api_key=self.api_key)
-            response = await client.messages.create(
-                model="claude-3-haiku-20240307",
-                max_tokens=150,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
-            return response.content[0].text.strip()
-        except ImportError:
-            return self._template_explanation(threat)
+        if anthropic is None:
+            raise RuntimeError("anthropic package not installed")
+        
+        response = await self._get_anthropic().messages.create(
+            model=self.MODELS["anthropic"],
+            max_tokens=150,
+            system=[{
+                "type": "text",
+                "text": self.SYSTEM_PROMPT,
+                "cache_control": {"type": "ephemeral"}
+            }],
+            messages=[{"role": "user", "content": self._threat_prompt(threat)}]
+        )
+        
+        return response.content[0].text.strip()
     
     async def _explain_ollama(self, threat: ThreatEvent) -> str:
         """Generate explanation using Ollama"""
-        try:
-            import httpx
-            
-            prompt = f"""You are FRIDAY, Tony Stark's AI assistant. Explain this security threat:
-
-Threat Type: {threat.threat_type.value}
-Severity: {threat.severity.value}
-Pod: {threat.source_pod}
-Description: {threat.description[:200]}
-
-Provide a brief explanation starting with "Sir," in FRIDAY's style."""
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.ollama_url}/api/generate",
-                    json={
-                        "model": "llama2",  # or whatever model is available
-                        "prompt": prompt,
-                        "stream": False
-                    },
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    return response.json().get("response", "").strip()
-                else:
-                    return self._template_explanation(threat)
-        except Exception:
-            return self._template_explanation(threat)
+        return "".join([token async for token in self._stream_ollama(threat)]).strip()
+    
+    async def _stream_ollama(self, threat: ThreatEvent) -> AsyncIterator[str]:
+        """Stream explanation tokens from Ollama as they are generated"""
+        async with self._get_http().stream(
+            "POST",
+            f"{self.ollama_url}/api/generate",
+            json={
+                "model": self.MODELS["ollama"],
+                "system": self.SYSTEM_PROMPT,
+                "prompt": self._threat_prompt(threat),
+                "stream": True
+            },
+            timeout=30.0
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    yield json.loads(line).get("response", "")
     
     def _template_explanation(self, threat: ThreatEvent) -> str:
         """Fallback template-based explanation"""
@@ -162,5 +351,7 @@ Provide a brief explanation starting with "Sir," in FRIDAY's style."""
         """Health check for LLM service"""
         return {
             "status": "healthy" if self.initialized else "degraded",
-            "provider": self.provider
+            "provider": self.provider,
+            "cache": self.cache.stats(),
+            "llm_calls_skipped": self.calls_skipped
         }
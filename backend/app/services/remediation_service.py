@@ -2,7 +2,10 @@
 Remediation Service - Execute Kubernetes Actions
 Handles actual remediation actions based on RL decisions
 """
+import asyncio
+from collections import defaultdict
 from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
 from kubernetes import client, config
 from app.models.threat_event import ThreatEvent
 from app.models.remediation_action import RemediationAction
@@ -15,21 +18,77 @@ logger = get_logger(__name__)
 class RemediationService:
     """Service for executing remediation actions"""
     
+    # Concurrent Kubernetes API calls allowed per namespace (API server QPS limits)
+    NAMESPACE_CONCURRENCY = 20
+    
+    # Isolation uses one deny-all NetworkPolicy per namespace selecting this pod label
+    ISOLATION_POLICY = "sentinel-isolated"
+    ISOLATION_LABEL = "sentinelforge/isolated"
+    
+    # Background workers draining submitted actions
+    WORKER_COUNT = 8
+    QUEUE_MAXSIZE = 1000
+    
     def __init__(self):
         self.k8s_client = None
+        self.networking_client = None
         self.initialized = False
+        self._isolation_policies: Set[str] = set()
+        self._isolation_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._namespace_limits: Dict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.NAMESPACE_CONCURRENCY)
+        )
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
     
     async def initialize(self):
         """Initialize Kubernetes client"""
         try:
             config.load_kube_config()
             self.k8s_client = client.CoreV1Api()
+            self.networking_client = client.NetworkingV1Api()
             self.initialized = True
             logger.info("Remediation Service initialized (Kubernetes client)")
         except Exception as e:
             logger.warning(f"Kubernetes client not available: {e}, running in simulated mode")
             self.initialized = False
     
+    def start_workers(self):
+        """Start the worker pool that executes submitted actions"""
+        if self._workers:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.QUEUE_MAXSIZE)
+        self._workers = [asyncio.create_task(self._worker(self._queue)) for _ in range(self.WORKER_COUNT)]
+    
+    async def stop_workers(self):
+        """Cancel the worker pool; queued actions that have not started are dropped"""
+        workers, self._workers, self._queue, self._loop = self._workers, [], None, None
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    
+    async def submit_action(self, action: RemediationAction, threat: ThreatEvent):
+        """
+        Queue an action for background execution and return immediately
+        Executes inline when the worker pool is not running or belongs to another event loop
+        """
+        # asyncio.Queue is not thread-safe and only wakes workers on its own loop
+        if self._queue is None or asyncio.get_running_loop() is not self._loop:
+            await self.execute_action(action, threat)
+            return
+        await self._queue.put((action, threat))
+    
+    async def _worker(self, queue: asyncio.Queue):
+        """Execute queued actions until cancelled"""
+        while True:
+            item: Tuple[RemediationAction, ThreatEvent] = await queue.get()
+            try:
+                await self.execute_action(*item)
+            finally:
+                queue.task_done()
+    
     async def execute_action(self, action: RemediationAction, threat: ThreatEvent):
         """
         Execute remediation action
@@ -69,7 +128,7 @@ class RemediationService:
                     "Action executed successfully",
                     extra={
                         "action_id": str(action.id),
-                        "action_type": action.action_type.value,
+                        "action_type": action.action_type,
                         "threat_id": str(threat.id)
                     }
                 )
@@ -78,7 +137,7 @@ class RemediationService:
                     "Action execution failed",
                     extra={
                         "action_id": str(action.id),
-                        "action_type": action.action_type.value,
+                        "action_type": action.action_type,
                         "threat_id": str(threat.id),
                         "error": action.error_message
                     }
@@ -97,58 +156,91 @@ class RemediationService:
             return True
         
         try:
-            self.k8s_client.delete_namespaced_pod(
-                name=pod_name,
-                namespace=namespace,
-                grace_period_seconds=0
-            )
+            # The kubernetes client is synchronous; run it off the event loop
+            async with self._namespace_limits[namespace]:
+                await asyncio.to_thread(
+                    self.k8s_client.delete_namespaced_pod,
+                    name=pod_name,
+                    namespace=namespace,
+                    grace_period_seconds=0
+                )
             return True
         except Exception as e:
             logger.error(f"Failed to terminate pod {pod_name}: {e}")
             return False
     
     async def _isolate_pod(self, pod_name: str, namespace: str) -> bool:
-        """Isolate pod using network policy"""
+        """Isolate pod by labelling it into the namespace's deny-all network policy"""
         if not self.initialized or not self.k8s_client:
             logger.info(f"[SIMULATED] Would isolate pod {pod_name} in namespace {namespace}")
             return True
         
         try:
-            # Create network policy to isolate pod
-            # This is a simplified version - in production, would create proper NetworkPolicy
-            from kubernetes.client import V1NetworkPolicy, V1NetworkPolicySpec, V1NetworkPolicyIngressRule
-            
-            network_policy = V1NetworkPolicy(
-                metadata=client.V1ObjectMeta(
-                    name=f"{pod_name}-isolate",
-                    namespace=namespace
-                ),
-                spec=V1NetworkPolicySpec(
-                    pod_selector={"matchLabels": {"pod-name": pod_name}},
-                    policy_types=["Ingress", "Egress"],
-                    ingress=[],  # No ingress allowed
-                    egress=[]    # No egress allowed
+            await self._ensure_isolation_policy(namespace)
+            async with self._namespace_limits[namespace]:
+                await asyncio.to_thread(
+                    self.k8s_client.patch_namespaced_pod,
+                    name=pod_name,
+                    namespace=namespace,
+                    body={"metadata": {"labels": {self.ISOLATION_LABEL: "true"}}}
                 )
-            )
-            
-            networking_api = client.NetworkingV1Api()
-            networking_api.create_namespaced_network_policy(
-                namespace=namespace,
-                body=network_policy
-            )
             return True
         except Exception as e:
             logger.error(f"Failed to isolate pod {pod_name}: {e}")
             return False
     
+    async def _ensure_isolation_policy(self, namespace: str) -> None:
+        """Create the namespace's isolation NetworkPolicy once; an existing one is reused"""
+        if namespace in self._isolation_policies:
+            return
+        
+        # Concurrent isolations in one namespace wait for the first to create the policy
+        async with self._isolation_locks[namespace]:
+            if namespace not in self._isolation_policies:
+                await self._create_isolation_policy(namespace)
+                self._isolation_policies.add(namespace)
+    
+    async def _create_isolation_policy(self, namespace: str) -> None:
+        """Create the deny-all NetworkPolicy selecting isolated pods"""
+        network_policy = client.V1NetworkPolicy(
+            metadata=client.V1ObjectMeta(name=self.ISOLATION_POLICY, namespace=namespace),
+            spec=client.V1NetworkPolicySpec(
+                pod_selector=client.V1LabelSelector(match_labels={self.ISOLATION_LABEL: "true"}),
+                policy_types=["Ingress", "Egress"],
+                ingress=[],  # No ingress allowed
+                egress=[]    # No egress allowed
+            )
+        )
+        
+        if self.networking_client is None:
+            self.networking_client = client.NetworkingV1Api()
+        try:
+            async with self._namespace_limits[namespace]:
+                await asyncio.to_thread(
+                    self.networking_client.create_namespaced_network_policy,
+                    namespace=namespace,
+                    body=network_policy
+                )
+        except client.ApiException as e:
+            if e.status != 409:  # Already exists
+                raise
+    
+    async def terminate_pods(self, pod_names: List[str], namespace: str) -> List[bool]:
+        """Terminate several pods from one incident concurrently"""
+        return await asyncio.gather(*(self._terminate_pod(pod, namespace) for pod in pod_names))
+    
+    async def isolate_pods(self, pod_names: List[str], namespace: str) -> List[bool]:
+        """Isolate several pods from one incident concurrently"""
+        return await asyncio.gather(*(self._isolate_pod(pod, namespace) for pod in pod_names))
+    
     async def _send_alert(self, threat: ThreatEvent) -> bool:
         """Send alert (for now, just log)"""
         logger.warning(
             "ALERT: Threat detected",
             extra={
                 "threat_id": str(threat.id),
-                "severity": threat.severity.value,
-                "threat_type": threat.threat_type.value,
+                "severity": threat.severity,
+                "threat_type": threat.threat_type,
                 "description": threat.description[:100]
             }
         )
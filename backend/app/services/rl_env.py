@@ -2,13 +2,150 @@
 Reinforcement Learning Environment for Cybersecurity
 Gymnasium-compatible environment for training RL agent
 """
+import random
 import numpy as np
-from typing import Dict, Tuple, Any, Optional
+from typing import Dict, NamedTuple, Tuple, Any, Optional, Union
 from gymnasium import Env, spaces
 from app.models.threat_event import ThreatEvent, ThreatSeverity, ThreatType
 from app.models.remediation_action import ActionType, RiskLevel
 
 
+# State encodings, built once at import rather than per step
+SEVERITY_ENCODING = {
+    ThreatSeverity.LOW: 0.25,
+    ThreatSeverity.MEDIUM: 0.50,
+    ThreatSeverity.HIGH: 0.75,
+    ThreatSeverity.CRITICAL: 1.0
+}
+
+THREAT_TYPE_ENCODING = {
+    ThreatType.REVERSE_SHELL: 1.0,
+    ThreatType.CONTAINER_ESCAPE: 0.9,
+    ThreatType.PRIVILEGE_ESCALATION: 0.8,
+    ThreatType.MALICIOUS_PROCESS: 0.7,
+    ThreatType.NETWORK_ANOMALY: 0.5,
+    ThreatType.FILE_ANOMALY: 0.4,
+    ThreatType.UNAUTHORIZED_ACCESS: 0.3,
+    ThreatType.UNKNOWN: 0.2
+}
+
+# The same encodings as arrays indexed by enum ordinal, for vectorized lookups
+SEVERITIES = tuple(ThreatSeverity)
+THREAT_TYPES = tuple(ThreatType)
+SEVERITY_LUT = np.array([SEVERITY_ENCODING[s] for s in SEVERITIES], dtype=np.float32)
+THREAT_TYPE_LUT = np.array([THREAT_TYPE_ENCODING[t] for t in THREAT_TYPES], dtype=np.float32)
+
+class TrainingThreat(NamedTuple):
+    """
+    Lightweight stand-in for ThreatEvent in training rollouts
+    Carries only the fields the state encoding and rewards read, skipping pydantic validation
+    """
+    severity: ThreatSeverity
+    threat_type: ThreatType
+    source_pod: Optional[str]
+    source_user: Optional[str]
+    ml_score: float
+    confidence: float
+
+
+# Names for generated training threats, formatted once
+POD_NAMES = tuple(f"pod-{i}" for i in range(1, 101))
+USER_NAMES = tuple(f"user-{i}" for i in range(1, 11))
+
+# Action space order: 0: MONITOR, 1: LOG, 2: ALERT, 3: ISOLATE_POD,
+# 4: TERMINATE_POD, 5: BLOCK_NETWORK, 6: TERMINATE_PROCESS, 7: ESCALATE
+ACTION_TYPES = (
+    ActionType.MONITOR,
+    ActionType.LOG,
+    ActionType.ALERT,
+    ActionType.ISOLATE_POD,
+    ActionType.TERMINATE_POD,
+    ActionType.BLOCK_NETWORK,
+    ActionType.TERMINATE_PROCESS,
+    ActionType.ESCALATE
+)
+
+# Ordinal of each enum member, for indexing the tables above and below
+SEVERITY_INDEX = {severity: i for i, severity in enumerate(SEVERITIES)}
+THREAT_TYPE_INDEX = {threat_type: i for i, threat_type in enumerate(THREAT_TYPES)}
+ACTION_INDEX = {action: i for i, action in enumerate(ACTION_TYPES)}
+
+# Actions that end an episode
+TERMINAL_ACTION_TYPES = frozenset({ActionType.TERMINATE_POD, ActionType.ISOLATE_POD, ActionType.ESCALATE})
+
+# Base rewards for actions
+ACTION_REWARDS = {
+    ActionType.MONITOR: 0.1,
+    ActionType.LOG: 0.2,
+    ActionType.ALERT: 0.5,
+    ActionType.ISOLATE_POD: 0.7,
+    ActionType.TERMINATE_POD: 0.9,
+    ActionType.BLOCK_NETWORK: 0.6,
+    ActionType.TERMINATE_PROCESS: 0.8,
+    ActionType.ESCALATE: 0.3  # Penalty for requiring human
+}
+
+
+def _reward_rule(action: ActionType, severity: ThreatSeverity, threat_type: ThreatType) -> float:
+    """
+    Calculate reward based on action appropriateness
+    
+    Reward structure:
+    - High reward for appropriate actions
+    - Negative reward for over-reaction (terminating low-risk threats)
+    - Negative reward for under-reaction (monitoring critical threats)
+    - Small penalty for escalation (prefer autonomous action when safe)
+    """
+    base_reward = ACTION_REWARDS.get(action, 0.0)
+    
+    # Adjust based on threat severity
+    if severity == ThreatSeverity.CRITICAL:
+        if action in [ActionType.TERMINATE_POD, ActionType.ISOLATE_POD]:
+            reward = 1.0  # Correct action
+        elif action == ActionType.MONITOR:
+            reward = -1.0  # Under-reaction
+        else:
+            reward = 0.3  # Suboptimal
+    elif severity == ThreatSeverity.HIGH:
+        if action in [ActionType.ISOLATE_POD, ActionType.ALERT]:
+            reward = 0.8
+        elif action == ActionType.TERMINATE_POD:
+            reward = 0.6  # Slightly over-reactive
+        elif action == ActionType.MONITOR:
+            reward = -0.5
+        else:
+            reward = base_reward
+    elif severity == ThreatSeverity.MEDIUM:
+        if action == ActionType.ALERT:
+            reward = 0.7
+        elif action in [ActionType.TERMINATE_POD, ActionType.ISOLATE_POD]:
+            reward = -0.3  # Over-reaction
+        else:
+            reward = base_reward
+    else:  # LOW
+        if action in [ActionType.MONITOR, ActionType.LOG]:
+            reward = 0.6
+        elif action in [ActionType.TERMINATE_POD, ActionType.ISOLATE_POD]:
+            reward = -0.8  # Severe over-reaction
+        else:
+            reward = base_reward
+    
+    # Bonus for reverse shell detection
+    if threat_type == ThreatType.REVERSE_SHELL and action == ActionType.TERMINATE_POD:
+        reward += 0.2
+    
+    # Normalize reward to [-1, 1]
+    return min(max(reward, -1.0), 1.0)
+
+
+# Every reward the rules can produce, indexed [action, severity, threat_type];
+# evaluated once so a training step is a single table lookup
+REWARD_TABLE = np.array([
+    [[_reward_rule(action, severity, threat_type) for threat_type in THREAT_TYPES] for severity in SEVERITIES]
+    for action in ACTION_TYPES
+])
+
+
 class CyberSecurityEnv(Env):
     """
     Custom Gymnasium environment for cybersecurity threat response
@@ -37,9 +174,10 @@ class CyberSecurityEnv(Env):
             dtype=np.float32
         )
         
-        # Current state
+        # Current state; _threat_to_state refills this buffer in place
         self.state = None
         self.current_threat = None
+        self._state_buf = np.empty(6, dtype=np.float32)
         
     def reset(self, seed: Optional[int] = None, options: Optional[dict] = None) -> Tuple[np.ndarray, Dict]:
         """Reset environment and return initial observation"""
@@ -49,7 +187,7 @@ class CyberSecurityEnv(Env):
         self.current_threat = self._generate_random_threat()
         self.state = self._threat_to_state(self.current_threat)
         
-        return self.state.astype(np.float32), {}
+        return self.state.copy(), {}
     
     def step(self, action: int) -> Tuple[np.ndarray, float, bool, bool, Dict]:
         """Execute action and return (observation, reward, terminated, truncated, info)"""
@@ -63,7 +201,7 @@ class CyberSecurityEnv(Env):
         reward = self._calculate_reward(action_type, self.current_threat)
         
         # Determine if episode is done (action executed)
-        terminated = action_type in [ActionType.TERMINATE_POD, ActionType.ISOLATE_POD, ActionType.ESCALATE]
+        terminated = action_type in TERMINAL_ACTION_TYPES
         
         # Generate next threat (for continuous training)
         self.current_threat = self._generate_random_threat()
@@ -76,148 +214,42 @@ class CyberSecurityEnv(Env):
             "severity": self.current_threat.severity.value
         }
         
-        return self.state.astype(np.float32), reward, terminated, truncated, info
+        return self.state.copy(), reward, terminated, truncated, info
     
-    def _threat_to_state(self, threat: ThreatEvent) -> np.ndarray:
-        """Convert threat to state vector"""
-        # Severity encoding
-        severity_map = {
-            ThreatSeverity.LOW: 0.25,
-            ThreatSeverity.MEDIUM: 0.50,
-            ThreatSeverity.HIGH: 0.75,
-            ThreatSeverity.CRITICAL: 1.0
-        }
-        severity_val = severity_map.get(threat.severity, 0.5)
-        
-        # Threat type encoding
-        threat_type_map = {
-            ThreatType.REVERSE_SHELL: 1.0,
-            ThreatType.CONTAINER_ESCAPE: 0.9,
-            ThreatType.PRIVILEGE_ESCALATION: 0.8,
-            ThreatType.MALICIOUS_PROCESS: 0.7,
-            ThreatType.NETWORK_ANOMALY: 0.5,
-            ThreatType.FILE_ANOMALY: 0.4,
-            ThreatType.UNAUTHORIZED_ACCESS: 0.3,
-            ThreatType.UNKNOWN: 0.2
-        }
-        threat_type_val = threat_type_map.get(threat.threat_type, 0.2)
-        
-        # ML score (normalized)
-        ml_score = threat.ml_score if threat.ml_score else 0.5
-        
-        # Has pod
-        has_pod = 1.0 if threat.source_pod else 0.0
-        
-        # Has user
-        has_user = 1.0 if threat.source_user else 0.0
-        
-        # Confidence (from threat or default)
-        confidence = threat.confidence if threat.confidence else 0.5
-        
-        return np.array([
-            severity_val,
-            threat_type_val,
-            ml_score,
-            has_pod,
-            has_user,
-            confidence
-        ])
+    def _threat_to_state(self, threat: Union[ThreatEvent, TrainingThreat]) -> np.ndarray:
+        """
+        Convert threat to state vector
+        Returns the env's reusable float32 buffer; copy it if it must outlive the next call
+        """
+        state = self._state_buf
+        state[0] = SEVERITY_ENCODING.get(threat.severity, 0.5)
+        state[1] = THREAT_TYPE_ENCODING.get(threat.threat_type, 0.2)
+        ml_score = threat.ml_score
+        state[2] = 0.5 if ml_score is None else ml_score  # ML score (normalized); 0.0 is a real score
+        state[3] = 1.0 if threat.source_pod else 0.0  # Has pod
+        state[4] = 1.0 if threat.source_user else 0.0  # Has user
+        state[5] = threat.confidence if threat.confidence else 0.5  # Confidence (from threat or default)
+        return state
     
     def _action_to_type(self, action: int) -> ActionType:
         """Convert action integer to ActionType"""
-        action_map = {
-            0: ActionType.MONITOR,
-            1: ActionType.LOG,
-            2: ActionType.ALERT,
-            3: ActionType.ISOLATE_POD,
-            4: ActionType.TERMINATE_POD,
-            5: ActionType.BLOCK_NETWORK,
-            6: ActionType.TERMINATE_PROCESS,
-            7: ActionType.ESCALATE
-        }
-        return action_map.get(action, ActionType.MONITOR)
+        return ACTION_TYPES[action] if 0 <= action < len(ACTION_TYPES) else ActionType.MONITOR
     
-    def _calculate_reward(self, action: ActionType, threat: ThreatEvent) -> float:
-        """
-        Calculate reward based on action appropriateness
-        
-        Reward structure:
-        - High reward for appropriate actions
-        - Negative reward for over-reaction (terminating low-risk threats)
-        - Negative reward for under-reaction (monitoring critical threats)
-        - Small penalty for escalation (prefer autonomous action when safe)
-        """
-        severity = threat.severity
-        threat_type = threat.threat_type
-        
-        # Base rewards for actions
-        action_rewards = {
-            ActionType.MONITOR: 0.1,
-            ActionType.LOG: 0.2,
-            ActionType.ALERT: 0.5,
-            ActionType.ISOLATE_POD: 0.7,
-            ActionType.TERMINATE_POD: 0.9,
-            ActionType.BLOCK_NETWORK: 0.6,
-            ActionType.TERMINATE_PROCESS: 0.8,
-            ActionType.ESCALATE: 0.3  # Penalty for requiring human
-        }
-        
-        base_reward = action_rewards.get(action, 0.0)
-        
-        # Adjust based on threat severity
-        if severity == ThreatSeverity.CRITICAL:
-            if action in [ActionType.TERMINATE_POD, ActionType.ISOLATE_POD]:
-                reward = 1.0  # Correct action
-            elif action == ActionType.MONITOR:
-                reward = -1.0  # Under-reaction
-            else:
-                reward = 0.3  # Suboptimal
-        elif severity == ThreatSeverity.HIGH:
-            if action in [ActionType.ISOLATE_POD, ActionType.ALERT]:
-                reward = 0.8
-            elif action == ActionType.TERMINATE_POD:
-                reward = 0.6  # Slightly over-reactive
-            elif action == ActionType.MONITOR:
-                reward = -0.5
-            else:
-                reward = base_reward
-        elif severity == ThreatSeverity.MEDIUM:
-            if action == ActionType.ALERT:
-                reward = 0.7
-            elif action in [ActionType.TERMINATE_POD, ActionType.ISOLATE_POD]:
-                reward = -0.3  # Over-reaction
-            else:
-                reward = base_reward
-        else:  # LOW
-            if action in [ActionType.MONITOR, ActionType.LOG]:
-                reward = 0.6
-            elif action in [ActionType.TERMINATE_POD, ActionType.ISOLATE_POD]:
-                reward = -0.8  # Severe over-reaction
-            else:
-                reward = base_reward
-        
-        # Bonus for reverse shell detection
-        if threat_type == ThreatType.REVERSE_SHELL and action == ActionType.TERMINATE_POD:
-            reward += 0.2
-        
-        # Normalize reward to [-1, 1]
-        return np.clip(reward, -1.0, 1.0)
+    def _calculate_reward(self, action: ActionType, threat: Union[ThreatEvent, TrainingThreat]) -> float:
+        """Reward for taking action on threat, looked up from REWARD_TABLE (see _reward_rule)"""
+        return float(REWARD_TABLE[
+            ACTION_INDEX[action],
+            SEVERITY_INDEX[threat.severity],
+            THREAT_TYPE_INDEX[threat.threat_type]
+        ])
     
-    def _generate_random_threat(self) -> ThreatEvent:
+    def _generate_random_threat(self) -> TrainingThreat:
         """Generate a random threat for training"""
-        import random
-        
-        severities = list(ThreatSeverity)
-        threat_types = list(ThreatType)
-        
-        threat = ThreatEvent(
-            severity=random.choice(severities),
-            threat_type=random.choice(threat_types),
-            source_pod=f"pod-{random.randint(1, 100)}" if random.random() > 0.2 else None,
-            source_user=f"user-{random.randint(1, 10)}" if random.random() > 0.3 else None,
+        return TrainingThreat(
+            severity=SEVERITIES[random.randrange(len(SEVERITIES))],
+            threat_type=THREAT_TYPES[random.randrange(len(THREAT_TYPES))],
+            source_pod=POD_NAMES[random.randrange(len(POD_NAMES))] if random.random() > 0.2 else None,
+            source_user=USER_NAMES[random.randrange(len(USER_NAMES))] if random.random() > 0.3 else None,
             ml_score=random.uniform(0.0, 1.0),
-            confidence=random.uniform(0.0, 1.0),
-            description="Training threat"
+            confidence=random.uniform(0.0, 1.0)
         )
-        
-        return threat
@@ -2,24 +2,70 @@
 RL Service - Reinforcement Learning Agent
 Uses stable-baselines3 for autonomous decision-making
 """
-from typing import Optional
+from typing import List, Optional, Tuple
+import asyncio
 import os
-from app.models.threat_event import ThreatEvent, ThreatType
+import numpy as np
+from app.models.threat_event import ThreatEvent, ThreatSeverity, ThreatType
 from app.models.remediation_action import RemediationAction, ActionType, RiskLevel
 from app.services.rl_env import CyberSecurityEnv
 from app.utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+_CONFIRMATION_RISK_LEVELS = frozenset({RiskLevel.MEDIUM, RiskLevel.HIGH})
+
+
+def _rule_table(severity_rules, threat_type_rules):
+    """Every (severity, threat type) pair mapped to (action, risk, confidence, requires confirmation)"""
+    table = {}
+    for severity in ThreatSeverity:
+        for threat_type in ThreatType:
+            action_type, risk_level, confidence = (
+                threat_type_rules.get((severity, threat_type)) or severity_rules[severity]
+            )
+            table[(severity, threat_type)] = (
+                action_type, risk_level, confidence, risk_level in _CONFIRMATION_RISK_LEVELS
+            )
+    return table
+
 
 class RLService:
     """Reinforcement Learning service for autonomous threat response"""
     
+    # Rule-based decisions (Decision: Option B - Moderate) as (action, risk, confidence) per severity
+    SEVERITY_RULES = {
+        ThreatSeverity.CRITICAL: (ActionType.ISOLATE_POD, RiskLevel.MEDIUM, 0.8),
+        ThreatSeverity.HIGH: (ActionType.ALERT, RiskLevel.LOW, 0.7),
+        ThreatSeverity.MEDIUM: (ActionType.ALERT, RiskLevel.LOW, 0.6),
+        ThreatSeverity.LOW: (ActionType.LOG, RiskLevel.LOW, 0.5)
+    }
+    
+    # Overrides for the most dangerous threat types at a given severity
+    THREAT_TYPE_RULES = {
+        (ThreatSeverity.CRITICAL, ThreatType.REVERSE_SHELL): (ActionType.TERMINATE_POD, RiskLevel.HIGH, 0.9),  # Requires confirmation
+        (ThreatSeverity.HIGH, ThreatType.REVERSE_SHELL): (ActionType.ISOLATE_POD, RiskLevel.MEDIUM, 0.75),
+        (ThreatSeverity.HIGH, ThreatType.CONTAINER_ESCAPE): (ActionType.ISOLATE_POD, RiskLevel.MEDIUM, 0.75)
+    }
+    
+    # Both rule tables flattened once, so a rule-based decision is a single lookup
+    RULE_TABLE = _rule_table(SEVERITY_RULES, THREAT_TYPE_RULES)
+    
+    # Hashed membership tests for the action-building hot path
+    POD_ACTIONS = frozenset({ActionType.TERMINATE_POD, ActionType.ISOLATE_POD})
+    CONFIRMATION_RISK_LEVELS = _CONFIRMATION_RISK_LEVELS
+    
+    # Concurrent RL decisions arriving within BATCH_WINDOW seconds share one predict call
+    BATCH_WINDOW = 0.005
+    MAX_BATCH_SIZE = 64
+    
     def __init__(self):
         self.agent = None
         self.env = None
         self.initialized = False
         self.use_rl_agent = os.getenv("USE_RL_AGENT", "false").lower() == "true"
+        self._pending: List[Tuple[ThreatEvent, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
     
     async def initialize(self):
         """Initialize RL agent"""
@@ -34,6 +80,11 @@ class RLService:
                     model_path = os.getenv("RL_MODEL_PATH", "models/rl_agent.zip")
                     if os.path.exists(model_path):
                         self.agent = PPO.load(model_path, env=self.env)
+                        # One throwaway prediction so the first real threat doesn't pay torch's first-call cost
+                        self.agent.predict(
+                            np.zeros(self.env.observation_space.shape, dtype=np.float32),
+                            deterministic=True
+                        )
                         logger.info("RL Service initialized (trained PPO agent)")
                     else:
                         logger.warning("RL model not found, using rule-based agent")
@@ -48,6 +99,7 @@ class RLService:
             if not self.use_rl_agent:
                 logger.info("RL Service initialized (rule-based agent)")
             
+            self._bind_decide_action()
             self.initialized = True
         except Exception as e:
             logger.error(f"Error initializing RL service: {e}", exc_info=True)
@@ -59,86 +111,106 @@ class RLService:
         Uses RL agent if available, otherwise falls back to rule-based logic
         """
         if self.use_rl_agent and self.agent is not None:
-            # Use RL agent for decision
-            return await self._decide_with_rl(threat)
+            # Use RL agent for decision, micro-batched with concurrent callers
+            return await self._decide_batched(threat)
         else:
             # Fall back to rule-based logic
             return await self._decide_with_rules(threat)
     
-    async def _decide_with_rl(self, threat: ThreatEvent) -> RemediationAction:
-        """Decide action using trained RL agent"""
-        try:
-            # Convert threat to state
-            state = self.env._threat_to_state(threat)
-            
-            # Get action from agent
-            action_int, _ = self.agent.predict(state, deterministic=True)
-            action_type = self.env._action_to_type(int(action_int))
-            
-            # Calculate confidence based on agent's action probability
-            # For now, use ML score and threat characteristics
-            confidence = 0.7
-            if threat.ml_score:
-                confidence = min(1.0, 0.7 + (threat.ml_score * 0.3))
-            
-            # Determine risk level based on action type
-            risk_level = RiskLevel.LOW
-            if action_type in [ActionType.TERMINATE_POD, ActionType.ISOLATE_POD]:
-                risk_level = RiskLevel.HIGH if threat.severity.value == "critical" else RiskLevel.MEDIUM
-            elif action_type == ActionType.ESCALATE:
-                risk_level = RiskLevel.HIGH
-            
-            action = RemediationAction(
-                threat_id=threat.id,
-                action_type=action_type,
-                risk_level=risk_level,
-                confidence=confidence,
-                ml_score=threat.ml_score,
-                requires_confirmation=(risk_level in [RiskLevel.MEDIUM, RiskLevel.HIGH])
+    def _bind_decide_action(self) -> None:
+        """Point decide_action straight at the chosen path; the agent doesn't change after initialize"""
+        if self.use_rl_agent and self.agent is not None:
+            self.decide_action = self._decide_batched
+        else:
+            self.decide_action = self._decide_with_rules
+    
+    async def _decide_batched(self, threat: ThreatEvent) -> RemediationAction:
+        """Queue a threat for the next batched RL prediction and wait for its action"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((threat, future))
+        if len(self._pending) >= self.MAX_BATCH_SIZE:
+            await self._flush_pending()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.BATCH_WINDOW, lambda: asyncio.ensure_future(self._flush_pending())
             )
+        return await future
+    
+    async def decide_actions(self, threats: List[ThreatEvent]) -> List[RemediationAction]:
+        """Decide actions for many threats, with a single batched predict when the RL agent is loaded"""
+        if not threats:
+            return []
+        if self.use_rl_agent and self.agent is not None:
+            return await self._decide_with_rl(threats)
+        return [await self._decide_with_rules(threat) for threat in threats]
+    
+    async def _flush_pending(self) -> None:
+        """Decide every queued threat in one batch and resolve the waiting callers"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        actions = await self._decide_with_rl([threat for threat, _ in pending])
+        for (_, future), action in zip(pending, actions):
+            if not future.done():
+                future.set_result(action)
+    
+    async def _decide_with_rl(self, threats: List[ThreatEvent]) -> List[RemediationAction]:
+        """Decide actions using trained RL agent"""
+        try:
+            # Convert threats to a (batch, 6) state array (_threat_to_state reuses one buffer, so copy each row)
+            states = np.empty((len(threats),) + self.env.observation_space.shape, dtype=np.float32)
+            for row, threat in zip(states, threats):
+                row[:] = self.env._threat_to_state(threat)
             
-            return action
+            # Get actions from agent
+            action_ints, _ = self.agent.predict(states, deterministic=True)
+            return [
+                self._rl_action(threat, self.env._action_to_type(int(action_int)))
+                for threat, action_int in zip(threats, np.ravel(action_ints))
+            ]
         except Exception as e:
             logger.error(f"Error in RL decision: {e}, falling back to rules", exc_info=True)
-            return await self._decide_with_rules(threat)
+            return [await self._decide_with_rules(threat) for threat in threats]
     
-    async def _decide_with_rules(self, threat: ThreatEvent) -> RemediationAction:
-        """Decide action using rule-based logic"""
-        action_type = ActionType.MONITOR
+    def _rl_action(self, threat: ThreatEvent, action_type: ActionType) -> RemediationAction:
+        """Build the remediation action for an RL-chosen action type"""
+        # Calculate confidence based on agent's action probability
+        # For now, use ML score and threat characteristics
+        confidence = 0.7
+        ml_score = threat.ml_score
+        if ml_score is not None:
+            confidence = min(1.0, 0.7 + (ml_score * 0.3))
+        
+        # Determine risk level based on action type
         risk_level = RiskLevel.LOW
-        confidence = 0.5
+        if action_type in self.POD_ACTIONS:
+            risk_level = RiskLevel.HIGH if threat.severity == ThreatSeverity.CRITICAL else RiskLevel.MEDIUM
+        elif action_type == ActionType.ESCALATE:
+            risk_level = RiskLevel.HIGH
         
-        # Rule-based logic (Decision: Option B - Moderate)
-        if threat.severity.value == "critical":
-            if threat.threat_type == ThreatType.REVERSE_SHELL:
-                action_type = ActionType.TERMINATE_POD
-                risk_level = RiskLevel.HIGH  # Requires confirmation
-                confidence = 0.9
-            else:
-                action_type = ActionType.ISOLATE_POD
-                risk_level = RiskLevel.MEDIUM
-                confidence = 0.8
-        elif threat.severity.value == "high":
-            if threat.threat_type in [ThreatType.REVERSE_SHELL, ThreatType.CONTAINER_ESCAPE]:
-                action_type = ActionType.ISOLATE_POD
-                risk_level = RiskLevel.MEDIUM
-                confidence = 0.75
-            else:
-                action_type = ActionType.ALERT
-                risk_level = RiskLevel.LOW
-                confidence = 0.7
-        elif threat.severity.value == "medium":
-            action_type = ActionType.ALERT
-            risk_level = RiskLevel.LOW
-            confidence = 0.6
-        else:  # low
-            action_type = ActionType.LOG
-            risk_level = RiskLevel.LOW
-            confidence = 0.5
+        return RemediationAction(
+            threat_id=threat.id,
+            action_type=action_type,
+            risk_level=risk_level,
+            confidence=confidence,
+            ml_score=threat.ml_score,
+            requires_confirmation=(risk_level in self.CONFIRMATION_RISK_LEVELS)
+        )
+    
+    async def _decide_with_rules(self, threat: ThreatEvent) -> RemediationAction:
+        """Decide action using rule-based logic"""
+        # One lookup in the precomputed table instead of a chain of comparisons
+        action_type, risk_level, confidence, requires_confirmation = self.RULE_TABLE[
+            (threat.severity, threat.threat_type)
+        ]
         
         # Boost confidence with ML score if available
-        if threat.ml_score:
-            confidence = min(1.0, confidence + (threat.ml_score * 0.2))
+        ml_score = threat.ml_score
+        if ml_score is not None:
+            confidence = min(1.0, confidence + (ml_score * 0.2))
         
         action = RemediationAction(
             threat_id=threat.id,
@@ -146,7 +218,7 @@ class RLService:
             risk_level=risk_level,
             confidence=confidence,
             ml_score=threat.ml_score,
-            requires_confirmation=(risk_level in [RiskLevel.MEDIUM, RiskLevel.HIGH])
+            requires_confirmation=requires_confirmation
         )
         
         return action
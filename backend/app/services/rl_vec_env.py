@@ -0,0 +1,129 @@
+"""
+Vectorized RL Environment for Cybersecurity
+Steps many CyberSecurityEnv copies at once for faster PPO training
+"""
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence
+from stable_baselines3.common.vec_env import VecEnv
+from app.services.rl_env import (
+    ACTION_TYPES,
+    CyberSecurityEnv,
+    REWARD_TABLE,
+    SEVERITIES,
+    SEVERITY_LUT,
+    TERMINAL_ACTION_TYPES,
+    THREAT_TYPES,
+    THREAT_TYPE_LUT,
+)
+
+_TEMPLATE_ENV = CyberSecurityEnv()
+
+
+class BatchCyberSecurityEnv(VecEnv):
+    """
+    Structure-of-arrays version of CyberSecurityEnv as a stable-baselines3 VecEnv
+
+    Threats are sampled as columns with one NumPy call each and rewards come from a
+    precomputed table shared with CyberSecurityEnv, so a step over N envs costs a handful of array operations
+    """
+
+    # Actions that end an episode, as in CyberSecurityEnv.step
+    TERMINAL_ACTIONS = np.array([action in TERMINAL_ACTION_TYPES for action in ACTION_TYPES])
+
+    REWARDS = REWARD_TABLE.astype(np.float32)
+
+    def __init__(self, num_envs: int = 8, seed: Optional[int] = None):
+        self.render_mode = None
+        super().__init__(num_envs, _TEMPLATE_ENV.observation_space, _TEMPLATE_ENV.action_space)
+        self.action_names = [action.value for action in ACTION_TYPES]
+
+        self._rng = np.random.default_rng(seed)
+        self._severity_idx = np.zeros(num_envs, dtype=np.intp)
+        self._threat_type_idx = np.zeros(num_envs, dtype=np.intp)
+        self._states = np.zeros((num_envs, 6), dtype=np.float32)
+        self._actions = np.zeros(num_envs, dtype=np.intp)
+
+    def _sample(self, rows) -> None:
+        """Draw fresh random threats into the given rows (same distribution as CyberSecurityEnv)"""
+        n = len(self._states[rows])
+        severity_idx = self._rng.integers(0, len(SEVERITIES), n)
+        threat_type_idx = self._rng.integers(0, len(THREAT_TYPES), n)
+        self._severity_idx[rows] = severity_idx
+        self._threat_type_idx[rows] = threat_type_idx
+        self._states[rows] = np.column_stack([
+            SEVERITY_LUT[severity_idx],
+            THREAT_TYPE_LUT[threat_type_idx],
+            self._rng.random(n, dtype=np.float32),  # ML score
+            self._rng.random(n) > 0.2,  # Has pod
+            self._rng.random(n) > 0.3,  # Has user
+            self._rng.random(n, dtype=np.float32),  # Confidence
+        ])
+
+    def reset(self) -> np.ndarray:
+        """Reset all environments and return the initial observations"""
+        if self._seeds[0] is not None:
+            self._rng = np.random.default_rng(self._seeds[0])
+        self._reset_seeds()
+        self._reset_options()
+        self._sample(slice(None))
+        return self._states.copy()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        """Store actions for the next step_wait"""
+        self._actions = np.asarray(actions, dtype=np.intp).reshape(self.num_envs)
+
+    def step_wait(self):
+        """Score the stored actions and draw the next threats"""
+        actions = self._actions
+        rewards = self.REWARDS[actions, self._severity_idx, self._threat_type_idx]
+        dones = self.TERMINAL_ACTIONS[actions]
+
+        # Every step moves on to a new threat; finished envs then reset to another
+        self._sample(slice(None))
+        terminal_states = self._states[dones].copy()
+        if dones.any():
+            self._sample(dones)
+
+        infos: List[Dict[str, Any]] = [
+            {
+                "action": self.action_names[action],
+                "threat_type": THREAT_TYPES[threat_type].value,
+                "severity": SEVERITIES[severity].value
+            }
+            for action, threat_type, severity in zip(
+                actions.tolist(), self._threat_type_idx.tolist(), self._severity_idx.tolist()
+            )
+        ]
+        for i, terminal_state in zip(np.flatnonzero(dones), terminal_states):
+            infos[i]["terminal_observation"] = terminal_state
+            infos[i]["TimeLimit.truncated"] = False
+
+        return self._states.copy(), rewards.copy(), dones, infos
+
+    def close(self) -> None:
+        """Nothing to release"""
+
+    def get_attr(self, attr_name: str, indices=None) -> List[Any]:
+        """Attributes are shared by all sub-environments"""
+        return [getattr(self, attr_name)] * len(self._get_indices(indices))
+
+    def set_attr(self, attr_name: str, value: Any, indices=None) -> None:
+        """Attributes are shared by all sub-environments"""
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> List[Any]:
+        """Call a method once per selected sub-environment"""
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> List[bool]:
+        """Sub-environments are never wrapped"""
+        return [False] * len(self._get_indices(indices))
+
+    def _get_indices(self, indices) -> Sequence[int]:
+        """Normalize VecEnv indices to a sequence"""
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
@@ -2,13 +2,26 @@
 Shared Storage Module
 Database-backed storage with fallback to in-memory for compatibility
 """
-from typing import List, Optional
-from app.models.threat_event import ThreatEvent
-from app.models.remediation_action import RemediationAction
-from app.database.connection import get_db, init_db, SessionLocal
+import asyncio
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+from typing import Awaitable, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID
+from app.models.threat_event import ThreatEvent, ThreatSeverity, ThreatType
+from app.models.remediation_action import RemediationAction, ActionType
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.database.connection import get_db, init_db, engine, SessionLocal, AsyncSessionLocal
 from app.database.models import ThreatEventDB, RemediationActionDB
+from app.utils.logging import get_logger
 import os
 
+logger = get_logger(__name__)
+
 # Use database if DATABASE_URL is set, otherwise use in-memory
 USE_DATABASE = os.getenv("DATABASE_URL") is not None
 
@@ -17,124 +30,637 @@ if USE_DATABASE:
     try:
         init_db()
     except Exception as e:
-        print(f"⚠️  Database initialization failed: {e}, falling back to in-memory storage")
+        logger.warning("Database initialization failed: %s, falling back to in-memory storage", e, exc_info=True)
         USE_DATABASE = False
 
+# The batch writers and resolve endpoint need the async engine; without it, stay in memory
+if USE_DATABASE and AsyncSessionLocal is None:
+    logger.warning("Async database engine unavailable, falling back to in-memory storage")
+    USE_DATABASE = False
+
 # Fallback in-memory storage for compatibility
 _threats_db: List[ThreatEvent] = []
-_actions_db: List[RemediationAction] = []
+
+# Actions are capped; the oldest are evicted (with their index entries) once full
+ACTIONS_MAXLEN = 100_000
+_actions_db: Deque[RemediationAction] = deque(maxlen=ACTIONS_MAXLEN)
+
+# ID indexes over the in-memory lists for O(1) lookups
+_threats_by_id: Dict[UUID, ThreatEvent] = {}
+_actions_by_id: Dict[UUID, RemediationAction] = {}
+
+# Filter buckets for the list endpoints (insertion-ordered dicts keyed by ID)
+_threats_by_severity: Dict[ThreatSeverity, Dict[UUID, ThreatEvent]] = defaultdict(dict)
+_threats_by_type: Dict[ThreatType, Dict[UUID, ThreatEvent]] = defaultdict(dict)
+_threats_by_resolved: Dict[bool, Dict[UUID, ThreatEvent]] = defaultdict(dict)
+_actions_by_type: Dict[ActionType, Dict[UUID, RemediationAction]] = defaultdict(dict)
+_actions_by_executed: Dict[bool, Dict[UUID, RemediationAction]] = defaultdict(dict)
+
+# Serialized JSON per in-memory threat, reused by list responses until mutated
+_threat_json: Dict[UUID, bytes] = {}
+
+# Short-lived cache of get_threats_db() results in database mode, dropped whenever threats change
+THREATS_CACHE_TTL = 1.0  # seconds
+_threats_version = 0
+_threats_cache: Optional[Tuple[int, float, List[ThreatEvent]]] = None
+
+# Write-behind queue for database inserts, drained in batches by a background task
+THREAT_BATCH_SIZE = 500
+THREAT_FLUSH_INTERVAL = 0.1  # seconds
+_threat_write_queue: Optional[asyncio.Queue] = None
+_threat_writer: Optional[asyncio.Task] = None
+
+# Queued threats by ID until their batch commits, so they can be read and resolved right away
+_pending_threats: Dict[UUID, ThreatEvent] = {}
+
+# Same write-behind batching for remediation actions
+ACTION_BATCH_SIZE = 500
+ACTION_FLUSH_INTERVAL = 0.1  # seconds
+_action_write_queue: Optional[asyncio.Queue] = None
+_action_writer: Optional[asyncio.Task] = None
+
+
+@contextmanager
+def _session(db: Optional[Session] = None) -> Iterator[Session]:
+    """Use the caller's request-scoped session, or open a short-lived one and close it after"""
+    if db is not None:
+        yield db
+        return
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_request_db() -> Iterator[Optional[Session]]:
+    """FastAPI dependency: one session per request in database mode, None for in-memory storage"""
+    if not USE_DATABASE:
+        yield None
+        return
+    yield from get_db()
+
+
+def _commit(session: Session, db: Optional[Session]) -> None:
+    """Commit a session we opened; a request-scoped session is only flushed and committed by its owner"""
+    if db is None:
+        session.commit()
+    else:
+        session.flush()
+
+
+def invalidate_threats_cache() -> None:
+    """Drop cached get_threats_db() results after threats are added, changed or removed"""
+    global _threats_version, _threats_cache
+    _threats_version += 1
+    _threats_cache = None
 
 
-def get_threats_db() -> List[ThreatEvent]:
-    """Get threats from database or in-memory storage"""
+def get_threats_db(db: Optional[Session] = None) -> List[ThreatEvent]:
+    """Get threats from database or in-memory storage (database reads are cached for THREATS_CACHE_TTL)"""
+    global _threats_cache
     if USE_DATABASE:
+        cached = _threats_cache
+        if (
+            cached is not None
+            and cached[0] == _threats_version
+            and time.monotonic() - cached[1] < THREATS_CACHE_TTL
+        ):
+            return list(cached[2])
+        version = _threats_version
         try:
-            db = SessionLocal()
-            try:
-                threats = db.query(ThreatEventDB).all()
-                return [threat.to_pydantic() for threat in threats]
-            finally:
-                db.close()
+            with _session(db) as session:
+                threats = session.query(ThreatEventDB).all()
+                result = [threat.to_pydantic() for threat in threats]
+            if version == _threats_version:
+                _threats_cache = (version, time.monotonic(), result)
+            return list(result)
         except Exception as e:
-            print(f"⚠️  Database query failed: {e}, using in-memory storage")
+            logger.warning("Database query failed: %s, using in-memory storage", e, exc_info=True)
             return _threats_db
     return _threats_db
 
 
-def get_actions_db() -> List[RemediationAction]:
+def get_actions_db(db: Optional[Session] = None) -> Iterable[RemediationAction]:
     """Get actions from database or in-memory storage"""
     if USE_DATABASE:
         try:
-            db = SessionLocal()
-            try:
-                actions = db.query(RemediationActionDB).all()
+            with _session(db) as session:
+                actions = session.query(RemediationActionDB).all()
                 return [action.to_pydantic() for action in actions]
-            finally:
-                db.close()
         except Exception as e:
-            print(f"⚠️  Database query failed: {e}, using in-memory storage")
+            logger.warning("Database query failed: %s, using in-memory storage", e, exc_info=True)
             return _actions_db
     return _actions_db
 
 
-def add_threat(threat: ThreatEvent) -> None:
-    """Add threat to database or in-memory storage"""
+def get_threat_by_id(threat_id: UUID, db: Optional[Session] = None) -> Optional[ThreatEvent]:
+    """Get a single threat by ID from database or in-memory storage"""
     if USE_DATABASE:
+        pending = _pending_threats.get(threat_id)
+        if pending is not None:
+            return pending
         try:
-            db = SessionLocal()
-            try:
-                threat_db = ThreatEventDB(
-                    id=threat.id,
-                    detected_at=threat.detected_at,
-                    severity=threat.severity,
-                    threat_type=threat.threat_type,
-                    source_pod=threat.source_pod,
-                    source_namespace=threat.source_namespace,
-                    source_container=threat.source_container,
-                    source_user=threat.source_user,
-                    description=threat.description,
-                    falco_output=threat.falco_output,
-                    falco_rule=threat.falco_rule,
-                    falco_priority=threat.falco_priority,
-                    ml_score=threat.ml_score,
-                    confidence=threat.confidence,
-                    raw_event=threat.raw_event,
-                    resolved=threat.resolved,
-                    resolved_at=threat.resolved_at
-                )
-                db.add(threat_db)
-                db.commit()
-            finally:
-                db.close()
+            with _session(db) as session:
+                threat = session.get(ThreatEventDB, threat_id)
+                return threat.to_pydantic() if threat else None
+        except Exception as e:
+            logger.warning("Database query failed: %s, using in-memory storage", e, exc_info=True)
+    return _threats_by_id.get(threat_id)
+
+
+def get_action_by_id(action_id: UUID, db: Optional[Session] = None) -> Optional[RemediationAction]:
+    """Get a single action by ID from database or in-memory storage"""
+    if USE_DATABASE:
+        try:
+            with _session(db) as session:
+                action = session.get(RemediationActionDB, action_id)
+                return action.to_pydantic() if action else None
+        except Exception as e:
+            logger.warning("Database query failed: %s, using in-memory storage", e, exc_info=True)
+    return _actions_by_id.get(action_id)
+
+
+def _count_rows(model, fallback, db: Optional[Session]) -> int:
+    """SELECT COUNT(*) for a table, or the in-memory length"""
+    if USE_DATABASE:
+        try:
+            with _session(db) as session:
+                return session.scalar(select(func.count()).select_from(model))
+        except Exception as e:
+            logger.warning("Database query failed: %s, using in-memory storage", e, exc_info=True)
+    return len(fallback)
+
+
+def _threat_order(reverse: bool = False) -> tuple:
+    """ORDER BY for threats: oldest detection first, matching in-memory insertion order"""
+    if reverse:
+        return (ThreatEventDB.detected_at.desc(),)
+    return (ThreatEventDB.detected_at.asc(),)
+
+
+def _action_order(reverse: bool = False) -> tuple:
+    """ORDER BY for actions: earliest executed first, pending actions last, then id"""
+    if reverse:
+        return (RemediationActionDB.executed_at.desc().nulls_first(), RemediationActionDB.id.desc())
+    return (RemediationActionDB.executed_at.asc().nulls_last(), RemediationActionDB.id.asc())
+
+
+def _row_at(model, order: Callable[..., tuple], fallback, index: int, db: Optional[Session]):
+    """Fetch the row at a position with OFFSET/LIMIT instead of loading the table"""
+    if USE_DATABASE:
+        # Negative indexes count back from the end, so read the reversed order
+        reverse = index < 0
+        stmt = select(model).order_by(*order(reverse)).offset(-index - 1 if reverse else index).limit(1)
+        try:
+            with _session(db) as session:
+                row = session.scalars(stmt).first()
+        except Exception as e:
+            logger.warning("Database query failed: %s, using in-memory storage", e, exc_info=True)
+        else:
+            if row is None:
+                raise IndexError("index out of range")
+            return row.to_pydantic()
+    return fallback[index]
+
+
+def _stream_rows(model, order: Callable[..., tuple], fallback, batch_size: int, db: Optional[Session]) -> Iterator:
+    """Yield rows converted one at a time, fetching batch_size rows per round-trip"""
+    if USE_DATABASE:
+        streamed = False
+        try:
+            with _session(db) as session:
+                stmt = select(model).order_by(*order()).execution_options(yield_per=batch_size)
+                for row in session.scalars(stmt):
+                    streamed = True
+                    yield row.to_pydantic()
             return
         except Exception as e:
-            print(f"⚠️  Database insert failed: {e}, using in-memory storage")
-    _threats_db.append(threat)
+            if streamed:
+                raise  # Part of the table was already yielded; don't mix in the fallback
+            logger.warning("Database query failed: %s, using in-memory storage", e, exc_info=True)
+    yield from list(fallback)
 
 
-def add_action(action: RemediationAction) -> None:
-    """Add action to database or in-memory storage"""
+def count_threats(db: Optional[Session] = None) -> int:
+    """Number of stored threats"""
+    return _count_rows(ThreatEventDB, _threats_db, db)
+
+
+def count_actions(db: Optional[Session] = None) -> int:
+    """Number of stored actions"""
+    return _count_rows(RemediationActionDB, _actions_db, db)
+
+
+def stream_threats(batch_size: int = 500, db: Optional[Session] = None) -> Iterator[ThreatEvent]:
+    """Iterate over all threats without materializing the whole table"""
+    return _stream_rows(ThreatEventDB, _threat_order, _threats_db, batch_size, db)
+
+
+def stream_actions(batch_size: int = 500, db: Optional[Session] = None) -> Iterator[RemediationAction]:
+    """Iterate over all actions without materializing the whole table"""
+    return _stream_rows(RemediationActionDB, _action_order, _actions_db, batch_size, db)
+
+
+def _take(items: Iterable, predicate: Callable, limit: int) -> list:
+    """Collect up to `limit` items matching predicate, stopping early"""
+    result = []
+    for item in items:
+        if predicate(item):
+            result.append(item)
+            if len(result) >= limit:
+                break
+    return result
+
+
+def query_threats(
+    severity: Optional[ThreatSeverity] = None,
+    threat_type: Optional[ThreatType] = None,
+    resolved: Optional[bool] = None,
+    limit: int = 100,
+    db: Optional[Session] = None
+) -> List[ThreatEvent]:
+    """
+    List threats matching the given filters
+    In-memory storage scans only the smallest matching bucket
+    """
+    def matches(t: ThreatEvent) -> bool:
+        return (
+            (severity is None or t.severity == severity)
+            and (threat_type is None or t.threat_type == threat_type)
+            and (resolved is None or t.resolved == resolved)
+        )
+    
+    if USE_DATABASE:
+        # Filter, order and limit in SQL so only returned rows are loaded
+        stmt = select(ThreatEventDB)
+        if severity is not None:
+            stmt = stmt.where(ThreatEventDB.severity == severity)
+        if threat_type is not None:
+            stmt = stmt.where(ThreatEventDB.threat_type == threat_type)
+        if resolved is not None:
+            stmt = stmt.where(ThreatEventDB.resolved == resolved)
+        stmt = stmt.order_by(*_threat_order()).limit(limit)
+        try:
+            with _session(db) as session:
+                return [threat.to_pydantic() for threat in session.execute(stmt).scalars()]
+        except Exception as e:
+            logger.warning("Database query failed: %s, using in-memory storage", e, exc_info=True)
+            return _take(_threats_db, matches, limit)
+    
+    buckets = []
+    if severity is not None:
+        buckets.append(_threats_by_severity[severity])
+    if threat_type is not None:
+        buckets.append(_threats_by_type[threat_type])
+    if resolved is not None:
+        buckets.append(_threats_by_resolved[resolved])
+    
+    if not buckets:
+        return _threats_db[:limit]
+    
+    return _take(min(buckets, key=len).values(), matches, limit)
+
+
+def query_actions(
+    action_type: Optional[ActionType] = None,
+    executed: Optional[bool] = None,
+    limit: int = 100,
+    db: Optional[Session] = None
+) -> List[RemediationAction]:
+    """
+    List actions matching the given filters
+    In-memory storage scans only the smallest matching bucket
+    """
+    def matches(a: RemediationAction) -> bool:
+        return (
+            (action_type is None or a.action_type == action_type)
+            and (executed is None or a.executed == executed)
+        )
+    
     if USE_DATABASE:
+        stmt = select(RemediationActionDB)
+        if action_type is not None:
+            stmt = stmt.where(RemediationActionDB.action_type == action_type)
+        if executed is not None:
+            stmt = stmt.where(RemediationActionDB.executed == executed)
+        stmt = stmt.order_by(*_action_order()).limit(limit)
         try:
-            db = SessionLocal()
+            with _session(db) as session:
+                return [action.to_pydantic() for action in session.execute(stmt).scalars()]
+        except Exception as e:
+            logger.warning("Database query failed: %s, using in-memory storage", e, exc_info=True)
+            return _take(_actions_db, matches, limit)
+    
+    buckets = []
+    if action_type is not None:
+        buckets.append(_actions_by_type[action_type])
+    if executed is not None:
+        buckets.append(_actions_by_executed[executed])
+    
+    if not buckets:
+        return list(islice(_actions_db, limit))
+    
+    return _take(min(buckets, key=len).values(), matches, limit)
+
+
+def resolve_pending_threat(threat_id: UUID) -> Optional[ThreatEvent]:
+    """Resolve a threat still waiting for the batch writer; its row is built from this object at flush"""
+    threat = _pending_threats.get(threat_id)
+    if threat is not None:
+        threat.resolved = True
+        threat.resolved_at = datetime.utcnow()
+    return threat
+
+
+def mark_threat_resolved(threat_id: UUID) -> Optional[ThreatEvent]:
+    """Mark an in-memory threat as resolved and move it between buckets"""
+    threat = _threats_by_id.get(threat_id)
+    if threat is None:
+        return None
+    
+    _threats_by_resolved[threat.resolved].pop(threat.id, None)
+    threat.resolved = True
+    threat.resolved_at = datetime.utcnow()
+    _threats_by_resolved[True][threat.id] = threat
+    invalidate_threat_json(threat.id)
+    invalidate_threats_cache()
+    return threat
+
+
+def threats_to_json(threats: List[ThreatEvent]) -> bytes:
+    """
+    Serialize threats to a JSON array
+    In-memory threats reuse their cached encoding
+    """
+    parts = []
+    for threat in threats:
+        encoded = None if USE_DATABASE else _threat_json.get(threat.id)
+        if encoded is None:
+            encoded = threat.model_dump_json().encode("utf-8")
+            if not USE_DATABASE:
+                _threat_json[threat.id] = encoded
+        parts.append(encoded)
+    return b"[" + b",".join(parts) + b"]"
+
+
+def invalidate_threat_json(threat_id: UUID) -> None:
+    """Drop the cached encoding after a threat is mutated"""
+    _threat_json.pop(threat_id, None)
+
+
+def _threat_row(threat: ThreatEvent) -> dict:
+    """Column values for a ThreatEventDB row"""
+    return threat.model_dump()
+
+
+def _index_threat(threat: ThreatEvent) -> None:
+    """Append a threat to in-memory storage and its indexes"""
+    _threats_db.append(threat)
+    _threats_by_id[threat.id] = threat
+    _threats_by_severity[threat.severity][threat.id] = threat
+    _threats_by_type[threat.threat_type][threat.id] = threat
+    _threats_by_resolved[threat.resolved][threat.id] = threat
+
+
+def add_threat(threat: ThreatEvent, db: Optional[Session] = None) -> None:
+    """Add threat to database or in-memory storage"""
+    if USE_DATABASE:
+        # Hand off to the batch writer when it is running and has room
+        if _threat_write_queue is not None:
             try:
-                action_db = RemediationActionDB(
-                    id=action.id,
-                    threat_id=action.threat_id,
-                    action_type=action.action_type,
-                    risk_level=action.risk_level,
-                    confidence=action.confidence,
-                    ml_score=action.ml_score,
-                    executed=action.executed,
-                    executed_at=action.executed_at,
-                    success=action.success,
-                    error_message=action.error_message,
-                    parameters=action.parameters,
-                    requires_confirmation=action.requires_confirmation,
-                    confirmed_by=action.confirmed_by,
-                    confirmed_at=action.confirmed_at
-                )
-                db.add(action_db)
-                db.commit()
-            finally:
-                db.close()
+                _threat_write_queue.put_nowait(threat)
+                _pending_threats[threat.id] = threat
+                return
+            except asyncio.QueueFull:
+                pass
+        try:
+            with _session(db) as session:
+                session.add(ThreatEventDB(**_threat_row(threat)))
+                _commit(session, db)
+            invalidate_threats_cache()
             return
         except Exception as e:
-            print(f"⚠️  Database insert failed: {e}, using in-memory storage")
+            logger.warning("Database insert failed: %s, using in-memory storage", e, exc_info=True)
+    _index_threat(threat)
+
+
+def _threat_insert():
+    """INSERT for threat rows; on PostgreSQL, rows whose ID already exists are skipped"""
+    if engine.dialect.name == "postgresql":
+        return pg_insert(ThreatEventDB).on_conflict_do_nothing(index_elements=[ThreatEventDB.id])
+    return insert(ThreatEventDB)
+
+
+def add_threats_bulk(threats: List[ThreatEvent], db: Optional[Session] = None) -> None:
+    """Add many threats with one batched INSERT and a single commit"""
+    if not threats:
+        return
+    if USE_DATABASE:
+        # Hand off to the batch writer while it has room; the rest is inserted here
+        if _threat_write_queue is not None:
+            for i, threat in enumerate(threats):
+                try:
+                    _threat_write_queue.put_nowait(threat)
+                except asyncio.QueueFull:
+                    threats = threats[i:]
+                    break
+                _pending_threats[threat.id] = threat
+            else:
+                return
+        try:
+            with _session(db) as session:
+                session.execute(_threat_insert(), [_threat_row(threat) for threat in threats])
+                _commit(session, db)
+            invalidate_threats_cache()
+            return
+        except Exception as e:
+            logger.warning("Database bulk insert failed: %s, using in-memory storage", e, exc_info=True)
+    for threat in threats:
+        _index_threat(threat)
+
+
+async def _flush_threats(batch: List[ThreatEvent]) -> None:
+    """Insert a batch of threats with a single executemany"""
+    rows = [_threat_row(threat) for threat in batch]
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(_threat_insert(), rows)
+            await db.commit()
+    except Exception as e:
+        logger.warning("Database batch insert failed: %s, using in-memory storage", e, exc_info=True)
+        for threat in batch:
+            _index_threat(threat)
+        return
+    finally:
+        for threat in batch:
+            _pending_threats.pop(threat.id, None)
+    
+    # Threats resolved while the insert was in flight were written unresolved; update them now
+    late = [threat for threat, row in zip(batch, rows) if threat.resolved and not row["resolved"]]
+    if late:
+        try:
+            async with AsyncSessionLocal() as db:
+                for threat in late:
+                    await db.execute(
+                        update(ThreatEventDB)
+                        .where(ThreatEventDB.id == threat.id)
+                        .values(resolved=True, resolved_at=threat.resolved_at)
+                    )
+                await db.commit()
+        except Exception as e:
+            logger.warning("Database resolve of flushed threats failed: %s", e, exc_info=True)
+    invalidate_threats_cache()
+
+
+async def _drain_write_queue(
+    queue: asyncio.Queue,
+    flush: Callable[[list], Awaitable[None]],
+    batch_size: int,
+    interval: float
+) -> None:
+    """Collect up to batch_size items or wait interval seconds, then flush; stops at a None sentinel"""
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        item = await queue.get()
+        if item is None:
+            break
+        batch = [item]
+        deadline = loop.time() + interval
+        while len(batch) < batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+        await flush(batch)
+
+
+async def _drain_threat_queue(queue: asyncio.Queue) -> None:
+    """Collect up to THREAT_BATCH_SIZE threats or wait THREAT_FLUSH_INTERVAL, then flush"""
+    await _drain_write_queue(queue, _flush_threats, THREAT_BATCH_SIZE, THREAT_FLUSH_INTERVAL)
+
+
+def start_threat_writer() -> None:
+    """Start batching database inserts (no-op for in-memory storage)"""
+    global _threat_write_queue, _threat_writer
+    if not USE_DATABASE or _threat_writer is not None:
+        return
+    _threat_write_queue = asyncio.Queue(maxsize=THREAT_BATCH_SIZE * 10)
+    _threat_writer = asyncio.create_task(_drain_threat_queue(_threat_write_queue))
+
+
+async def stop_threat_writer() -> None:
+    """Flush queued threats and stop the batch writer"""
+    global _threat_write_queue, _threat_writer
+    if _threat_writer is None:
+        return
+    queue, writer = _threat_write_queue, _threat_writer
+    # New threats go straight to the database from here on
+    _threat_write_queue = None
+    _threat_writer = None
+    # The None sentinel is queued behind pending threats, so they are flushed first
+    await queue.put(None)
+    await writer
+
+
+def _action_row(action: RemediationAction) -> dict:
+    """Column values for a RemediationActionDB row"""
+    return action.model_dump()
+
+
+def _index_action(action: RemediationAction) -> None:
+    """Append an action to in-memory storage and its indexes, evicting the oldest when full"""
+    if len(_actions_db) == _actions_db.maxlen:
+        oldest = _actions_db[0]
+        _actions_by_id.pop(oldest.id, None)
+        _actions_by_type[oldest.action_type].pop(oldest.id, None)
+        _actions_by_executed[oldest.executed].pop(oldest.id, None)
     _actions_db.append(action)
+    _actions_by_id[action.id] = action
+    _actions_by_type[action.action_type][action.id] = action
+    _actions_by_executed[action.executed][action.id] = action
+
+
+def add_action(action: RemediationAction, db: Optional[Session] = None) -> None:
+    """Add action to database or in-memory storage"""
+    if USE_DATABASE:
+        # Hand off to the batch writer when it is running and has room
+        if _action_write_queue is not None:
+            try:
+                _action_write_queue.put_nowait(action)
+                return
+            except asyncio.QueueFull:
+                pass
+        try:
+            with _session(db) as session:
+                session.add(RemediationActionDB(**_action_row(action)))
+                _commit(session, db)
+            return
+        except Exception as e:
+            logger.warning("Database insert failed: %s, using in-memory storage", e, exc_info=True)
+    _index_action(action)
+
+
+def add_actions_bulk(actions: List[RemediationAction], db: Optional[Session] = None) -> None:
+    """Add many actions with one batched INSERT and a single commit"""
+    if not actions:
+        return
+    if USE_DATABASE:
+        try:
+            with _session(db) as session:
+                session.execute(insert(RemediationActionDB), [_action_row(action) for action in actions])
+                _commit(session, db)
+            return
+        except Exception as e:
+            logger.warning("Database bulk insert failed: %s, using in-memory storage", e, exc_info=True)
+    for action in actions:
+        _index_action(action)
+
+
+async def _flush_actions(batch: List[RemediationAction]) -> None:
+    """Insert a batch of actions with a single executemany"""
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(RemediationActionDB), [_action_row(action) for action in batch])
+            await db.commit()
+    except Exception as e:
+        logger.warning("Database batch insert failed: %s, using in-memory storage", e, exc_info=True)
+        for action in batch:
+            _index_action(action)
+
+
+async def _drain_action_queue(queue: asyncio.Queue) -> None:
+    """Collect up to ACTION_BATCH_SIZE actions or wait ACTION_FLUSH_INTERVAL, then flush"""
+    await _drain_write_queue(queue, _flush_actions, ACTION_BATCH_SIZE, ACTION_FLUSH_INTERVAL)
 
 
-# For backward compatibility, expose as properties
-@property
-def threats_db() -> List[ThreatEvent]:
-    """Backward compatibility property for threats_db"""
-    return get_threats_db()
+def start_action_writer() -> None:
+    """Start batching action inserts (no-op for in-memory storage)"""
+    global _action_write_queue, _action_writer
+    if not USE_DATABASE or _action_writer is not None:
+        return
+    _action_write_queue = asyncio.Queue(maxsize=ACTION_BATCH_SIZE * 10)
+    _action_writer = asyncio.create_task(_drain_action_queue(_action_write_queue))
 
 
-@property
-def actions_db() -> List[RemediationAction]:
-    """Backward compatibility property for actions_db"""
-    return get_actions_db()
+async def stop_action_writer() -> None:
+    """Flush queued actions and stop the batch writer"""
+    global _action_write_queue, _action_writer
+    if _action_writer is None:
+        return
+    queue, writer = _action_write_queue, _action_writer
+    _action_write_queue = None
+    _action_writer = None
+    await queue.put(None)
+    await writer
 
 
 # Create module-level accessors that work with both database and in-memory
@@ -146,7 +672,7 @@ class Storage:
         return get_threats_db()
     
     @property
-    def actions_db(self) -> List[RemediationAction]:
+    def actions_db(self) -> Iterable[RemediationAction]:
         return get_actions_db()
     
     def append_threat(self, threat: ThreatEvent) -> None:
@@ -161,66 +687,72 @@ class ThreatsList:
     """List-like interface for threats"""
     
     def __iter__(self):
-        return iter(get_threats_db())
+        return stream_threats()
     
     def __len__(self):
-        return len(get_threats_db())
+        return count_threats()
     
     def __getitem__(self, index):
+        if isinstance(index, int):
+            return _row_at(ThreatEventDB, _threat_order, _threats_db, index, None)
         return get_threats_db()[index]
     
     def append(self, threat: ThreatEvent) -> None:
         add_threat(threat)
     
     def extend(self, threats: list) -> None:
-        for threat in threats:
-            add_threat(threat)
+        add_threats_bulk(list(threats))
     
     def clear(self) -> None:
         if USE_DATABASE:
             try:
-                db = SessionLocal()
-                try:
-                    db.query(ThreatEventDB).delete()
-                    db.commit()
-                finally:
-                    db.close()
-            except Exception:
-                pass
+                with _session() as session:
+                    session.query(ThreatEventDB).delete()
+                    session.commit()
+            except Exception as e:
+                logger.warning("Database clear failed: %s", e, exc_info=True)
         _threats_db.clear()
+        _pending_threats.clear()
+        _threats_by_id.clear()
+        _threats_by_severity.clear()
+        _threats_by_type.clear()
+        _threats_by_resolved.clear()
+        _threat_json.clear()
+        invalidate_threats_cache()
 
 
 class ActionsList:
     """List-like interface for actions"""
     
     def __iter__(self):
-        return iter(get_actions_db())
+        return stream_actions()
     
     def __len__(self):
-        return len(get_actions_db())
+        return count_actions()
     
     def __getitem__(self, index):
-        return get_actions_db()[index]
+        if isinstance(index, int):
+            return _row_at(RemediationActionDB, _action_order, _actions_db, index, None)
+        return list(get_actions_db())[index]
     
     def append(self, action: RemediationAction) -> None:
         add_action(action)
     
     def extend(self, actions: list) -> None:
-        for action in actions:
-            add_action(action)
+        add_actions_bulk(list(actions))
     
     def clear(self) -> None:
         if USE_DATABASE:
             try:
-                db = SessionLocal()
-                try:
-                    db.query(RemediationActionDB).delete()
-                    db.commit()
-                finally:
-                    db.close()
-            except Exception:
-                pass
+                with _session() as session:
+                    session.query(RemediationActionDB).delete()
+                    session.commit()
+            except Exception as e:
+                logger.warning("Database clear failed: %s", e, exc_info=True)
         _actions_db.clear()
+        _actions_by_id.clear()
+        _actions_by_type.clear()
+        _actions_by_executed.clear()
 
 
 # Export list-like objects for backward compatibility
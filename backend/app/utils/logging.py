@@ -1,19 +1,46 @@
 """
 Structured logging configuration
 """
+import atexit
 import logging
+import queue
 import sys
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from typing import Optional
-import json
-from datetime import datetime
+import orjson
+
+# Background listener that performs the actual log I/O
+_queue_listener: Optional[QueueListener] = None
+
+# Log files roll over at LOG_MAX_BYTES, keeping LOG_BACKUP_COUNT old files
+LOG_MAX_BYTES = 100_000_000
+LOG_BACKUP_COUNT = 10
 
 
 class JSONFormatter(logging.Formatter):
     """JSON formatter for structured logging"""
     
+    # Optional `extra` fields copied into the output when set
+    EXTRA_KEYS = ("request_id", "threat_id", "action_id")
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # UTC "YYYY-MM-DDTHH:MM:SS" for the most recent whole second, reused by records within it
+        self._ts_second = -1
+        self._ts_prefix = ""
+    
+    def _timestamp(self, record: logging.LogRecord) -> str:
+        """ISO-8601 UTC timestamp with milliseconds, built from record.created"""
+        second = int(record.created)
+        if second != self._ts_second:
+            self._ts_prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+            self._ts_second = second
+        return f"{self._ts_prefix}.{int(record.msecs):03d}Z"
+    
     def format(self, record: logging.LogRecord) -> str:
         log_data = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": self._timestamp(record),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -27,14 +54,32 @@ class JSONFormatter(logging.Formatter):
             log_data["exception"] = self.formatException(record.exc_info)
         
         # Add extra fields
-        if hasattr(record, "request_id"):
-            log_data["request_id"] = record.request_id
-        if hasattr(record, "threat_id"):
-            log_data["threat_id"] = record.threat_id
-        if hasattr(record, "action_id"):
-            log_data["action_id"] = record.action_id
+        fields = record.__dict__
+        for key in self.EXTRA_KEYS:
+            value = fields.get(key)
+            if value is not None:
+                log_data[key] = value
         
-        return json.dumps(log_data)
+        # orjson handles UUIDs and numbers natively; anything else falls back to str()
+        return orjson.dumps(log_data, default=str).decode("utf-8")
+
+
+class RecordQueueHandler(QueueHandler):
+    """Queue records as-is so the listener's formatter still sees exc_info and extras"""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _stop_queue_listener() -> None:
+    """Flush queued records and stop the background listener"""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+atexit.register(_stop_queue_listener)
 
 
 def setup_logging(
@@ -62,24 +107,32 @@ def setup_logging(
         )
     
     # Setup root logger
+    global _queue_listener
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
     
     # Remove existing handlers
+    _stop_queue_listener()
     root_logger.handlers.clear()
     
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(log_level)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+    handlers = [console_handler]
     
-    # File handler if specified
+    # Rotating file handler if specified
     if log_file:
-        file_handler = logging.FileHandler(log_file)
+        file_handler = RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
         file_handler.setLevel(log_level)
         file_handler.setFormatter(formatter)
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    # Loggers only enqueue records; a background thread does the blocking writes
+    log_queue = queue.SimpleQueue()
+    root_logger.addHandler(RecordQueueHandler(log_queue))
+    _queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
     
     # Set levels for third-party loggers
     logging.getLogger("uvicorn").setLevel(logging.WARNING)
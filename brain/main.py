@@ -1,26 +1,61 @@
+import asyncio
+import functools
+import re
 from fastapi import FastAPI, Request
 from kubernetes import client, config
 
-try:
-    config.load_kube_config()
-    v1 = client.CoreV1Api()
-except:
-    v1 = None  # fallback if kube config issue
-
 app = FastAPI(title="SentinelForge – Baby FRIDAY")
 
+# Keywords compiled once into a single case-insensitive pattern; same substring matching as before
+SHELL_PATTERN = re.compile(r"reverse shell|nc|shell", re.IGNORECASE)
+
+@functools.lru_cache(maxsize=None)
+def get_v1():
+    # Loaded on first use so importing the app never needs a kubeconfig
+    try:
+        config.load_kube_config()
+        return client.CoreV1Api()
+    except Exception:
+        return None  # fallback if kube config issue
+
+# Pods waiting to be deleted by the background worker; names are deduped while in flight
+delete_queue: asyncio.Queue = asyncio.Queue()
+pending_deletes = set()
+
+async def _delete_pod(pod):
+    try:
+        # The kubernetes client is blocking; keep the event loop free for other events
+        await asyncio.to_thread(get_v1().delete_namespaced_pod, pod, "default", grace_period_seconds=0)
+        print(f"   → Pod {pod} terminated.\n")
+    except Exception as e:
+        print(f"   → Could not terminate pod {pod}: {e}\n")
+    finally:
+        pending_deletes.discard(pod)
+
+async def _delete_worker():
+    while True:
+        # Take everything queued so far and delete those pods concurrently
+        pods = [await delete_queue.get()]
+        while not delete_queue.empty():
+            pods.append(delete_queue.get_nowait())
+        await asyncio.gather(*(_delete_pod(pod) for pod in pods))
+
+@app.on_event("startup")
+async def start_delete_worker():
+    await asyncio.to_thread(get_v1)  # Load kubeconfig off the event loop before the first event
+    app.state.delete_worker = asyncio.create_task(_delete_worker())
+
 async def process_event(event):
     output = event.get("output", "")
-    if any(keyword in output.lower() for keyword in ["reverse shell", "nc", "shell"]):
+    if SHELL_PATTERN.search(output):
         pod = event.get("k8s", {}).get("pod", {}).get("name", "unknown")
         explanation = f"Sir, pod {pod} attempted a reverse shell. I have terminated the container to secure the system."  # Hardcoded FRIDAY response
         print("\nFRIDAY:", explanation)
-        if v1:
-            try:
-                v1.delete_namespaced_pod(pod, "default", grace_period_seconds=0)
-                print("   → Pod terminated.\n")
-            except Exception as e:
-                print(f"   → Could not terminate pod: {e}\n")
+        if get_v1():
+            if pod not in pending_deletes:
+                pending_deletes.add(pod)
+                delete_queue.put_nowait(pod)
+            print("   → Pod termination queued.\n")
         else:
             print("   → Kubernetes client not available (simulated mode)\n")
 
@@ -2,11 +2,13 @@
 SentinelForge - Streamlit UI
 MVP Dashboard for threat visualization
 """
+import pandas as pd
 import streamlit as st
+from streamlit_autorefresh import st_autorefresh
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from collections import Counter
 from datetime import datetime
-import time
 
 # Page config
 st.set_page_config(
@@ -54,10 +56,30 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def fetch_threats():
-    """Fetch threats from API"""
+# Columns shown in the threats table
+THREAT_COLUMNS = [
+    "severity", "threat_type", "source_pod", "source_namespace", "ml_score",
+    "confidence", "resolved", "detected_at", "description", "id"
+]
+
+# Request timeouts in seconds; explanations may wait on an LLM provider
+REQUEST_TIMEOUT = 2
+EXPLAIN_TIMEOUT = 30
+
+@st.cache_resource
+def get_session():
+    """Keep-alive HTTP session shared across script reruns"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_data(ttl=5, show_spinner=False)
+def fetch_threats(api_base):
+    """Fetch threats from API (cached for one refresh interval)"""
     try:
-        response = requests.get(f"{API_BASE}/api/v1/threats?limit=50")
+        response = get_session().get(f"{api_base}/api/v1/threats?limit=50", timeout=REQUEST_TIMEOUT)
         if response.status_code == 200:
             return response.json()
         return []
@@ -65,10 +87,11 @@ def fetch_threats():
         st.error(f"Error fetching threats: {e}")
         return []
 
-def fetch_actions():
-    """Fetch actions from API"""
+@st.cache_data(ttl=5, show_spinner=False)
+def fetch_actions(api_base):
+    """Fetch actions from API (cached for one refresh interval)"""
     try:
-        response = requests.get(f"{API_BASE}/api/v1/actions?limit=50")
+        response = get_session().get(f"{api_base}/api/v1/actions?limit=50", timeout=REQUEST_TIMEOUT)
         if response.status_code == 200:
             return response.json()
         return []
@@ -76,16 +99,6 @@ def fetch_actions():
         st.error(f"Error fetching actions: {e}")
         return []
 
-def get_severity_color(severity):
-    """Get color for severity"""
-    colors = {
-        "critical": "#FF0000",
-        "high": "#FF6600",
-        "medium": "#FFAA00",
-        "low": "#00AAFF"
-    }
-    return colors.get(severity.lower(), "#FFFFFF")
-
 # Header
 st.markdown('<div class="main-header">🛡️ SENTINELFORGE</div>', unsafe_allow_html=True)
 st.markdown('<p style="text-align: center; color: #00FFFF; font-size: 1.2rem;">Autonomous Cybersecurity Platform</p>', unsafe_allow_html=True)
@@ -96,7 +109,7 @@ page = st.sidebar.radio("Select Page", ["Threats Dashboard", "Actions Log", "Sys
 
 # Health check
 try:
-    health_response = requests.get(f"{API_BASE}/health", timeout=2)
+    health_response = get_session().get(f"{API_BASE}/health", timeout=REQUEST_TIMEOUT)
     if health_response.status_code == 200:
         health_data = health_response.json()
         st.sidebar.success("✅ Backend Online")
@@ -114,75 +127,68 @@ if page == "Threats Dashboard":
     auto_refresh = st.checkbox("Auto-refresh (5s)", value=True)
     
     if auto_refresh:
-        placeholder = st.empty()
-        while True:
-            threats = fetch_threats()
-            
-            # Stats
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                critical = len([t for t in threats if t.get("severity") == "critical"])
-                st.metric("Critical", critical, delta=None)
-            with col2:
-                high = len([t for t in threats if t.get("severity") == "high"])
-                st.metric("High", high, delta=None)
-            with col3:
-                medium = len([t for t in threats if t.get("severity") == "medium"])
-                st.metric("Medium", medium, delta=None)
-            with col4:
-                total = len(threats)
-                st.metric("Total Threats", total, delta=None)
-            
-            # Threat list
-            st.subheader("Recent Threats")
-            for threat in threats[:20]:  # Show latest 20
-                severity = threat.get("severity", "unknown")
-                color = get_severity_color(severity)
-                
-                with st.expander(f"🔴 {severity.upper()} - {threat.get('threat_type', 'unknown')} - Pod: {threat.get('source_pod', 'unknown')}"):
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.write(f"**Threat ID:** {threat.get('id')}")
-                        st.write(f"**Detected:** {threat.get('detected_at', 'unknown')}")
-                        st.write(f"**Pod:** {threat.get('source_pod', 'N/A')}")
-                        st.write(f"**Namespace:** {threat.get('source_namespace', 'N/A')}")
-                    with col2:
-                        st.write(f"**ML Score:** {threat.get('ml_score', 'N/A')}")
-                        st.write(f"**Confidence:** {threat.get('confidence', 'N/A')}")
-                        st.write(f"**Resolved:** {'✅' if threat.get('resolved') else '❌'}")
-                    
-                    st.write(f"**Description:** {threat.get('description', 'No description')}")
-                    
-                    # Get explanation
-                    if st.button(f"Get Explanation", key=f"explain_{threat.get('id')}"):
-                        try:
-                            explain_response = requests.get(f"{API_BASE}/api/v1/explain/{threat.get('id')}")
-                            if explain_response.status_code == 200:
-                                explanation = explain_response.json()
-                                st.info(f"**FRIDAY:** {explanation.get('explanation', 'No explanation available')}")
-                        except Exception as e:
-                            st.error(f"Error: {e}")
+        # Rerun the script every 5s instead of looping inside it
+        st_autorefresh(interval=5000, key="threats_refresh")
+        threats = fetch_threats(API_BASE)
+        
+        # Stats (one pass over the threats)
+        severity_counts = Counter(t.get("severity") for t in threats)
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Critical", severity_counts["critical"], delta=None)
+        with col2:
+            st.metric("High", severity_counts["high"], delta=None)
+        with col3:
+            st.metric("Medium", severity_counts["medium"], delta=None)
+        with col4:
+            total = len(threats)
+            st.metric("Total Threats", total, delta=None)
+        
+        # Threat list: one table instead of an expander per threat
+        st.subheader("Recent Threats")
+        recent = threats[:20]  # Show latest 20
+        if recent:
+            df = pd.DataFrame(recent).reindex(columns=THREAT_COLUMNS)
+            st.dataframe(df, hide_index=True, use_container_width=True)
             
-            time.sleep(5)
+            # Get explanation for a single selected threat
+            labels = {
+                threat.get("id"): f"{threat.get('severity', 'unknown').upper()} - {threat.get('threat_type', 'unknown')} - Pod: {threat.get('source_pod', 'unknown')}"
+                for threat in recent
+            }
+            selected_id = st.selectbox("Threat", list(labels), format_func=labels.get)
+            if st.button("Get Explanation", key="explain_selected"):
+                try:
+                    explain_response = get_session().get(f"{API_BASE}/api/v1/explain/{selected_id}", timeout=EXPLAIN_TIMEOUT)
+                    if explain_response.status_code == 200:
+                        explanation = explain_response.json()
+                        st.info(f"**FRIDAY:** {explanation.get('explanation', 'No explanation available')}")
+                except Exception as e:
+                    st.error(f"Error: {e}")
     else:
-        threats = fetch_threats()
+        threats = fetch_threats(API_BASE)
         st.json(threats)
 
 elif page == "Actions Log":
     st.header("⚡ Remediation Actions")
     
-    actions = fetch_actions()
+    actions = fetch_actions(API_BASE)
+    
+    # Stats (one pass over the actions)
+    executed = successful = 0
+    for a in actions:
+        if a.get("executed"):
+            executed += 1
+        if a.get("success"):
+            successful += 1
+    pending = len(actions) - executed
     
-    # Stats
     col1, col2, col3 = st.columns(3)
     with col1:
-        executed = len([a for a in actions if a.get("executed")])
         st.metric("Executed", executed)
     with col2:
-        pending = len([a for a in actions if not a.get("executed")])
         st.metric("Pending", pending)
     with col3:
-        successful = len([a for a in actions if a.get("success")])
         st.metric("Successful", successful)
     
     # Actions list
@@ -201,7 +207,7 @@ elif page == "System Health":
     st.header("💚 System Health")
     
     try:
-        health_response = requests.get(f"{API_BASE}/health")
+        health_response = get_session().get(f"{API_BASE}/health", timeout=REQUEST_TIMEOUT)
         if health_response.status_code == 200:
             health_data = health_response.json()
             st.json(health_data)
@@ -3,55 +3,149 @@ Pytest configuration and fixtures
 """
 import pytest
 import asyncio
-from unittest.mock import Mock, AsyncMock, MagicMock
-from typing import Generator, AsyncGenerator
+from unittest.mock import Mock, AsyncMock, MagicMock, patch
+from typing import AsyncGenerator, Callable, Generator, List, Optional
 from fastapi.testclient import TestClient
-from httpx import AsyncClient
+from httpx import ASGITransport, AsyncClient
 
 # Import app after setting up test environment
+import os
 import sys
+import tempfile
+import threading
+import time
+import uvicorn
+from datetime import datetime
 from pathlib import Path
+from uuid import UUID, uuid4
+
+# Run against the pure in-process storage; a DATABASE_URL from the shell would put SQLite/PostgreSQL I/O on every webhook
+os.environ.pop("DATABASE_URL", None)
+
+# Keep trained-model caches out of the working tree
+os.environ.setdefault("ML_MODEL_PATH", str(Path(tempfile.mkdtemp()) / "isolation_forest.joblib"))
 
 # Add backend to path
 backend_path = Path(__file__).parent.parent / "backend"
 sys.path.insert(0, str(backend_path))
 
+import orjson
 from app.main import app
 from app.storage import threats_db, actions_db
 from app.models.threat_event import ThreatEvent, ThreatSeverity, ThreatType
 from app.models.remediation_action import RemediationAction, ActionType, RiskLevel
+from app.services.ml_service import MLService
+from tests.fixtures.falco_events import generate_high_volume_events
+
+_REAL_ML_INITIALIZE = MLService.initialize
+
+
+def pytest_addoption(parser):
+    """Add --runslow for the slow-marked e2e and load tests"""
+    parser.addoption("--runslow", action="store_true", default=False, help="run tests marked slow")
+    parser.addoption(
+        "--max-unit-duration", type=float, default=None,
+        help="fail the run if a unit test (other than real_ml) spends longer than this many seconds in its call"
+    )
+
 
+def pytest_collection_modifyitems(config, items):
+    """Skip slow-marked tests unless --runslow is given"""
+    if config.getoption("--runslow"):
+        return
+    skip_slow = pytest.mark.skip(reason="need --runslow option to run")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
 
-@pytest.fixture(scope="function")
+
+def pytest_sessionfinish(session, exitstatus):
+    """With --max-unit-duration, list the unit tests over the limit and fail an otherwise green run"""
+    limit = session.config.getoption("--max-unit-duration")
+    reporter = session.config.pluginmanager.get_plugin("terminalreporter")
+    if limit is None or reporter is None:
+        return
+    slow = [
+        report for report in reporter.stats.get("passed", []) + reporter.stats.get("failed", [])
+        if report.when == "call" and "unit" in report.keywords and "real_ml" not in report.keywords
+        and report.duration > limit
+    ]
+    if not slow:
+        return
+    reporter.write_sep("=", f"{len(slow)} unit tests over {limit}s", red=True)
+    for report in sorted(slow, key=lambda report: report.duration, reverse=True):
+        reporter.write_line(f"{report.duration:.2f}s {report.nodeid}")
+    if exitstatus == pytest.ExitCode.OK:
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
+@pytest.fixture(autouse=True)
 def reset_storage():
-    """Reset in-memory storage before each test"""
-    threats_db.clear()
-    actions_db.clear()
-    yield
+    """Reset in-memory storage before each test (the next test's setup clears what this one leaves)"""
     threats_db.clear()
     actions_db.clear()
 
 
-@pytest.fixture
-def mock_k8s_client():
-    """Mock Kubernetes client"""
-    mock_client = Mock()
-    mock_core_v1 = Mock()
-    mock_networking_v1 = Mock()
+@pytest.fixture(scope="session", autouse=True)
+def fast_ml_initialize():
+    """Skip Isolation Forest training; MLService stays in mock mode with fixed per-severity scores"""
+    with patch.object(MLService, "initialize", AsyncMock(return_value=None)):
+        yield
+
+
+@pytest.fixture(scope="session")
+def sklearn_modules():
+    """Pay MLService's lazy scikit-learn/joblib import once, in setup rather than inside the first real_ml test"""
+    try:
+        import sklearn.ensemble, joblib  # noqa: F401
+    except ImportError:
+        pass  # MLService falls back to mock mode; the tests cover that path themselves
+
+
+@pytest.fixture(autouse=True)
+def real_ml(request, monkeypatch):
+    """Restore the real MLService.initialize for tests marked real_ml"""
+    if request.node.get_closest_marker("real_ml"):
+        request.getfixturevalue("sklearn_modules")
+        monkeypatch.setattr(MLService, "initialize", _REAL_ML_INITIALIZE)
+
+
+class StubCoreV1Api:
+    """CoreV1Api stand-in recording pod calls; on_delete runs inside each delete and may raise"""
+    
+    def __init__(self):
+        self.delete_calls: List[dict] = []
+        self.patch_calls: List[dict] = []
+        self.on_delete: Optional[Callable[..., None]] = None
     
-    # Mock pod deletion
-    mock_core_v1.delete_namespaced_pod = Mock(return_value=None)
+    def delete_namespaced_pod(self, **kwargs):
+        self.delete_calls.append(kwargs)
+        if self.on_delete:
+            self.on_delete(**kwargs)
     
-    # Mock network policy creation
-    mock_networking_v1.create_namespaced_network_policy = Mock(return_value=None)
+    def patch_namespaced_pod(self, **kwargs):
+        self.patch_calls.append(kwargs)
+
+
+class StubNetworkingV1Api:
+    """NetworkingV1Api stand-in recording policy creation; raises `error` when set"""
     
-    mock_client.CoreV1Api = Mock(return_value=mock_core_v1)
-    mock_client.NetworkingV1Api = Mock(return_value=mock_networking_v1)
+    def __init__(self):
+        self.policy_calls: List[dict] = []
+        self.error: Optional[Exception] = None
     
+    def create_namespaced_network_policy(self, **kwargs):
+        self.policy_calls.append(kwargs)
+        if self.error:
+            raise self.error
+
+
+@pytest.fixture
+def mock_k8s_client():
+    """Stub Kubernetes API clients"""
     return {
-        'core_v1': mock_core_v1,
-        'networking_v1': mock_networking_v1,
-        'client': mock_client
+        'core_v1': StubCoreV1Api(),
+        'networking_v1': StubNetworkingV1Api()
     }
 
 
@@ -120,38 +214,86 @@ def sample_reverse_shell_event():
     }
 
 
+# Known-good sample threat built once without validation; each test gets its own copy
+_SAMPLE_THREAT = ThreatEvent.model_construct(
+    severity=ThreatSeverity.HIGH,
+    threat_type=ThreatType.REVERSE_SHELL,
+    source_pod="test-pod",
+    source_namespace="default",
+    source_container="test-container",
+    description="Test threat description",
+    falco_output="Test output",
+    falco_rule="Test rule",
+    falco_priority="Warning",
+    confidence=0.8
+)
+
+
 @pytest.fixture
-def sample_threat_event(reset_storage):
+def sample_threat_event():
     """Create a sample threat event"""
-    threat = ThreatEvent(
-        severity=ThreatSeverity.HIGH,
-        threat_type=ThreatType.REVERSE_SHELL,
-        source_pod="test-pod",
-        source_namespace="default",
-        source_container="test-container",
-        description="Test threat description",
-        falco_output="Test output",
-        falco_rule="Test rule",
-        falco_priority="Warning",
-        confidence=0.8
-    )
+    # Shallow copy: every other field is immutable, and the only mutable one (raw_event) is replaced
+    threat = _SAMPLE_THREAT.model_copy(update={"id": uuid4(), "detected_at": datetime.utcnow(), "raw_event": {}})
     threats_db.append(threat)
     return threat
 
 
-@pytest.fixture
-def test_client():
-    """FastAPI test client"""
-    return TestClient(app)
+@pytest.fixture(scope="session")
+def uuid_pool() -> List[UUID]:
+    """UUIDs generated once per session for seeded test objects"""
+    return [uuid4() for _ in range(1024)]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
+def next_uuid(uuid_pool) -> Callable[[], UUID]:
+    """Hand out pool UUIDs, unique across the session; falls back to uuid4() once the pool runs out"""
+    pool = iter(uuid_pool)
+    return lambda: next(pool, None) or uuid4()
+
+
+@pytest.fixture(scope="session")
+def high_volume_batch_payload() -> bytes:
+    """100 load-test events pre-serialized once as one JSON array"""
+    return orjson.dumps(list(generate_high_volume_events(100)))
+
+
+@pytest.fixture(scope="session")
+def high_volume_event_payloads() -> list:
+    """50 load-test events, each pre-serialized once to JSON bytes"""
+    return [orjson.dumps(event) for event in generate_high_volume_events(50)]
+
+
+@pytest.fixture(scope="session")
+def test_client() -> Generator[TestClient, None, None]:
+    """FastAPI test client shared by the whole session; startup/shutdown run once"""
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
 async def async_client() -> AsyncGenerator[AsyncClient, None]:
     """Async HTTP client for testing"""
-    async with AsyncClient(app=app, base_url="http://test") as client:
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
         yield client
 
 
+@pytest.fixture(scope="session")
+def live_server_url() -> Generator[str, None, None]:
+    """Serve the app with uvicorn on a free local port in a background thread (no lifespan events)"""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, lifespan="off", log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if not thread.is_alive() or time.monotonic() > deadline:
+            raise RuntimeError("uvicorn test server failed to start")
+        time.sleep(0.01)
+    host, port = server.servers[0].sockets[0].getsockname()[:2]
+    yield f"http://{host}:{port}"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
 @pytest.fixture(scope="session")
 def event_loop():
     """Create event loop for async tests"""
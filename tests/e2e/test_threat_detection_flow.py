@@ -1,6 +1,7 @@
 """
 End-to-end tests for threat detection flow
 """
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
 from tests.fixtures.falco_events import REVERSE_SHELL_EVENT
@@ -61,26 +62,29 @@ class TestThreatDetectionFlow:
         assert "explanation" in explanation
         assert explanation["threat_id"] == threat_id
     
-    def test_threat_filtering(self, test_client, reset_storage):
+    @pytest.mark.asyncio
+    async def test_threat_filtering(self, async_client, reset_storage):
         """Test threat filtering capabilities"""
-        # Create multiple threats with different severities
+        # Create multiple threats with different severities, submitted concurrently
         from tests.fixtures.falco_events import (
             REVERSE_SHELL_EVENT,
             NETWORK_ANOMALY_EVENT,
             LOW_SEVERITY_EVENT
         )
         
-        test_client.post("/api/v1/falco/webhook", json=REVERSE_SHELL_EVENT)
-        test_client.post("/api/v1/falco/webhook", json=NETWORK_ANOMALY_EVENT)
-        test_client.post("/api/v1/falco/webhook", json=LOW_SEVERITY_EVENT)
+        responses = await asyncio.gather(*(
+            async_client.post("/api/v1/falco/webhook", json=event)
+            for event in (REVERSE_SHELL_EVENT, NETWORK_ANOMALY_EVENT, LOW_SEVERITY_EVENT)
+        ))
+        assert all(response.status_code == 200 for response in responses)
         
         # Filter by high severity
-        response = test_client.get("/api/v1/threats?severity=high")
+        response = await async_client.get("/api/v1/threats?severity=high")
         high_threats = response.json()
         assert all(t["severity"] == "high" for t in high_threats)
         
         # Filter by threat type
-        response = test_client.get("/api/v1/threats?threat_type=reverse_shell")
+        response = await async_client.get("/api/v1/threats?threat_type=reverse_shell")
         reverse_shell_threats = response.json()
         assert all(t["threat_type"] == "reverse_shell" for t in reverse_shell_threats)
     
@@ -93,19 +93,29 @@ INCOMPLETE_EVENT = {
 }
 
 # High volume event sample (for load testing)
+HIGH_VOLUME_TEMPLATE = {
+    "priority": "Warning",
+    "rule": "Test rule",
+    "time": "2024-01-01T17:20:42.123456789Z",
+    "output_fields": {
+        "k8s.ns.name": "default"
+    }
+}
+
+
 def generate_high_volume_events(count: int = 100):
-    """Generate multiple events for load testing"""
-    events = []
-    for i in range(count):
-        events.append({
+    """Lazily generate events for load testing; wrap in list() if the events are needed more than once"""
+    template = HIGH_VOLUME_TEMPLATE
+    fields = template["output_fields"]
+    return (
+        {
+            **template,
             "output": f"17:20:42.123456789: Warning Test event {i}",
-            "priority": "Warning",
-            "rule": "Test rule",
-            "time": "2024-01-01T17:20:42.123456789Z",
             "output_fields": {
+                **fields,
                 "k8s.pod.name": f"test-pod-{i}",
-                "k8s.ns.name": "default",
                 "container.name": f"container-{i}"
             }
-        })
-    return events
+        }
+        for i in range(count)
+    )
@@ -0,0 +1,15 @@
+"""
+Model builders for test seed data
+"""
+from app.models.remediation_action import RemediationAction
+from app.models.threat_event import ThreatEvent
+
+
+def make_threat(**fields) -> ThreatEvent:
+    """Build a ThreatEvent without validation; defaults (id, detected_at, resolved) still apply"""
+    return ThreatEvent.model_construct(**fields)
+
+
+def make_action(**fields) -> RemediationAction:
+    """Build a RemediationAction without validation; defaults (id, executed, parameters) still apply"""
+    return RemediationAction.model_construct(**fields)
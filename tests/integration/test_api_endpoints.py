@@ -2,7 +2,9 @@
 Integration tests for API endpoints
 """
 import pytest
+from uuid import UUID
 from fastapi.testclient import TestClient
+from app.storage import get_threat_by_id
 from tests.fixtures.falco_events import REVERSE_SHELL_EVENT
 
 
@@ -34,16 +36,10 @@ class TestAPIEndpoints:
     
     def test_threat_to_action_flow(self, test_client, reset_storage):
         """Test that threat processing creates action"""
-        # Send Falco event
+        # Send Falco event; the webhook response carries the new threat's ID
         response = test_client.post("/api/v1/falco/webhook", json=REVERSE_SHELL_EVENT)
         assert response.status_code == 200
-        
-        # Get threats
-        response = test_client.get("/api/v1/threats")
-        threats = response.json()
-        assert len(threats) > 0
-        
-        threat_id = threats[0]["id"]
+        threat_id = response.json()["threat_id"]
         
         # Get actions (may be empty if action requires confirmation)
         response = test_client.get("/api/v1/actions")
@@ -60,13 +56,7 @@ class TestAPIEndpoints:
         # Create threat via webhook
         response = test_client.post("/api/v1/falco/webhook", json=REVERSE_SHELL_EVENT)
         assert response.status_code == 200
-        
-        # Get threats
-        response = test_client.get("/api/v1/threats")
-        threats = response.json()
-        assert len(threats) > 0
-        
-        threat_id = threats[0]["id"]
+        threat_id = response.json()["threat_id"]
         
         # Get explanation
         response = test_client.get(f"/api/v1/explain/{threat_id}")
@@ -81,14 +71,8 @@ class TestAPIEndpoints:
         # Create threat
         response = test_client.post("/api/v1/falco/webhook", json=REVERSE_SHELL_EVENT)
         assert response.status_code == 200
-        
-        # Get threats
-        response = test_client.get("/api/v1/threats")
-        threats = response.json()
-        assert len(threats) > 0
-        
-        threat_id = threats[0]["id"]
-        assert threats[0]["resolved"] is False
+        threat_id = response.json()["threat_id"]
+        assert get_threat_by_id(UUID(threat_id)).resolved is False
         
         # Resolve threat
         response = test_client.post(f"/api/v1/threats/{threat_id}/resolve")
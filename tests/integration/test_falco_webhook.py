@@ -3,6 +3,7 @@ Integration tests for Falco webhook integration
 """
 import pytest
 from fastapi.testclient import TestClient
+from app.storage import threats_db
 from tests.fixtures.falco_events import (
     REVERSE_SHELL_EVENT,
     PRIVILEGE_ESCALATION_EVENT,
@@ -39,8 +40,20 @@ class TestFalcoWebhook:
         assert threat["source_pod"] == "evil-pod"
         assert threat["threat_type"] == "reverse_shell"
     
+    @pytest.mark.parametrize(
+        "event",
+        [REVERSE_SHELL_EVENT, PRIVILEGE_ESCALATION_EVENT, NETWORK_ANOMALY_EVENT, CONTAINER_ESCAPE_EVENT],
+        ids=["rev_shell", "privesc", "net", "escape"]
+    )
+    def test_falco_webhook_processes_event(self, test_client, reset_storage, event):
+        """Test processing each type of Falco event"""
+        response = test_client.post("/api/v1/falco/webhook", json=event)
+        
+        assert response.status_code == 200
+        assert response.json()["threat_id"]
+    
     def test_falco_webhook_processes_different_event_types(self, test_client, reset_storage):
-        """Test processing different types of Falco events"""
+        """Test a threat is stored for every type of Falco event"""
         events = [
             REVERSE_SHELL_EVENT,
             PRIVILEGE_ESCALATION_EVENT,
@@ -49,13 +62,10 @@ class TestFalcoWebhook:
         ]
         
         for event in events:
-            response = test_client.post("/api/v1/falco/webhook", json=event)
-            assert response.status_code == 200
+            test_client.post("/api/v1/falco/webhook", json=event)
         
         # Verify all threats created
-        response = test_client.get("/api/v1/threats")
-        threats = response.json()
-        assert len(threats) >= len(events)
+        assert len(threats_db) >= len(events)
     
     def test_falco_webhook_handles_malformed_events(self, test_client, reset_storage):
         """Test handling of malformed Falco events"""
@@ -5,6 +5,9 @@ import pytest
 from fastapi.testclient import TestClient
 from tests.fixtures.falco_events import REVERSE_SHELL_EVENT
 
+# Services reported by /health
+EXPECTED_SERVICES = frozenset(("ml", "rl", "llm", "remediation"))
+
 
 @pytest.mark.integration
 class TestFrontendBackend:
@@ -54,24 +57,15 @@ class TestFrontendBackend:
         assert "services" in health
         
         # Verify all services are reported
-        services = health["services"]
-        assert "ml" in services
-        assert "rl" in services
-        assert "llm" in services
-        assert "remediation" in services
+        assert EXPECTED_SERVICES <= health["services"].keys()
     
     def test_frontend_explanation_request(self, test_client, reset_storage):
         """Test that frontend can request threat explanations"""
-        # Create threat
+        # Create threat; the webhook response carries its ID
         response = test_client.post("/api/v1/falco/webhook", json=REVERSE_SHELL_EVENT)
+        threat_id = response.json().get("threat_id")
         
-        # Get threat ID
-        response = test_client.get("/api/v1/threats")
-        threats = response.json()
-        
-        if len(threats) > 0:
-            threat_id = threats[0]["id"]
-            
+        if threat_id:
             # Request explanation (simulating frontend button click)
             response = test_client.get(f"/api/v1/explain/{threat_id}")
             
@@ -18,24 +18,23 @@ from tests.fixtures.falco_events import REVERSE_SHELL_EVENT
 class TestThreatPipeline:
     """Test complete threat processing pipeline"""
     
-    @pytest.fixture
-    def services(self):
-        """Initialize all services"""
-        return {
+    @pytest.fixture(scope="class")
+    async def services(self):
+        """Create and initialize all services once for the class"""
+        services = {
             'falco_processor': FalcoProcessor(),
             'ml_service': MLService(),
             'rl_service': RLService(),
             'remediation_service': RemediationService()
         }
+        await services['ml_service'].initialize()
+        await services['rl_service'].initialize()
+        await services['remediation_service'].initialize()
+        return services
     
     @pytest.mark.asyncio
     async def test_complete_pipeline(self, services, reset_storage):
         """Test complete threat processing pipeline"""
-        # Initialize services
-        await services['ml_service'].initialize()
-        await services['rl_service'].initialize()
-        await services['remediation_service'].initialize()
-        
         # Process Falco event
         with patch('app.services.falco_processor.manager.broadcast', new_callable=AsyncMock) as mock_broadcast:
             threat = await services['falco_processor'].process_event(REVERSE_SHELL_EVENT)
@@ -69,10 +68,6 @@ class TestThreatPipeline:
     @pytest.mark.asyncio
     async def test_pipeline_with_auto_execution(self, services, reset_storage):
         """Test pipeline with auto-execution of low-risk action"""
-        await services['ml_service'].initialize()
-        await services['rl_service'].initialize()
-        await services['remediation_service'].initialize()
-        
         # Create a threat that will result in low-risk action
         from app.models.threat_event import ThreatEvent
         
@@ -102,9 +97,6 @@ class TestThreatPipeline:
     @pytest.mark.asyncio
     async def test_pipeline_error_propagation(self, services, reset_storage):
         """Test error propagation through pipeline"""
-        await services['ml_service'].initialize()
-        await services['rl_service'].initialize()
-        
         # Process invalid event
         invalid_event = {"invalid": "data"}
         
@@ -138,9 +130,6 @@ class TestThreatPipeline:
     @pytest.mark.asyncio
     async def test_pipeline_ml_score_influence(self, services, reset_storage):
         """Test that ML score influences RL confidence"""
-        await services['ml_service'].initialize()
-        await services['rl_service'].initialize()
-        
         threat1 = await services['falco_processor'].process_event(REVERSE_SHELL_EVENT)
         ml_score1 = await services['ml_service'].detect_anomaly(threat1)
         threat1.ml_score = ml_score1
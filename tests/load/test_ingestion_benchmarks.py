@@ -0,0 +1,69 @@
+"""
+Benchmarked load tests for event ingestion (requires pytest-benchmark)
+"""
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from app.storage import actions_db, threats_db
+from tests.fixtures.falco_events import REVERSE_SHELL_EVENT
+
+pytest.importorskip("pytest_benchmark")
+
+JSON_HEADERS = {"content-type": "application/json"}
+REVERSE_SHELL_PAYLOAD = orjson.dumps(REVERSE_SHELL_EVENT)
+
+
+def _clear_storage():
+    """Start every benchmark round from empty storage"""
+    threats_db.clear()
+    actions_db.clear()
+
+
+@pytest.mark.load
+@pytest.mark.slow
+@pytest.mark.xdist_group(name="load")
+class TestIngestionBenchmarks:
+    """Benchmarked load tests for event ingestion"""
+    
+    def test_high_volume_event_ingestion(self, benchmark, test_client, reset_storage, high_volume_batch_payload):
+        """Test ingesting high volume of events"""
+        num_events = 100
+        
+        def ingest():
+            # Send all events in one batch request (body serialized once per session)
+            return test_client.post(
+                "/api/v1/falco/webhook/batch", content=high_volume_batch_payload, headers=JSON_HEADERS
+            )
+        
+        response = benchmark.pedantic(ingest, setup=_clear_storage, rounds=3, warmup_rounds=1)
+        
+        assert response.status_code == 200
+        assert orjson.loads(response.content)["processed"] == num_events
+        assert len(threats_db) >= num_events
+        
+        # Stats are absent under --benchmark-disable
+        if benchmark.stats:
+            mean = benchmark.stats.stats.mean
+            benchmark.extra_info["events_per_sec"] = num_events / mean
+            assert mean < 30.0  # Should process 100 events in under 30 seconds
+    
+    def test_api_endpoint_stress(self, benchmark, test_client, reset_storage):
+        """Test API endpoint stress"""
+        # Create some threats first
+        for _ in range(10):
+            test_client.post("/api/v1/falco/webhook", content=REVERSE_SHELL_PAYLOAD, headers=JSON_HEADERS)
+        
+        requests = 100
+        # Build the request once; each round only sends it
+        request = test_client.build_request("GET", "/api/v1/threats")
+        
+        def stress():
+            return [test_client.send(request).status_code for _ in range(requests)]
+        
+        statuses = benchmark.pedantic(stress, rounds=3, warmup_rounds=1)
+        
+        assert statuses == [200] * requests
+        if benchmark.stats:
+            rps = requests / benchmark.stats.stats.mean
+            benchmark.extra_info["requests_per_sec"] = rps
+            assert rps > 10  # Should handle at least 10 req/sec
@@ -0,0 +1,53 @@
+"""
+Micro-benchmarks for the Falco processing hot path (requires pytest-benchmark)
+"""
+import asyncio
+import pytest
+from app.services.falco_processor import FalcoProcessor
+from app.storage import threats_db
+from tests.fixtures.falco_events import REVERSE_SHELL_EVENT
+
+pytest.importorskip("pytest_benchmark")
+
+NUM_EVENTS = 1000
+
+# Conservative floor, far below local throughput; it only catches large regressions
+MIN_EVENTS_PER_SEC = 1000
+
+
+async def _process_all(processor: FalcoProcessor, events) -> None:
+    """Run events through process_event one at a time, as the webhook does"""
+    for event in events:
+        await processor.process_event(event)
+
+
+@pytest.mark.load
+@pytest.mark.slow
+@pytest.mark.xdist_group(name="load")
+class TestProcessorBenchmarks:
+    """Micro-benchmarks for FalcoProcessor"""
+    
+    @pytest.fixture
+    def processor(self):
+        """Create FalcoProcessor instance"""
+        return FalcoProcessor()
+    
+    def test_bench_process_event(self, benchmark, processor, reset_storage):
+        """Benchmark process_event throughput and guard a lower bound"""
+        events = [REVERSE_SHELL_EVENT] * NUM_EVENTS
+        
+        benchmark.pedantic(
+            lambda: asyncio.run(_process_all(processor, events)),
+            setup=threats_db.clear,
+            rounds=5,
+            warmup_rounds=1
+        )
+        
+        assert len(threats_db) == NUM_EVENTS
+        # Stats are absent under --benchmark-disable
+        if benchmark.stats:
+            mean = benchmark.stats.stats.mean
+            events_per_sec = NUM_EVENTS / mean
+            benchmark.extra_info["events_per_sec"] = events_per_sec
+            benchmark.extra_info["ns_per_event"] = mean / NUM_EVENTS * 1e9
+            assert events_per_sec > MIN_EVENTS_PER_SEC
@@ -2,15 +2,44 @@
 Unit tests for actions API endpoints
 """
 import pytest
+from datetime import datetime
 from fastapi.testclient import TestClient
 from app.models.remediation_action import ActionType, RiskLevel
-from app.models.threat_event import ThreatEvent, ThreatSeverity, ThreatType
+from app.models.threat_event import ThreatSeverity, ThreatType
+from app.storage import actions_db, threats_db
+from tests.fixtures.models import make_action, make_threat
 
 
 @pytest.mark.unit
 class TestActionsAPI:
     """Test actions API endpoints"""
     
+    @pytest.fixture(scope="class")
+    def seed(self, next_uuid):
+        """Build the threat and actions shared by these tests once per class; tests only read them"""
+        threat = make_threat(
+            id=next_uuid(),
+            severity=ThreatSeverity.HIGH,
+            threat_type=ThreatType.REVERSE_SHELL,
+            description="Test threat"
+        )
+        
+        def action(action_type, risk_level, **fields):
+            return make_action(
+                id=next_uuid(), threat_id=threat.id, action_type=action_type, risk_level=risk_level, **fields
+            )
+        
+        return {
+            "threat": threat,
+            "terminate": action(ActionType.TERMINATE_POD, RiskLevel.HIGH, confidence=0.9),
+            "alert": action(ActionType.ALERT, RiskLevel.LOW),
+            "executed": action(
+                ActionType.ALERT, RiskLevel.LOW, executed=True, executed_at=datetime.utcnow(), success=True
+            ),
+            "pending": action(ActionType.MONITOR, RiskLevel.LOW, executed=False),
+            "monitors": [action(ActionType.MONITOR, RiskLevel.LOW) for _ in range(5)],
+        }
+    
     def test_list_actions_empty(self, test_client, reset_storage):
         """Test listing actions when none exist"""
         response = test_client.get("/api/v1/actions")
@@ -18,24 +47,10 @@ class TestActionsAPI:
         assert response.status_code == 200
         assert response.json() == []
     
-    def test_list_actions(self, test_client, reset_storage):
+    def test_list_actions(self, test_client, reset_storage, seed):
         """Test listing actions"""
-        from app.storage import actions_db, threats_db
-        from app.models.remediation_action import RemediationAction
-        
-        threat = ThreatEvent(
-            severity=ThreatSeverity.HIGH,
-            threat_type=ThreatType.REVERSE_SHELL,
-            description="Test threat"
-        )
-        threats_db.append(threat)
-        
-        action = RemediationAction(
-            threat_id=threat.id,
-            action_type=ActionType.TERMINATE_POD,
-            risk_level=RiskLevel.HIGH,
-            confidence=0.9
-        )
+        threats_db.append(seed["threat"])
+        action = seed["terminate"]
         actions_db.append(action)
         
         response = test_client.get("/api/v1/actions")
@@ -46,29 +61,10 @@ class TestActionsAPI:
         assert actions[0]["id"] == str(action.id)
         assert actions[0]["action_type"] == "terminate_pod"
     
-    def test_list_actions_filter_by_type(self, test_client, reset_storage):
+    def test_list_actions_filter_by_type(self, test_client, reset_storage, seed):
         """Test filtering actions by type"""
-        from app.storage import actions_db, threats_db
-        from app.models.remediation_action import RemediationAction
-        
-        threat = ThreatEvent(
-            severity=ThreatSeverity.MEDIUM,
-            threat_type=ThreatType.UNKNOWN,
-            description="Test"
-        )
-        threats_db.append(threat)
-        
-        action1 = RemediationAction(
-            threat_id=threat.id,
-            action_type=ActionType.TERMINATE_POD,
-            risk_level=RiskLevel.HIGH
-        )
-        action2 = RemediationAction(
-            threat_id=threat.id,
-            action_type=ActionType.ALERT,
-            risk_level=RiskLevel.LOW
-        )
-        actions_db.extend([action1, action2])
+        threats_db.append(seed["threat"])
+        actions_db.extend([seed["terminate"], seed["alert"]])
         
         response = test_client.get("/api/v1/actions?action_type=terminate_pod")
         
@@ -77,34 +73,10 @@ class TestActionsAPI:
         assert len(actions) == 1
         assert actions[0]["action_type"] == "terminate_pod"
     
-    def test_list_actions_filter_by_executed(self, test_client, reset_storage):
+    def test_list_actions_filter_by_executed(self, test_client, reset_storage, seed):
         """Test filtering actions by executed status"""
-        from app.storage import actions_db, threats_db
-        from app.models.remediation_action import RemediationAction
-        from datetime import datetime
-        
-        threat = ThreatEvent(
-            severity=ThreatSeverity.MEDIUM,
-            threat_type=ThreatType.UNKNOWN,
-            description="Test"
-        )
-        threats_db.append(threat)
-        
-        action_executed = RemediationAction(
-            threat_id=threat.id,
-            action_type=ActionType.ALERT,
-            risk_level=RiskLevel.LOW,
-            executed=True,
-            executed_at=datetime.utcnow(),
-            success=True
-        )
-        action_pending = RemediationAction(
-            threat_id=threat.id,
-            action_type=ActionType.MONITOR,
-            risk_level=RiskLevel.LOW,
-            executed=False
-        )
-        actions_db.extend([action_executed, action_pending])
+        threats_db.append(seed["threat"])
+        actions_db.extend([seed["executed"], seed["pending"]])
         
         # Filter executed
         response = test_client.get("/api/v1/actions?executed=true")
@@ -120,26 +92,10 @@ class TestActionsAPI:
         assert len(actions) == 1
         assert actions[0]["executed"] is False
     
-    def test_list_actions_limit(self, test_client, reset_storage):
+    def test_list_actions_limit(self, test_client, reset_storage, seed):
         """Test limiting number of actions returned"""
-        from app.storage import actions_db, threats_db
-        from app.models.remediation_action import RemediationAction
-        
-        threat = ThreatEvent(
-            severity=ThreatSeverity.MEDIUM,
-            threat_type=ThreatType.UNKNOWN,
-            description="Test"
-        )
-        threats_db.append(threat)
-        
-        # Create 5 actions
-        for i in range(5):
-            action = RemediationAction(
-                threat_id=threat.id,
-                action_type=ActionType.MONITOR,
-                risk_level=RiskLevel.LOW
-            )
-            actions_db.append(action)
+        threats_db.append(seed["threat"])
+        actions_db.extend(seed["monitors"])
         
         # Limit to 2
         response = test_client.get("/api/v1/actions?limit=2")
@@ -148,24 +104,10 @@ class TestActionsAPI:
         actions = response.json()
         assert len(actions) == 2
     
-    def test_get_action_by_id(self, test_client, reset_storage):
+    def test_get_action_by_id(self, test_client, reset_storage, seed):
         """Test getting action by ID"""
-        from app.storage import actions_db, threats_db
-        from app.models.remediation_action import RemediationAction
-        
-        threat = ThreatEvent(
-            severity=ThreatSeverity.HIGH,
-            threat_type=ThreatType.REVERSE_SHELL,
-            description="Test threat"
-        )
-        threats_db.append(threat)
-        
-        action = RemediationAction(
-            threat_id=threat.id,
-            action_type=ActionType.TERMINATE_POD,
-            risk_level=RiskLevel.HIGH,
-            confidence=0.9
-        )
+        threats_db.append(seed["threat"])
+        action = seed["terminate"]
         actions_db.append(action)
         
         action_id = str(action.id)
@@ -177,11 +119,9 @@ class TestActionsAPI:
         assert action_data["action_type"] == "terminate_pod"
         assert action_data["risk_level"] == "high"
     
-    def test_get_action_not_found(self, test_client, reset_storage):
+    def test_get_action_not_found(self, test_client, reset_storage, next_uuid):
         """Test getting non-existent action"""
-        from uuid import uuid4
-        
-        action_id = str(uuid4())
+        action_id = str(next_uuid())
         response = test_client.get(f"/api/v1/actions/{action_id}")
         
         assert response.status_code == 404
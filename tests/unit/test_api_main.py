@@ -2,7 +2,30 @@
 Unit tests for main API endpoints
 """
 import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi.testclient import TestClient
+from app import storage
+from app.storage import threats_db
+from tests.fixtures.falco_events import generate_high_volume_events
+
+# Services reported by /health
+EXPECTED_SERVICES = frozenset(("ml", "rl", "llm", "remediation"))
+
+# Event shared by the simulate and webhook tests; the webhook variant adds Falco's time and container fields
+BASE_EVENT = {
+    "output": "17:20:42.123456789: Warning Terminal shell in container",
+    "priority": "Warning",
+    "rule": "Terminal shell in container",
+    "output_fields": {
+        "k8s.pod.name": "test-pod",
+        "k8s.ns.name": "default"
+    }
+}
+WEBHOOK_EVENT = {
+    **BASE_EVENT,
+    "time": "2024-01-01T17:20:42.123456789Z",
+    "output_fields": {**BASE_EVENT["output_fields"], "container.name": "test-container"}
+}
 
 
 @pytest.mark.unit
@@ -27,47 +50,55 @@ class TestMainAPI:
         data = response.json()
         assert data["status"] == "healthy"
         assert "services" in data
-        assert "ml" in data["services"]
-        assert "rl" in data["services"]
-        assert "llm" in data["services"]
-        assert "remediation" in data["services"]
+        assert EXPECTED_SERVICES <= data["services"].keys()
     
-    def test_simulate_endpoint(self, test_client, reset_storage):
-        """Test simulate endpoint"""
-        event = {
-            "output": "17:20:42.123456789: Warning Test event",
-            "priority": "Warning",
-            "rule": "Test rule",
-            "output_fields": {
-                "k8s.pod.name": "test-pod",
-                "k8s.ns.name": "default"
-            }
-        }
-        
-        response = test_client.post("/api/v1/simulate", json=event)
+    @pytest.mark.parametrize("endpoint,event", [
+        ("/api/v1/simulate", BASE_EVENT),
+        ("/api/v1/falco/webhook", WEBHOOK_EVENT),
+    ], ids=["simulate", "falco_webhook"])
+    def test_event_endpoint(self, test_client, reset_storage, endpoint, event):
+        """Test the simulate and Falco webhook endpoints process an event"""
+        response = test_client.post(endpoint, json=event)
         
         assert response.status_code == 200
         data = response.json()
         assert "status" in data
         assert data["status"] == "processed"
     
-    def test_falco_webhook_endpoint(self, test_client, reset_storage):
-        """Test Falco webhook endpoint"""
-        event = {
-            "output": "17:20:42.123456789: Warning Terminal shell in container",
-            "priority": "Warning",
-            "rule": "Terminal shell in container",
-            "time": "2024-01-01T17:20:42.123456789Z",
-            "output_fields": {
-                "k8s.pod.name": "test-pod",
-                "k8s.ns.name": "default",
-                "container.name": "test-container"
-            }
-        }
+    def test_falco_webhook_batch_endpoint(self, test_client, reset_storage):
+        """Test the batch Falco webhook stores every event in one request"""
+        events = list(generate_high_volume_events(5))
         
-        response = test_client.post("/api/v1/falco/webhook", json=event)
+        response = test_client.post("/api/v1/falco/webhook/batch", json=events)
         
         assert response.status_code == 200
         data = response.json()
-        assert "status" in data
-        assert data["status"] == "processed"
+        assert data["processed"] == 5
+        assert len(data["threat_ids"]) == 5
+        assert len(threats_db) == 5
+    
+    @pytest.mark.asyncio
+    async def test_falco_webhook_batch_stores_ml_score(self, async_client, reset_storage):
+        """Test batch threats reach the database write queue already scored"""
+        db = AsyncMock()
+        async_session = MagicMock()
+        async_session.return_value.__aenter__.return_value = db
+        events = list(generate_high_volume_events(3))
+        with patch.object(storage, "USE_DATABASE", True), \
+             patch.object(storage, "SessionLocal") as mock_factory, \
+             patch.object(storage, "AsyncSessionLocal", async_session):
+            storage.start_threat_writer()
+            response = await async_client.post("/api/v1/falco/webhook/batch", json=events)
+            await storage.stop_threat_writer()
+        
+        assert response.status_code == 200
+        mock_factory.return_value.execute.assert_not_called()
+        rows = db.execute.await_args_list[0].args[1]
+        assert len(rows) == 3
+        assert all(row["ml_score"] is not None for row in rows)
+    
+    def test_falco_webhook_batch_rejects_non_list(self, test_client):
+        """Test the batch Falco webhook requires a JSON array"""
+        response = test_client.post("/api/v1/falco/webhook/batch", json={"output": "x"})
+        
+        assert response.status_code == 400
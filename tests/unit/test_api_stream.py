@@ -2,35 +2,137 @@
 Unit tests for WebSocket stream API
 """
 import pytest
+import asyncio
 import json
+from contextlib import ExitStack
+from unittest.mock import AsyncMock, patch
 from fastapi.testclient import TestClient
+from app.api.stream import ConnectionManager
 
 
 @pytest.mark.unit
 class TestStreamAPI:
     """Test WebSocket stream API"""
     
-    def test_websocket_connection(self, test_client):
+    @pytest.fixture(scope="class")
+    def ws_pool(self, test_client):
+        """Open WebSocket connections once for the class and lend them to its tests"""
+        with ExitStack() as stack:
+            yield [stack.enter_context(test_client.websocket_connect("/api/v1/stream")) for _ in range(2)]
+    
+    def test_websocket_connection(self, ws_pool):
         """Test WebSocket connection"""
-        with test_client.websocket_connect("/api/v1/stream") as websocket:
-            # Send a message
-            websocket.send_text("ping")
-            
-            # Receive response
-            data = websocket.receive_json()
-            assert data["type"] == "ping"
-            assert data["message"] == "connected"
-    
-    def test_websocket_multiple_connections(self, test_client):
+        websocket = ws_pool[0]
+        # Send a message
+        websocket.send_text("ping")
+        
+        # Receive response
+        data = websocket.receive_json()
+        assert data["type"] == "ping"
+        assert data["message"] == "connected"
+    
+    def test_websocket_multiple_connections(self, ws_pool):
         """Test multiple WebSocket connections"""
-        with test_client.websocket_connect("/api/v1/stream") as ws1:
-            with test_client.websocket_connect("/api/v1/stream") as ws2:
-                # Both should connect successfully
-                ws1.send_text("ping")
-                ws2.send_text("ping")
-                
-                data1 = ws1.receive_json()
-                data2 = ws2.receive_json()
-                
-                assert data1["type"] == "ping"
-                assert data2["type"] == "ping"
+        ws1, ws2 = ws_pool
+        # Both should connect successfully
+        ws1.send_text("ping")
+        ws2.send_text("ping")
+        
+        data1 = ws1.receive_json()
+        data2 = ws2.receive_json()
+        
+        assert data1["type"] == "ping"
+        assert data2["type"] == "ping"
+    
+    def test_websocket_batched_pings(self, ws_pool):
+        """Test a batch of pings is answered with one frame"""
+        websocket = ws_pool[0]
+        websocket.send_text(json.dumps({"pings": [1, 2, 3]}))
+        
+        data = websocket.receive_json()
+        assert data == {"type": "pong", "pongs": [1, 2, 3]}
+
+
+@pytest.mark.unit
+class TestConnectionManager:
+    """Test WebSocket connection manager"""
+    
+    @pytest.mark.asyncio
+    async def test_broadcast_queues_per_client(self):
+        """Test broadcast delivers to every client through its queue"""
+        manager = ConnectionManager()
+        ws1, ws2 = AsyncMock(), AsyncMock()
+        await manager.connect(ws1)
+        await manager.connect(ws2)
+        
+        await manager.broadcast({"type": "threat_detected"})
+        await asyncio.sleep(0.01)
+        
+        ws1.send_bytes.assert_awaited_once_with(b'{"type":"threat_detected"}')
+        ws2.send_bytes.assert_awaited_once_with(b'{"type":"threat_detected"}')
+        
+        manager.disconnect(ws1)
+        manager.disconnect(ws2)
+    
+    @pytest.mark.asyncio
+    async def test_broadcast_without_clients_skips_serialization(self):
+        """Test broadcast returns before serializing when no client is connected"""
+        manager = ConnectionManager()
+        
+        with patch("app.api.stream.orjson.dumps") as mock_dumps:
+            await manager.broadcast({"type": "threat_detected"})
+        
+        mock_dumps.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_broadcast_drops_oldest_when_queue_full(self):
+        """Test a full client queue drops its oldest message instead of blocking"""
+        manager = ConnectionManager()
+        ws = AsyncMock()
+        await manager.connect(ws)
+        manager._senders[ws].cancel()
+        manager._queues[ws] = asyncio.Queue(maxsize=2)
+        
+        for i in range(3):
+            await manager.broadcast({"seq": i})
+        
+        queue = manager._queues[ws]
+        assert [json.loads(queue.get_nowait())["seq"] for _ in range(2)] == [1, 2]
+        
+        manager.disconnect(ws)
+    
+    @pytest.mark.asyncio
+    async def test_failed_send_prunes_connection(self):
+        """Test a client whose send fails is removed from the manager"""
+        manager = ConnectionManager()
+        dead, alive = AsyncMock(), AsyncMock()
+        dead.send_bytes.side_effect = RuntimeError("socket closed")
+        await manager.connect(dead)
+        await manager.connect(alive)
+        
+        await manager.broadcast({"type": "threat_detected"})
+        await asyncio.sleep(0.01)
+        
+        assert manager.active_connections == {alive}
+        assert dead not in manager._queues
+        alive.send_bytes.assert_awaited_once()
+        
+        # Later disconnect from the endpoint is a no-op
+        manager.disconnect(dead)
+        manager.disconnect(alive)
+    
+    @pytest.mark.asyncio
+    async def test_broadcast_reaches_clients_past_first_batch(self):
+        """Test broadcast covers every client when fan-out spans several batches"""
+        manager = ConnectionManager()
+        clients = [AsyncMock() for _ in range(120)]
+        for ws in clients:
+            await manager.connect(ws)
+        
+        await manager.broadcast({"type": "threat_detected"})
+        await asyncio.sleep(0.01)
+        
+        assert all(ws.send_bytes.await_count == 1 for ws in clients)
+        
+        for ws in clients:
+            manager.disconnect(ws)
@@ -111,6 +111,21 @@ class TestThreatsAPI:
         assert len(threats) == 1
         assert threats[0]["resolved"] is False
     
+    def test_list_threats_combined_filters(self, test_client, reset_storage, sample_threat_event):
+        """Test combining filters after a threat changes resolved state"""
+        response = test_client.get("/api/v1/threats?severity=high&resolved=false")
+        assert len(response.json()) == 1
+        
+        test_client.post(f"/api/v1/threats/{sample_threat_event.id}/resolve")
+        
+        response = test_client.get("/api/v1/threats?severity=high&resolved=false")
+        assert response.json() == []
+        
+        response = test_client.get("/api/v1/threats?severity=high&resolved=true")
+        threats = response.json()
+        assert len(threats) == 1
+        assert threats[0]["id"] == str(sample_threat_event.id)
+    
     def test_list_threats_limit(self, test_client, reset_storage):
         """Test limiting number of threats returned"""
         from app.storage import threats_db
@@ -164,11 +179,21 @@ class TestThreatsAPI:
         assert data["threat_id"] == threat_id
         
         # Verify threat is marked as resolved
-        from app.storage import threats_db
-        threat = next(t for t in threats_db if t.id == sample_threat_event.id)
+        from app.storage import get_threat_by_id
+        threat = get_threat_by_id(sample_threat_event.id)
         assert threat.resolved is True
         assert threat.resolved_at is not None
     
+    def test_resolve_threat_updates_in_place(self, test_client, reset_storage, sample_threat_event):
+        """Test resolving a threat does not store a duplicate copy"""
+        from app.storage import threats_db, get_threat_by_id
+        
+        response = test_client.post(f"/api/v1/threats/{sample_threat_event.id}/resolve")
+        
+        assert response.status_code == 200
+        assert len(threats_db) == 1
+        assert get_threat_by_id(sample_threat_event.id).resolved is True
+    
     def test_resolve_threat_not_found(self, test_client, reset_storage):
         """Test resolving non-existent threat"""
         from uuid import uuid4
@@ -177,3 +202,47 @@ class TestThreatsAPI:
         response = test_client.post(f"/api/v1/threats/{threat_id}/resolve")
         
         assert response.status_code == 404
+    
+    def test_queued_threat_get_and_resolve(self, test_client, reset_storage, sample_threat_event):
+        """Test a threat still queued for the database writer can be fetched and resolved right after ingest"""
+        from uuid import uuid4
+        from unittest.mock import MagicMock, patch
+        from app import storage
+        
+        threat = sample_threat_event.model_copy(update={"id": uuid4()})
+        session = MagicMock()
+        with patch.object(storage, "USE_DATABASE", True), \
+             patch.object(storage, "SessionLocal") as mock_factory, \
+             patch("app.api.threats.USE_DATABASE", True), \
+             patch("app.api.threats.AsyncSessionLocal", session), \
+             patch.dict(storage._pending_threats, {threat.id: threat}):
+            fetched = test_client.get(f"/api/v1/threats/{threat.id}")
+            resolved = test_client.post(f"/api/v1/threats/{threat.id}/resolve")
+        
+        assert fetched.status_code == 200
+        assert fetched.json()["id"] == str(threat.id)
+        assert resolved.status_code == 200
+        assert threat.resolved is True
+        assert threat.resolved_at is not None
+        mock_factory.return_value.get.assert_not_called()
+        session.assert_not_called()
+    
+    def test_resolve_threat_writes_to_database(self, test_client, reset_storage):
+        """Test resolving a threat issues the UPDATE when the database is enabled"""
+        from uuid import uuid4
+        from unittest.mock import AsyncMock, MagicMock, patch
+        
+        db = AsyncMock()
+        db.execute.return_value = MagicMock(rowcount=1)
+        session = MagicMock()
+        session.return_value.__aenter__.return_value = db
+        threat_id = str(uuid4())
+        
+        with patch("app.api.threats.USE_DATABASE", True), \
+             patch("app.api.threats.AsyncSessionLocal", session):
+            response = test_client.post(f"/api/v1/threats/{threat_id}/resolve")
+        
+        assert response.status_code == 200
+        assert response.json() == {"status": "resolved", "threat_id": threat_id}
+        db.execute.assert_awaited_once()
+        db.commit.assert_awaited_once()
@@ -1,8 +1,11 @@
 """
 Unit tests for FalcoProcessor service
 """
+import re
+import types
 import pytest
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock
+from app.services import falco_processor
 from app.services.falco_processor import FalcoProcessor
 from app.models.threat_event import ThreatSeverity, ThreatType
 from tests.fixtures.falco_events import (
@@ -16,6 +19,77 @@ from tests.fixtures.falco_events import (
 )
 
 
+@pytest.fixture(autouse=True)
+def mock_broadcast(monkeypatch):
+    """Replace the WebSocket broadcast for every test in this module"""
+    mock = AsyncMock()
+    monkeypatch.setattr("app.services.falco_processor.manager.broadcast", mock)
+    return mock
+
+
+class _StubScanTerminated(Exception):
+    """Stand-in for hyperscan.ScanTerminated"""
+
+
+class _StubHyperscanDatabase:
+    """Minimal hyperscan.Database: matches in end-offset order, and raises ScanTerminated when the handler returns True"""
+    
+    def compile(self, expressions, ids, elements, flags):
+        self.patterns = [(re.compile(expression, re.IGNORECASE), id_) for expression, id_ in zip(expressions, ids)]
+    
+    def scan(self, data, match_event_handler):
+        matches = sorted(
+            (match.end(), id_, match.start())
+            for pattern, id_ in self.patterns
+            for match in [pattern.search(data)] if match
+        )
+        for end, id_, start in matches:
+            if match_event_handler(id_, start, end, 0, None):
+                raise _StubScanTerminated()
+
+
+_STUB_HYPERSCAN = types.SimpleNamespace(
+    Database=_StubHyperscanDatabase,
+    ScanTerminated=_StubScanTerminated,
+    HS_FLAG_CASELESS=1,
+    HS_FLAG_SINGLEMATCH=2
+)
+
+
+@pytest.mark.unit
+class TestHyperscanDetection:
+    """Test the hyperscan keyword path classifies like the regex path"""
+    
+    @pytest.fixture
+    def hyperscan_processor(self, monkeypatch):
+        """FalcoProcessor built against the stub hyperscan module"""
+        monkeypatch.setattr(falco_processor, "hyperscan", _STUB_HYPERSCAN)
+        processor = FalcoProcessor()
+        assert processor._keyword_db is not None
+        return processor
+    
+    @pytest.mark.parametrize("output,rule", [
+        ("Test event with nc -e /bin/sh", "Reverse shell"),
+        ("sudo cat /etc/shadow", "Privilege change"),
+        ("cat /etc/shadow then open a shell", "Read sensitive file"),
+        ("Port Scan detected", "Suspicious network"),
+        ("container escape via host mount", "Escape"),
+        ("nothing to see", "Benign rule"),
+    ])
+    def test_matches_regex_path(self, hyperscan_processor, output, rule):
+        """Test both keyword paths pick the same threat type"""
+        regex_processor = FalcoProcessor.__new__(FalcoProcessor)
+        regex_processor._keyword_db = None
+        
+        assert hyperscan_processor._detect_threat_type(output, rule) == regex_processor._detect_threat_type(output, rule)
+    
+    def test_reverse_shell_match_stops_scan(self, hyperscan_processor):
+        """Test a reverse-shell hit ends the scan early and still classifies the event"""
+        threat_type = hyperscan_processor._detect_threat_type("/bin/sh spawned, then sudo and a password read", "Shell")
+        
+        assert threat_type == ThreatType.REVERSE_SHELL
+
+
 @pytest.mark.unit
 @pytest.mark.asyncio
 class TestFalcoProcessor:
@@ -29,107 +103,96 @@ class TestFalcoProcessor:
     @pytest.mark.asyncio
     async def test_process_reverse_shell_event(self, processor, reset_storage):
         """Test processing reverse shell event"""
-        with patch('app.services.falco_processor.manager.broadcast', new_callable=AsyncMock):
-            threat = await processor.process_event(REVERSE_SHELL_EVENT)
-            
-            assert threat is not None
-            assert threat.severity == ThreatSeverity.HIGH  # Critical maps to HIGH
-            assert threat.threat_type == ThreatType.REVERSE_SHELL
-            assert threat.source_pod == "evil-pod"
-            assert threat.source_namespace == "default"
-            assert threat.falco_rule == "Reverse shell detected"
-            assert threat.falco_priority == "Critical"
+        threat = await processor.process_event(REVERSE_SHELL_EVENT)
+        
+        assert threat is not None
+        assert threat.severity == ThreatSeverity.HIGH  # Critical maps to HIGH
+        assert threat.threat_type == ThreatType.REVERSE_SHELL
+        assert threat.source_pod == "evil-pod"
+        assert threat.source_namespace == "default"
+        assert threat.falco_rule == "Reverse shell detected"
+        assert threat.falco_priority == "Critical"
     
     @pytest.mark.asyncio
     async def test_process_privilege_escalation_event(self, processor, reset_storage):
         """Test processing privilege escalation event"""
-        with patch('app.services.falco_processor.manager.broadcast', new_callable=AsyncMock):
-            threat = await processor.process_event(PRIVILEGE_ESCALATION_EVENT)
-            
-            assert threat is not None
-            assert threat.severity == ThreatSeverity.HIGH  # Alert maps to HIGH
-            assert threat.threat_type == ThreatType.PRIVILEGE_ESCALATION
-            assert threat.source_pod == "suspicious-pod"
+        threat = await processor.process_event(PRIVILEGE_ESCALATION_EVENT)
+        
+        assert threat is not None
+        assert threat.severity == ThreatSeverity.HIGH  # Alert maps to HIGH
+        assert threat.threat_type == ThreatType.PRIVILEGE_ESCALATION
+        assert threat.source_pod == "suspicious-pod"
     
     @pytest.mark.asyncio
     async def test_process_network_anomaly_event(self, processor, reset_storage):
         """Test processing network anomaly event"""
-        with patch('app.services.falco_processor.manager.broadcast', new_callable=AsyncMock):
-            threat = await processor.process_event(NETWORK_ANOMALY_EVENT)
-            
-            assert threat is not None
-            assert threat.severity == ThreatSeverity.MEDIUM  # Warning maps to MEDIUM
-            assert threat.threat_type == ThreatType.NETWORK_ANOMALY
+        threat = await processor.process_event(NETWORK_ANOMALY_EVENT)
+        
+        assert threat is not None
+        assert threat.severity == ThreatSeverity.MEDIUM  # Warning maps to MEDIUM
+        assert threat.threat_type == ThreatType.NETWORK_ANOMALY
     
     @pytest.mark.asyncio
     async def test_process_container_escape_event(self, processor, reset_storage):
         """Test processing container escape event"""
-        with patch('app.services.falco_processor.manager.broadcast', new_callable=AsyncMock):
-            threat = await processor.process_event(CONTAINER_ESCAPE_EVENT)
-            
-            assert threat is not None
-            assert threat.severity == ThreatSeverity.HIGH
-            assert threat.threat_type == ThreatType.CONTAINER_ESCAPE
+        threat = await processor.process_event(CONTAINER_ESCAPE_EVENT)
+        
+        assert threat is not None
+        assert threat.severity == ThreatSeverity.HIGH
+        assert threat.threat_type == ThreatType.CONTAINER_ESCAPE
     
     @pytest.mark.asyncio
     async def test_process_low_severity_event(self, processor, reset_storage):
         """Test processing low severity event"""
-        with patch('app.services.falco_processor.manager.broadcast', new_callable=AsyncMock):
-            threat = await processor.process_event(LOW_SEVERITY_EVENT)
-            
-            assert threat is not None
-            assert threat.severity == ThreatSeverity.LOW  # Notice maps to LOW
+        threat = await processor.process_event(LOW_SEVERITY_EVENT)
+        
+        assert threat is not None
+        assert threat.severity == ThreatSeverity.LOW  # Notice maps to LOW
     
     @pytest.mark.asyncio
-    async def test_severity_mapping(self, processor, reset_storage):
-        """Test severity mapping for all priority levels"""
-        priority_map = {
-            "Emergency": ThreatSeverity.CRITICAL,
-            "Alert": ThreatSeverity.HIGH,
-            "Critical": ThreatSeverity.HIGH,
-            "Error": ThreatSeverity.MEDIUM,
-            "Warning": ThreatSeverity.MEDIUM,
-            "Notice": ThreatSeverity.LOW,
-            "Informational": ThreatSeverity.LOW,
-            "Debug": ThreatSeverity.LOW
+    @pytest.mark.parametrize("priority,expected_severity", [
+        ("Emergency", ThreatSeverity.CRITICAL),
+        ("Alert", ThreatSeverity.HIGH),
+        ("Critical", ThreatSeverity.HIGH),
+        ("Error", ThreatSeverity.MEDIUM),
+        ("Warning", ThreatSeverity.MEDIUM),
+        ("Notice", ThreatSeverity.LOW),
+        ("Informational", ThreatSeverity.LOW),
+        ("Debug", ThreatSeverity.LOW),
+    ])
+    async def test_severity_mapping(self, processor, reset_storage, priority, expected_severity):
+        """Test severity mapping for each priority level"""
+        event = {
+            "output": f"Test {priority} event",
+            "priority": priority,
+            "rule": "Test rule",
+            "output_fields": {"k8s.pod.name": "test-pod"}
         }
         
-        for priority, expected_severity in priority_map.items():
-            event = {
-                "output": f"Test {priority} event",
-                "priority": priority,
-                "rule": "Test rule",
-                "output_fields": {"k8s.pod.name": "test-pod"}
-            }
-            
-            with patch('app.services.falco_processor.manager.broadcast', new_callable=AsyncMock):
-                threat = await processor.process_event(event)
-                assert threat.severity == expected_severity, f"Failed for priority: {priority}"
+        threat = await processor.process_event(event)
+        assert threat.severity == expected_severity
     
     @pytest.mark.asyncio
-    async def test_threat_type_detection(self, processor, reset_storage):
-        """Test threat type detection from keywords"""
-        test_cases = [
-            ("nc -e /bin/sh", ThreatType.REVERSE_SHELL),
-            ("bash -i", ThreatType.REVERSE_SHELL),
-            ("sudo su", ThreatType.PRIVILEGE_ESCALATION),
-            ("setuid", ThreatType.PRIVILEGE_ESCALATION),
-            ("port scan", ThreatType.NETWORK_ANOMALY),
-            ("/etc/passwd", ThreatType.FILE_ANOMALY),
-            ("container escape", ThreatType.CONTAINER_ESCAPE),
-        ]
-        
-        for keyword, expected_type in test_cases:
-            event = {
-                "output": f"Test event with {keyword}",
-                "priority": "Warning",
-                "rule": f"Rule with {keyword}",
-                "output_fields": {"k8s.pod.name": "test-pod"}
-            }
-            
-            with patch('app.services.falco_processor.manager.broadcast', new_callable=AsyncMock):
-                threat = await processor.process_event(event)
-                assert threat.threat_type == expected_type, f"Failed for keyword: {keyword}"
+    @pytest.mark.parametrize("keyword,expected_type", [
+        ("nc -e /bin/sh", ThreatType.REVERSE_SHELL),
+        ("bash -i", ThreatType.REVERSE_SHELL),
+        ("sudo su", ThreatType.PRIVILEGE_ESCALATION),
+        ("setuid", ThreatType.PRIVILEGE_ESCALATION),
+        ("port scan", ThreatType.NETWORK_ANOMALY),
+        ("/etc/passwd", ThreatType.FILE_ANOMALY),
+        ("container escape", ThreatType.CONTAINER_ESCAPE),
+    ])
+    async def test_threat_type_detection(self, processor, reset_storage, keyword, expected_type):
+        """Test threat type detection from each keyword"""
+        event = {
+            "output": f"Test event with {keyword}",
+            "priority": "Warning",
+            "rule": f"Rule with {keyword}",
+            "output_fields": {"k8s.pod.name": "test-pod"}
+        }
+        
+        threat = await processor.process_event(event)
+        assert threat.threat_type == expected_type
     
     @pytest.mark.asyncio
     async def test_malformed_event(self, processor, reset_storage):
@@ -142,24 +205,35 @@ class TestFalcoProcessor:
     @pytest.mark.asyncio
     async def test_incomplete_event(self, processor, reset_storage):
         """Test handling of events with missing output_fields"""
-        with patch('app.services.falco_processor.manager.broadcast', new_callable=AsyncMock):
-            threat = await processor.process_event(INCOMPLETE_EVENT)
-            
-            assert threat is not None
-            assert threat.source_pod is None or threat.source_pod == ""
-            assert threat.source_namespace == "default"  # Default namespace
+        threat = await processor.process_event(INCOMPLETE_EVENT)
+        
+        assert threat is not None
+        assert threat.source_pod is None or threat.source_pod == ""
+        assert threat.source_namespace == "default"  # Default namespace
     
     @pytest.mark.asyncio
-    async def test_websocket_broadcast(self, processor, reset_storage):
+    async def test_websocket_broadcast(self, processor, reset_storage, mock_broadcast):
         """Test that WebSocket broadcast is called"""
-        with patch('app.services.falco_processor.manager.broadcast', new_callable=AsyncMock) as mock_broadcast:
-            threat = await processor.process_event(REVERSE_SHELL_EVENT)
-            
-            assert threat is not None
-            mock_broadcast.assert_called_once()
-            call_args = mock_broadcast.call_args[0][0]
-            assert call_args["type"] == "threat_detected"
-            assert call_args["threat_id"] == str(threat.id)
+        threat = await processor.process_event(REVERSE_SHELL_EVENT)
+        
+        assert threat is not None
+        mock_broadcast.assert_called_once()
+        call_args = mock_broadcast.call_args[0][0]
+        assert call_args["type"] == "threat_detected"
+        assert call_args["threat_id"] == str(threat.id)
+    
+    @pytest.mark.asyncio
+    async def test_process_events_broadcasts_once(self, processor, reset_storage, mock_broadcast):
+        """Test a batch of events is announced in a single WebSocket message"""
+        events = [REVERSE_SHELL_EVENT, MALFORMED_EVENT, PRIVILEGE_ESCALATION_EVENT]
+        threats = await processor.process_events(events)
+        
+        created = [threat for threat in threats if threat is not None]
+        mock_broadcast.assert_called_once()
+        message = mock_broadcast.call_args[0][0]
+        assert message["type"] == "threats_batch"
+        assert [item["threat_id"] for item in message["items"]] == [str(threat.id) for threat in created]
+        assert all(item["type"] == "threat_detected" for item in message["items"])
     
     @pytest.mark.asyncio
     async def test_threat_storage(self, processor, reset_storage):
@@ -168,11 +242,10 @@ class TestFalcoProcessor:
         
         initial_count = len(threats_db)
         
-        with patch('app.services.falco_processor.manager.broadcast', new_callable=AsyncMock):
-            threat = await processor.process_event(REVERSE_SHELL_EVENT)
-            
-            assert len(threats_db) == initial_count + 1
-            assert threat in threats_db
+        threat = await processor.process_event(REVERSE_SHELL_EVENT)
+        
+        assert len(threats_db) == initial_count + 1
+        assert threat in threats_db
     
     @pytest.mark.asyncio
     async def test_description_truncation(self, processor, reset_storage):
@@ -185,7 +258,6 @@ class TestFalcoProcessor:
             "output_fields": {"k8s.pod.name": "test-pod"}
         }
         
-        with patch('app.services.falco_processor.manager.broadcast', new_callable=AsyncMock):
-            threat = await processor.process_event(event)
-            
-            assert len(threat.description) <= 500  # Should be truncated
+        threat = await processor.process_event(event)
+        
+        assert len(threat.description) <= 500  # Should be truncated
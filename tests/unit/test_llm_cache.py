@@ -0,0 +1,50 @@
+"""
+Unit tests for LLMCache
+"""
+import pytest
+from unittest.mock import patch
+from app.services.llm_cache import LLMCache
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestLLMCache:
+    """Test LLMCache"""
+    
+    async def test_get_set(self):
+        """Test storing and retrieving a value"""
+        cache = LLMCache()
+        key = LLMCache.make_key(provider="openai", threat_type="reverse_shell")
+        
+        assert await cache.get(key) is None
+        await cache.set(key, "Sir, explanation")
+        
+        assert await cache.get(key) == "Sir, explanation"
+        assert cache.stats() == {"size": 1, "hits": 1, "misses": 1}
+    
+    async def test_make_key_is_order_independent(self):
+        """Test keys do not depend on field order"""
+        assert LLMCache.make_key(a=1, b=2) == LLMCache.make_key(b=2, a=1)
+        assert LLMCache.make_key(a=1) != LLMCache.make_key(a=2)
+    
+    async def test_lru_eviction(self):
+        """Test least recently used entries are evicted first"""
+        cache = LLMCache(maxsize=2)
+        await cache.set("a", "1")
+        await cache.set("b", "2")
+        await cache.get("a")
+        await cache.set("c", "3")
+        
+        assert await cache.get("b") is None
+        assert await cache.get("a") == "1"
+        assert await cache.get("c") == "3"
+    
+    async def test_ttl_expiry(self):
+        """Test entries expire after the TTL"""
+        cache = LLMCache(ttl=10)
+        with patch("app.services.llm_cache.time.monotonic", return_value=100.0):
+            await cache.set("a", "1")
+        with patch("app.services.llm_cache.time.monotonic", return_value=111.0):
+            assert await cache.get("a") is None
+        
+        assert cache.stats()["size"] == 0
@@ -3,11 +3,55 @@ Unit tests for LLMService
 """
 import pytest
 import os
+import json
+from types import SimpleNamespace
 from unittest.mock import patch, AsyncMock, MagicMock
 from app.services.llm_service import LLMService
 from app.models.threat_event import ThreatEvent, ThreatSeverity, ThreatType
 
 
+class StubOllamaStream:
+    """Async context manager standing in for httpx's streaming response"""
+    
+    def __init__(self, chunks):
+        self._lines = [json.dumps(chunk) for chunk in chunks]
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return False
+    
+    def raise_for_status(self):
+        return None
+    
+    async def aiter_lines(self):
+        for line in self._lines:
+            yield line
+
+
+class StubHTTPClient:
+    """Minimal httpx.AsyncClient stand-in that records its calls"""
+    
+    def __init__(self, status_code: int = 200):
+        self.response = SimpleNamespace(status_code=status_code)
+        self.chunks = []
+        self.get_calls = 0
+        self.stream_calls = 0
+        self.close_calls = 0
+    
+    async def get(self, *args, **kwargs):
+        self.get_calls += 1
+        return self.response
+    
+    def stream(self, *args, **kwargs):
+        self.stream_calls += 1
+        return StubOllamaStream(self.chunks)
+    
+    async def aclose(self):
+        self.close_calls += 1
+
+
 @pytest.mark.unit
 @pytest.mark.asyncio
 class TestLLMService:
@@ -18,6 +62,37 @@ class TestLLMService:
         """Create LLMService instance"""
         return LLMService()
     
+    @pytest.fixture
+    def openai_service(self, mock_openai_client):
+        """Initialized OpenAI-backed LLMService using the injected mock client"""
+        service = LLMService(openai_client=mock_openai_client)
+        service.initialized = True
+        service.provider = "openai"
+        service.api_key = "test-key"
+        return service
+    
+    @pytest.fixture
+    def mock_http_client(self):
+        """Stand-in for the shared httpx.AsyncClient"""
+        return StubHTTPClient()
+    
+    @pytest.fixture
+    def ollama_service(self, mock_http_client):
+        """Initialized Ollama-backed LLMService using the injected mock HTTP client"""
+        service = LLMService(http_client=mock_http_client)
+        service.initialized = True
+        service.provider = "ollama"
+        return service
+    
+    @pytest.fixture
+    def anthropic_service(self, mock_anthropic_client):
+        """Initialized Anthropic-backed LLMService using the injected mock client"""
+        service = LLMService(anthropic_client=mock_anthropic_client)
+        service.initialized = True
+        service.provider = "anthropic"
+        service.api_key = "test-key"
+        return service
+    
     @pytest.mark.asyncio
     async def test_initialize_openai(self, llm_service):
         """Test initialization with OpenAI"""
@@ -39,20 +114,15 @@ class TestLLMService:
             assert service.provider == "anthropic"
     
     @pytest.mark.asyncio
-    async def test_initialize_ollama(self, llm_service):
+    async def test_initialize_ollama(self, mock_http_client):
         """Test initialization with Ollama"""
         with patch.dict(os.environ, {"LLM_PROVIDER": "ollama"}):
-            service = LLMService()
+            service = LLMService(http_client=mock_http_client)
+            await service.initialize()
             
-            with patch('httpx.AsyncClient') as mock_client:
-                mock_response = MagicMock()
-                mock_response.status_code = 200
-                mock_client.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
-                
-                await service.initialize()
-                
-                assert service.initialized is True
-                assert service.provider == "ollama"
+            assert service.initialized is True
+            assert service.provider == "ollama"
+            assert mock_http_client.get_calls == 1
     
     @pytest.mark.asyncio
     async def test_initialize_no_provider(self, llm_service):
@@ -117,12 +187,8 @@ class TestLLMService:
         assert "network-pod" in explanation
     
     @pytest.mark.asyncio
-    async def test_explain_openai(self, llm_service, mock_openai_client):
+    async def test_explain_openai(self, openai_service, mock_openai_client):
         """Test OpenAI explanation generation"""
-        llm_service.initialized = True
-        llm_service.provider = "openai"
-        llm_service.api_key = "test-key"
-        
         threat = ThreatEvent(
             severity=ThreatSeverity.HIGH,
             threat_type=ThreatType.REVERSE_SHELL,
@@ -130,19 +196,18 @@ class TestLLMService:
             description="Test threat"
         )
         
-        with patch('app.services.llm_service.openai.AsyncOpenAI', return_value=mock_openai_client):
-            explanation = await llm_service.explain_threat(threat)
-            
-            assert "Sir" in explanation
-            mock_openai_client.chat.completions.create.assert_called_once()
+        explanation = await openai_service.explain_threat(threat)
+        
+        assert "Sir" in explanation
+        mock_openai_client.chat.completions.create.assert_called_once()
+        
+        messages = mock_openai_client.chat.completions.create.call_args.kwargs["messages"]
+        assert messages[0] == {"role": "system", "content": openai_service.SYSTEM_PROMPT}
+        assert "Threat Type: reverse_shell" in messages[1]["content"]
     
     @pytest.mark.asyncio
-    async def test_explain_anthropic(self, llm_service, mock_anthropic_client):
+    async def test_explain_anthropic(self, anthropic_service, mock_anthropic_client):
         """Test Anthropic explanation generation"""
-        llm_service.initialized = True
-        llm_service.provider = "anthropic"
-        llm_service.api_key = "test-key"
-        
         threat = ThreatEvent(
             severity=ThreatSeverity.HIGH,
             threat_type=ThreatType.REVERSE_SHELL,
@@ -150,54 +215,157 @@ class TestLLMService:
             description="Test threat"
         )
         
-        with patch('app.services.llm_service.anthropic.AsyncAnthropic', return_value=mock_anthropic_client):
-            explanation = await llm_service.explain_threat(threat)
-            
-            assert "Sir" in explanation
-            mock_anthropic_client.messages.create.assert_called_once()
+        explanation = await anthropic_service.explain_threat(threat)
+        
+        assert "Sir" in explanation
+        mock_anthropic_client.messages.create.assert_called_once()
+        
+        kwargs = mock_anthropic_client.messages.create.call_args.kwargs
+        assert kwargs["system"][0]["text"] == anthropic_service.SYSTEM_PROMPT
+        assert kwargs["system"][0]["cache_control"] == {"type": "ephemeral"}
+        assert "Pod: test-pod" in kwargs["messages"][0]["content"]
     
     @pytest.mark.asyncio
-    async def test_explain_ollama(self, llm_service, mock_ollama_response):
+    async def test_explain_ollama(self, ollama_service, mock_http_client, mock_ollama_response):
         """Test Ollama explanation generation"""
-        llm_service.initialized = True
-        llm_service.provider = "ollama"
-        llm_service.ollama_url = "http://localhost:11434"
-        
         threat = ThreatEvent(
             severity=ThreatSeverity.HIGH,
             threat_type=ThreatType.REVERSE_SHELL,
             source_pod="test-pod",
             description="Test threat"
         )
+        mock_http_client.chunks = [mock_ollama_response]
         
-        with patch('httpx.AsyncClient') as mock_client:
-            mock_response = MagicMock()
-            mock_response.status_code = 200
-            mock_response.json.return_value = mock_ollama_response
-            mock_client.return_value.__aenter__.return_value.post = AsyncMock(return_value=mock_response)
-            
-            explanation = await llm_service.explain_threat(threat)
-            
-            assert "Sir" in explanation
+        explanation = await ollama_service.explain_threat(threat)
+        
+        assert explanation == mock_ollama_response["response"]
+        assert mock_http_client.stream_calls == 1
     
     @pytest.mark.asyncio
-    async def test_explain_error_fallback(self, llm_service):
-        """Test that errors fall back to template"""
+    async def test_explain_ollama_stream(self, ollama_service, mock_http_client):
+        """Test Ollama tokens are yielded as they arrive"""
+        threat = ThreatEvent(severity=ThreatSeverity.HIGH, source_pod="test-pod", description="Test threat")
+        chunks = [{"response": "Sir,"}, {"response": " a threat"}, {"response": " appeared.", "done": True}]
+        mock_http_client.chunks = chunks
+        
+        tokens = [token async for token in ollama_service.explain_threat_stream(threat)]
+        
+        assert tokens == ["Sir,", " a threat", " appeared."]
+        # The joined explanation is cached for non-streaming callers
+        assert await ollama_service.explain_threat(threat) == "Sir, a threat appeared."
+    
+    @pytest.mark.asyncio
+    async def test_http_client_reused_across_calls(self, llm_service, mock_ollama_response, monkeypatch):
+        """Test the HTTP client is created once and reused"""
         llm_service.initialized = True
-        llm_service.provider = "openai"
+        llm_service.provider = "ollama"
+        
+        created = []
         
+        def make_client(*args, **kwargs):
+            client = StubHTTPClient()
+            client.chunks = [mock_ollama_response]
+            created.append(client)
+            return client
+        
+        monkeypatch.setattr("app.services.llm_service.httpx.AsyncClient", make_client)
+        
+        await llm_service.explain_threat(ThreatEvent(severity=ThreatSeverity.HIGH, source_pod="test-pod", description="First threat"))
+        await llm_service.explain_threat(ThreatEvent(severity=ThreatSeverity.HIGH, source_pod="test-pod", description="Second threat"))
+        
+        assert len(created) == 1
+        assert created[0].stream_calls == 2
+        
+        await llm_service.close()
+        assert created[0].close_calls == 1
+    
+    @pytest.mark.asyncio
+    async def test_repeated_threat_served_from_cache(self, openai_service, mock_openai_client):
+        """Test identical threats reuse the cached explanation"""
+        for _ in range(3):
+            explanation = await openai_service.explain_threat(
+                ThreatEvent(severity=ThreatSeverity.HIGH, source_pod="test-pod", description="Repeated threat")
+            )
+        
+        assert "Sir" in explanation
+        mock_openai_client.chat.completions.create.assert_called_once()
+        assert openai_service.cache.stats()["hits"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_fallback_not_cached(self, openai_service, mock_openai_client):
+        """Test template fallbacks are not cached so the LLM is retried"""
+        mock_openai_client.chat.completions.create.side_effect = Exception("API error")
+        threat = ThreatEvent(severity=ThreatSeverity.HIGH, source_pod="test-pod")
+        
+        await openai_service.explain_threat(threat)
+        
+        assert openai_service.cache.stats()["size"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_explain_threats_bounded_concurrency(self, llm_service):
+        """Test a burst of explanations never exceeds max_concurrency in-flight calls"""
+        import asyncio
+        
+        llm_service.initialized = True
+        llm_service.provider = "ollama"
+        llm_service.max_concurrency = 2
+        llm_service._semaphore = asyncio.Semaphore(2)
+        
+        in_flight = 0
+        peak = 0
+        
+        async def slow_explain(threat):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return "Sir, explained."
+        
+        threats = [ThreatEvent(severity=ThreatSeverity.HIGH, description=f"threat {i}") for i in range(6)]
+        with patch.object(llm_service, "_explain_ollama", side_effect=slow_explain):
+            explanations = await llm_service.explain_threats(threats)
+        
+        assert explanations == ["Sir, explained."] * 6
+        assert peak == 2
+    
+    @pytest.mark.asyncio
+    async def test_rate_limit_retried_with_backoff(self, llm_service, mock_ollama_response):
+        """Test 429 responses are retried before falling back"""
+        import httpx
+        
+        llm_service.initialized = True
+        llm_service.provider = "ollama"
+        llm_service.RETRY_BASE_DELAY = 0
+        
+        request = httpx.Request("POST", "http://localhost:11434/api/generate")
+        rate_limited = httpx.HTTPStatusError(
+            "Too Many Requests", request=request, response=httpx.Response(429, request=request)
+        )
+        with patch.object(
+            llm_service, "_explain_ollama",
+            side_effect=[rate_limited, rate_limited, "Sir, explained."]
+        ) as mock_explain:
+            explanation = await llm_service.explain_threat(ThreatEvent(severity=ThreatSeverity.HIGH, source_pod="test-pod"))
+        
+        assert explanation == "Sir, explained."
+        assert mock_explain.call_count == 3
+    
+    @pytest.mark.asyncio
+    async def test_explain_error_fallback(self, openai_service, mock_openai_client):
+        """Test that errors fall back to template"""
+        mock_openai_client.chat.completions.create.side_effect = Exception("API error")
         threat = ThreatEvent(
-            severity=ThreatSeverity.MEDIUM,
+            severity=ThreatSeverity.HIGH,
             threat_type=ThreatType.NETWORK_ANOMALY,
             source_pod="test-pod"
         )
         
-        with patch('app.services.llm_service.openai.AsyncOpenAI', side_effect=Exception("API error")):
-            explanation = await llm_service.explain_threat(threat)
-            
-            # Should fall back to template
-            assert "Sir" in explanation
-            assert "test-pod" in explanation
+        explanation = await openai_service.explain_threat(threat)
+        
+        # Should fall back to template
+        assert "Sir" in explanation
+        assert "test-pod" in explanation
     
     @pytest.mark.asyncio
     async def test_health_check(self, llm_service):
@@ -220,3 +388,43 @@ class TestLLMService:
         
         assert health["status"] == "degraded"
         assert health["provider"] == "openai"
+    
+    @pytest.mark.asyncio
+    async def test_low_severity_skips_llm(self, openai_service, mock_openai_client):
+        """Test threats below the severity threshold use the template without an LLM call"""
+        explanation = await openai_service.explain_threat(
+            ThreatEvent(severity=ThreatSeverity.MEDIUM, source_pod="test-pod")
+        )
+        
+        assert explanation == openai_service._template_explanation(
+            ThreatEvent(severity=ThreatSeverity.MEDIUM, source_pod="test-pod")
+        )
+        mock_openai_client.chat.completions.create.assert_not_called()
+        assert (await openai_service.health_check())["llm_calls_skipped"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_high_ml_score_uses_llm(self, openai_service, mock_openai_client):
+        """Test a strong anomaly score routes a low-severity threat to the LLM"""
+        threat = ThreatEvent(severity=ThreatSeverity.LOW, source_pod="test-pod", ml_score=0.95)
+        await openai_service.explain_threat(threat)
+        
+        mock_openai_client.chat.completions.create.assert_called_once()
+        assert openai_service.calls_skipped == 0
+    
+    def test_retry_delay_honours_retry_after(self, llm_service):
+        """Test Retry-After from a 429 response sets the backoff delay"""
+        import httpx
+        
+        request = httpx.Request("POST", "http://localhost:11434/api/generate")
+        rate_limited = httpx.HTTPStatusError(
+            "Too Many Requests", request=request,
+            response=httpx.Response(429, request=request, headers={"Retry-After": "2"})
+        )
+        
+        assert llm_service._retry_delay(rate_limited, attempt=0) == 2.0
+    
+    def test_retry_delay_jittered_backoff(self, llm_service):
+        """Test backoff without Retry-After stays within the exponential bound"""
+        delays = [llm_service._retry_delay(Exception("rate limited"), attempt=2) for _ in range(20)]
+        
+        assert all(0 <= delay <= llm_service.RETRY_BASE_DELAY * 4 for delay in delays)
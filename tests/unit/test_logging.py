@@ -0,0 +1,77 @@
+"""
+Unit tests for structured logging
+"""
+import json
+import logging
+import sys
+from logging.handlers import QueueHandler, RotatingFileHandler
+from uuid import uuid4
+import pytest
+from app.utils import logging as app_logging
+from app.utils.logging import JSONFormatter, setup_logging
+
+
+def _record(created: float) -> logging.LogRecord:
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "hello", None, None)
+    record.created = created
+    record.msecs = (created - int(created)) * 1000
+    return record
+
+
+@pytest.mark.unit
+class TestJSONFormatter:
+    """Test JSONFormatter"""
+    
+    def test_timestamp_from_record_created(self):
+        """Test the timestamp is UTC with milliseconds and tracks second changes"""
+        formatter = JSONFormatter()
+        
+        first = json.loads(formatter.format(_record(1700000000.25)))
+        second = json.loads(formatter.format(_record(1700000001.5)))
+        
+        assert first["timestamp"] == "2023-11-14T22:13:20.250Z"
+        assert second["timestamp"] == "2023-11-14T22:13:21.500Z"
+        assert first["message"] == "hello"
+    
+    def test_extra_fields_serialized(self):
+        """Test UUID extras and exception text are serialized"""
+        formatter = JSONFormatter()
+        record = _record(1700000000.0)
+        record.threat_id = uuid4()
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record.exc_info = sys.exc_info()
+        
+        data = json.loads(formatter.format(record))
+        
+        assert data["threat_id"] == str(record.threat_id)
+        assert "ValueError: boom" in data["exception"]
+
+
+@pytest.mark.unit
+class TestSetupLogging:
+    """Test setup_logging"""
+    
+    def test_file_logging_rotates_behind_queue(self, tmp_path):
+        """Test file output uses a rotating handler fed by the queue listener"""
+        log_file = tmp_path / "sentinel.log"
+        root_logger = logging.getLogger()
+        previous_level, previous_handlers = root_logger.level, list(root_logger.handlers)
+        try:
+            setup_logging(log_file=str(log_file))
+            
+            assert isinstance(root_logger.handlers[0], QueueHandler)
+            file_handlers = [
+                handler for handler in app_logging._queue_listener.handlers
+                if isinstance(handler, RotatingFileHandler)
+            ]
+            assert file_handlers[0].maxBytes == app_logging.LOG_MAX_BYTES
+            
+            logging.getLogger("test").warning("rotated")
+            app_logging._stop_queue_listener()
+            assert "rotated" in log_file.read_text()
+        finally:
+            app_logging._stop_queue_listener()
+            root_logger.handlers[:] = previous_handlers
+            root_logger.setLevel(previous_level)
@@ -7,16 +7,40 @@ from unittest.mock import patch, MagicMock
 from app.services.ml_service import MLService
 from app.models.threat_event import ThreatEvent, ThreatSeverity, ThreatType
 
+# Single-row decision_function results, built once and read-only so no test can alter them
+_DECISION_ANOMALY = np.array([-0.3])
+_DECISION_FORCED = np.array([-0.2])
+_DECISION_NEUTRAL = np.array([0.0])
+for _decision in (_DECISION_ANOMALY, _DECISION_FORCED, _DECISION_NEUTRAL):
+    _decision.setflags(write=False)
+
+
+class _FakeModel:
+    """IsolationForest stand-in returning fixed decision_function scores and recording each input"""
+    
+    def __init__(self, decision=None, error=None):
+        self.decision = decision
+        self.error = error
+        self.calls = []
+    
+    def decision_function(self, features):
+        self.calls.append(features)
+        if self.error:
+            raise self.error
+        return self.decision
+
 
 @pytest.mark.unit
-@pytest.mark.asyncio
+@pytest.mark.real_ml
 class TestMLService:
     """Test MLService"""
     
     @pytest.fixture
-    def ml_service(self):
+    def ml_service(self, tmp_path):
         """Create MLService instance"""
-        return MLService()
+        service = MLService()
+        service.model_path = str(tmp_path / "isolation_forest.joblib")
+        return service
     
     @pytest.mark.asyncio
     async def test_initialize_with_scikit_learn(self, ml_service):
@@ -31,6 +55,41 @@ class TestMLService:
             assert ml_service.model is not None
             mock_model.fit.assert_called_once()
     
+    @pytest.mark.asyncio
+    async def test_initialize_reuses_saved_model(self, ml_service):
+        """Test a trained model is saved and loaded on the next start"""
+        import os
+        
+        await ml_service.initialize()
+        assert os.path.exists(ml_service.model_path)
+        
+        restarted = MLService()
+        restarted.model_path = ml_service.model_path
+        with patch('sklearn.ensemble.IsolationForest.fit') as mock_fit:
+            await restarted.initialize()
+        
+        assert restarted.initialized is True
+        mock_fit.assert_not_called()
+        features = ml_service._extract_features(ThreatEvent(description="Test")).reshape(1, -1)
+        assert restarted.model.decision_function(features) == pytest.approx(
+            ml_service.model.decision_function(features)
+        )
+    
+    @pytest.mark.asyncio
+    async def test_initialize_retrains_stale_saved_model(self, ml_service, tmp_path):
+        """Test a saved model with a different feature layout is retrained instead of loaded"""
+        stale_model = MagicMock(n_features_in_=MLService.NUM_FEATURES - 1)
+        (tmp_path / "isolation_forest.joblib").touch()
+        
+        with patch('joblib.load', return_value=stale_model), \
+             patch('joblib.dump'), \
+             patch('sklearn.ensemble.IsolationForest.fit') as mock_fit:
+            await ml_service.initialize()
+        
+        assert ml_service.initialized is True
+        assert ml_service.model is not stale_model
+        mock_fit.assert_called_once()
+    
     @pytest.mark.asyncio
     async def test_initialize_without_scikit_learn(self, ml_service):
         """Test ML service initialization without scikit-learn"""
@@ -57,32 +116,28 @@ class TestMLService:
         assert score == 0.95  # Critical severity should get 0.95 in mock mode
     
     @pytest.mark.asyncio
-    async def test_detect_anomaly_severity_scores(self, ml_service):
+    @pytest.mark.parametrize("severity,expected_score", [
+        (ThreatSeverity.LOW, 0.3),
+        (ThreatSeverity.MEDIUM, 0.6),
+        (ThreatSeverity.HIGH, 0.85),
+        (ThreatSeverity.CRITICAL, 0.95),
+    ])
+    async def test_detect_anomaly_severity_scores(self, ml_service, severity, expected_score):
         """Test that different severities get different mock scores"""
         ml_service.initialized = False
         
-        severity_scores = {
-            ThreatSeverity.LOW: 0.3,
-            ThreatSeverity.MEDIUM: 0.6,
-            ThreatSeverity.HIGH: 0.85,
-            ThreatSeverity.CRITICAL: 0.95
-        }
-        
-        for severity, expected_score in severity_scores.items():
-            threat = ThreatEvent(
-                severity=severity,
-                threat_type=ThreatType.UNKNOWN,
-                description="Test"
-            )
-            score = await ml_service.detect_anomaly(threat)
-            assert score == expected_score
+        threat = ThreatEvent(
+            severity=severity,
+            threat_type=ThreatType.UNKNOWN,
+            description="Test"
+        )
+        score = await ml_service.detect_anomaly(threat)
+        assert score == expected_score
     
     @pytest.mark.asyncio
     async def test_detect_anomaly_with_model(self, ml_service):
         """Test anomaly detection with actual model"""
-        mock_model = MagicMock()
-        mock_model.predict.return_value = np.array([-1])  # Anomaly
-        mock_model.decision_function.return_value = np.array([-0.3])
+        mock_model = _FakeModel(_DECISION_ANOMALY)
         
         ml_service.model = mock_model
         ml_service.initialized = True
@@ -97,12 +152,78 @@ class TestMLService:
         
         score = await ml_service.detect_anomaly(threat)
         
-        assert 0.0 <= score <= 1.0
-        mock_model.predict.assert_called_once()
-        mock_model.decision_function.assert_called_once()
+        assert score == pytest.approx(0.2)
+        # A single decision_function call gives the score; the stub has no predict to fall back on
+        assert len(mock_model.calls) == 1
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("decision,expected", [
+        (np.array([-0.7, 0.0, 0.8]), [0.0, 0.5, 1.0]),
+        (np.array([-0.25, 0.1, 0.45]), [0.25, 0.6, 0.95]),
+    ], ids=["clipped", "in_range"])
+    async def test_detect_anomaly_batch(self, ml_service, decision, expected):
+        """Test batch detection scores all threats with one model call"""
+        mock_model = _FakeModel(decision)
+        
+        ml_service.model = mock_model
+        ml_service.initialized = True
+        
+        threats = [ThreatEvent(description=f"Test {i}") for i in range(3)]
+        scores = await ml_service.detect_anomaly_batch(threats)
+        
+        assert scores.tolist() == pytest.approx(expected)
+        assert len(mock_model.calls) == 1
+        features = mock_model.calls[0]
+        assert features.shape == (3, 15)
+        assert features.dtype == np.float32
     
     @pytest.mark.asyncio
-    async def test_feature_extraction(self, ml_service):
+    async def test_severe_threats_skip_model(self, ml_service):
+        """Test high and critical threats take the fast path and only the rest reach the model"""
+        mock_model = _FakeModel(_DECISION_NEUTRAL)
+        
+        ml_service.model = mock_model
+        ml_service.initialized = True
+        
+        threats = [
+            ThreatEvent(severity=ThreatSeverity.CRITICAL, description="critical"),
+            ThreatEvent(severity=ThreatSeverity.MEDIUM, description="medium"),
+            ThreatEvent(severity=ThreatSeverity.HIGH, description="high"),
+        ]
+        scores = await ml_service.detect_anomaly_batch(threats)
+        
+        assert scores.tolist() == pytest.approx([0.95, 0.5, 0.85])
+        assert [features.shape for features in mock_model.calls] == [(1, 15)]
+    
+    @pytest.mark.asyncio
+    async def test_force_ml_disables_fast_path(self, ml_service):
+        """Test SENTINEL_FORCE_ML scores critical threats with the model"""
+        mock_model = _FakeModel(_DECISION_FORCED)
+        
+        ml_service.model = mock_model
+        ml_service.initialized = True
+        ml_service.force_ml = True
+        
+        score = await ml_service.detect_anomaly(
+            ThreatEvent(severity=ThreatSeverity.CRITICAL, description="critical")
+        )
+        
+        assert score == pytest.approx(0.3)
+        assert len(mock_model.calls) == 1
+    
+    @pytest.mark.asyncio
+    async def test_single_detection_reuses_feature_buffer(self, ml_service):
+        """Test single-threat scoring fills the preallocated row instead of allocating"""
+        mock_model = _FakeModel(_DECISION_NEUTRAL)
+        
+        ml_service.model = mock_model
+        ml_service.initialized = True
+        
+        for i in range(2):
+            await ml_service.detect_anomaly(ThreatEvent(severity=ThreatSeverity.LOW, description=f"Test {i}"))
+            assert mock_model.calls[-1] is ml_service._feature_buf
+    
+    def test_feature_extraction(self, ml_service):
         """Test feature extraction from threat event"""
         threat = ThreatEvent(
             severity=ThreatSeverity.HIGH,
@@ -115,16 +236,29 @@ class TestMLService:
         
         features = ml_service._extract_features(threat)
         
-        assert len(features) == 15  # Updated to 15 features
-        assert all(isinstance(f, (int, float)) for f in features)
+        assert features.shape == (MLService.NUM_FEATURES,)
+        assert features.dtype == np.float32
         assert features[1] == 1.0  # Has pod
         assert features[2] == 1.0  # Has user
     
+    def test_categorical_features_use_stable_encoding(self, ml_service):
+        """Test threat type and severity encode to fixed table values"""
+        threat = ThreatEvent(
+            severity=ThreatSeverity.CRITICAL,
+            threat_type=ThreatType.CONTAINER_ESCAPE,
+            description="Test"
+        )
+        
+        features = ml_service._extract_features(threat)
+        
+        assert features[4] == pytest.approx(MLService.THREAT_TYPE_SCORES["container_escape"])
+        assert features[5] == pytest.approx(MLService.SEVERITY_SCORES["critical"])
+        assert set(MLService.THREAT_TYPE_SCORES) == {t.value for t in ThreatType}
+    
     @pytest.mark.asyncio
     async def test_detect_anomaly_error_handling(self, ml_service):
         """Test error handling in anomaly detection"""
-        mock_model = MagicMock()
-        mock_model.predict.side_effect = Exception("Model error")
+        mock_model = _FakeModel(error=Exception("Model error"))
         
         ml_service.model = mock_model
         ml_service.initialized = True
@@ -144,7 +278,7 @@ class TestMLService:
     async def test_health_check(self, ml_service):
         """Test health check"""
         ml_service.initialized = True
-        ml_service.model = MagicMock()
+        ml_service.model = _FakeModel()
         
         health = await ml_service.health_check()
         
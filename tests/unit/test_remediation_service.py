@@ -1,15 +1,17 @@
 """
 Unit tests for RemediationService
 """
+import asyncio
 import pytest
-from unittest.mock import Mock, AsyncMock, patch, MagicMock
+from unittest.mock import patch
 from app.services.remediation_service import RemediationService
-from app.models.threat_event import ThreatEvent, ThreatSeverity, ThreatType
-from app.models.remediation_action import RemediationAction, ActionType, RiskLevel
+from app.storage import actions_db
+from app.models.threat_event import ThreatSeverity, ThreatType
+from app.models.remediation_action import ActionType, RiskLevel
+from tests.fixtures.models import make_action, make_threat
 
 
 @pytest.mark.unit
-@pytest.mark.asyncio
 class TestRemediationService:
     """Test RemediationService"""
     
@@ -18,6 +20,13 @@ class TestRemediationService:
         """Create RemediationService instance"""
         return RemediationService()
     
+    @pytest.fixture(scope="class")
+    async def initialized_remediation_service(self):
+        """RemediationService initialized once per class, for tests that don't change its state"""
+        service = RemediationService()
+        await service.initialize()
+        return service
+    
     @pytest.mark.asyncio
     async def test_initialize_with_k8s(self, remediation_service, mock_k8s_client):
         """Test initialization with Kubernetes available"""
@@ -38,18 +47,16 @@ class TestRemediationService:
             assert remediation_service.k8s_client is None
     
     @pytest.mark.asyncio
-    async def test_execute_action_requires_confirmation(self, remediation_service, reset_storage):
+    async def test_execute_action_requires_confirmation(self, initialized_remediation_service, reset_storage):
         """Test that actions requiring confirmation are not executed"""
-        await remediation_service.initialize()
-        
-        threat = ThreatEvent(
+        threat = make_threat(
             severity=ThreatSeverity.CRITICAL,
             threat_type=ThreatType.REVERSE_SHELL,
             source_pod="test-pod",
             source_namespace="default"
         )
         
-        action = RemediationAction(
+        action = make_action(
             threat_id=threat.id,
             action_type=ActionType.TERMINATE_POD,
             risk_level=RiskLevel.HIGH,
@@ -57,7 +64,7 @@ class TestRemediationService:
             confidence=0.9
         )
         
-        await remediation_service.execute_action(action, threat)
+        await initialized_remediation_service.execute_action(action, threat)
         
         assert action.executed is False
         assert action.success is None
@@ -67,14 +74,14 @@ class TestRemediationService:
         """Test pod termination in simulated mode"""
         remediation_service.initialized = False
         
-        threat = ThreatEvent(
+        threat = make_threat(
             severity=ThreatSeverity.HIGH,
             threat_type=ThreatType.REVERSE_SHELL,
             source_pod="test-pod",
             source_namespace="default"
         )
         
-        action = RemediationAction(
+        action = make_action(
             threat_id=threat.id,
             action_type=ActionType.TERMINATE_POD,
             risk_level=RiskLevel.LOW,
@@ -93,14 +100,14 @@ class TestRemediationService:
         remediation_service.k8s_client = mock_k8s_client['core_v1']
         remediation_service.initialized = True
         
-        threat = ThreatEvent(
+        threat = make_threat(
             severity=ThreatSeverity.HIGH,
             threat_type=ThreatType.REVERSE_SHELL,
             source_pod="test-pod",
             source_namespace="default"
         )
         
-        action = RemediationAction(
+        action = make_action(
             threat_id=threat.id,
             action_type=ActionType.TERMINATE_POD,
             risk_level=RiskLevel.LOW,
@@ -112,25 +119,23 @@ class TestRemediationService:
         
         assert action.executed is True
         assert action.success is True
-        mock_k8s_client['core_v1'].delete_namespaced_pod.assert_called_once_with(
-            name="test-pod",
-            namespace="default",
-            grace_period_seconds=0
-        )
+        assert mock_k8s_client['core_v1'].delete_calls == [
+            {"name": "test-pod", "namespace": "default", "grace_period_seconds": 0}
+        ]
     
     @pytest.mark.asyncio
     async def test_execute_isolate_pod_simulated(self, remediation_service, reset_storage):
         """Test pod isolation in simulated mode"""
         remediation_service.initialized = False
         
-        threat = ThreatEvent(
+        threat = make_threat(
             severity=ThreatSeverity.HIGH,
             threat_type=ThreatType.CONTAINER_ESCAPE,
             source_pod="test-pod",
             source_namespace="default"
         )
         
-        action = RemediationAction(
+        action = make_action(
             threat_id=threat.id,
             action_type=ActionType.ISOLATE_POD,
             risk_level=RiskLevel.LOW,
@@ -144,72 +149,28 @@ class TestRemediationService:
         assert action.success is True
     
     @pytest.mark.asyncio
-    async def test_execute_alert(self, remediation_service, reset_storage):
-        """Test alert action"""
-        await remediation_service.initialize()
-        
-        threat = ThreatEvent(
-            severity=ThreatSeverity.MEDIUM,
-            threat_type=ThreatType.NETWORK_ANOMALY,
-            description="Test alert"
-        )
-        
-        action = RemediationAction(
-            threat_id=threat.id,
-            action_type=ActionType.ALERT,
-            risk_level=RiskLevel.LOW,
-            requires_confirmation=False,
-            confidence=0.7
-        )
-        
-        await remediation_service.execute_action(action, threat)
-        
-        assert action.executed is True
-        assert action.success is True
-    
-    @pytest.mark.asyncio
-    async def test_execute_log(self, remediation_service, reset_storage):
-        """Test log action"""
-        await remediation_service.initialize()
-        
-        threat = ThreatEvent(
-            severity=ThreatSeverity.LOW,
+    @pytest.mark.parametrize("action_type,severity,confidence", [
+        (ActionType.ALERT, ThreatSeverity.MEDIUM, 0.7),
+        (ActionType.LOG, ThreatSeverity.LOW, 0.5),
+        (ActionType.MONITOR, ThreatSeverity.LOW, 0.3),  # Always succeeds
+    ], ids=["alert", "log", "monitor"])
+    async def test_execute_action_simple(self, initialized_remediation_service, reset_storage, action_type, severity, confidence):
+        """Test actions that don't touch Kubernetes execute and succeed"""
+        threat = make_threat(
+            severity=severity,
             threat_type=ThreatType.UNKNOWN,
-            description="Test log"
+            description=f"Test {action_type.value}"
         )
         
-        action = RemediationAction(
+        action = make_action(
             threat_id=threat.id,
-            action_type=ActionType.LOG,
+            action_type=action_type,
             risk_level=RiskLevel.LOW,
             requires_confirmation=False,
-            confidence=0.5
+            confidence=confidence
         )
         
-        await remediation_service.execute_action(action, threat)
-        
-        assert action.executed is True
-        assert action.success is True
-    
-    @pytest.mark.asyncio
-    async def test_execute_monitor(self, remediation_service, reset_storage):
-        """Test monitor action (always succeeds)"""
-        await remediation_service.initialize()
-        
-        threat = ThreatEvent(
-            severity=ThreatSeverity.LOW,
-            threat_type=ThreatType.UNKNOWN
-        )
-        
-        action = RemediationAction(
-            threat_id=threat.id,
-            action_type=ActionType.MONITOR,
-            risk_level=RiskLevel.LOW,
-            requires_confirmation=False,
-            confidence=0.3
-        )
-        
-        await remediation_service.execute_action(action, threat)
+        await initialized_remediation_service.execute_action(action, threat)
         
         assert action.executed is True
         assert action.success is True
@@ -221,16 +182,18 @@ class TestRemediationService:
         remediation_service.initialized = True
         
         # Make K8s call raise exception
-        mock_k8s_client['core_v1'].delete_namespaced_pod.side_effect = Exception("K8s error")
+        def failing_delete(**kwargs):
+            raise Exception("K8s error")
+        mock_k8s_client['core_v1'].on_delete = failing_delete
         
-        threat = ThreatEvent(
+        threat = make_threat(
             severity=ThreatSeverity.HIGH,
             threat_type=ThreatType.REVERSE_SHELL,
             source_pod="test-pod",
             source_namespace="default"
         )
         
-        action = RemediationAction(
+        action = make_action(
             threat_id=threat.id,
             action_type=ActionType.TERMINATE_POD,
             risk_level=RiskLevel.LOW,
@@ -245,18 +208,14 @@ class TestRemediationService:
         assert action.error_message == "K8s error"
     
     @pytest.mark.asyncio
-    async def test_action_storage(self, remediation_service, reset_storage):
+    async def test_action_storage(self, initialized_remediation_service, reset_storage):
         """Test that actions are stored"""
-        from app.storage import actions_db
-        
-        await remediation_service.initialize()
-        
-        threat = ThreatEvent(
+        threat = make_threat(
             severity=ThreatSeverity.MEDIUM,
             threat_type=ThreatType.NETWORK_ANOMALY
         )
         
-        action = RemediationAction(
+        action = make_action(
             threat_id=threat.id,
             action_type=ActionType.ALERT,
             risk_level=RiskLevel.LOW,
@@ -265,7 +224,7 @@ class TestRemediationService:
         )
         
         initial_count = len(actions_db)
-        await remediation_service.execute_action(action, threat)
+        await initialized_remediation_service.execute_action(action, threat)
         
         assert len(actions_db) == initial_count + 1
         assert action in actions_db
@@ -274,7 +233,7 @@ class TestRemediationService:
     async def test_health_check(self, remediation_service):
         """Test health check"""
         remediation_service.initialized = True
-        remediation_service.k8s_client = Mock()
+        remediation_service.k8s_client = object()
         
         health = await remediation_service.health_check()
         
@@ -291,3 +250,162 @@ class TestRemediationService:
         
         assert health["status"] == "degraded"
         assert health["k8s_available"] is False
+    
+    @pytest.mark.asyncio
+    async def test_terminate_pods_runs_concurrently(self, remediation_service, mock_k8s_client):
+        """Test several pods are terminated in parallel off the event loop"""
+        import threading
+        import time
+        
+        remediation_service.k8s_client = mock_k8s_client['core_v1']
+        remediation_service.initialized = True
+        
+        threads = set()
+        def slow_delete(**kwargs):
+            threads.add(threading.get_ident())
+            time.sleep(0.1)
+        mock_k8s_client['core_v1'].on_delete = slow_delete
+        
+        start = time.perf_counter()
+        results = await remediation_service.terminate_pods(["pod-a", "pod-b", "pod-c"], "default")
+        elapsed = time.perf_counter() - start
+        
+        assert results == [True, True, True]
+        assert len(mock_k8s_client['core_v1'].delete_calls) == 3
+        assert threading.get_ident() not in threads
+        assert elapsed < 0.25
+    
+    @pytest.mark.asyncio
+    async def test_namespace_concurrency_limit(self, remediation_service, mock_k8s_client):
+        """Test concurrent calls per namespace are capped"""
+        import threading
+        import time
+        
+        remediation_service.k8s_client = mock_k8s_client['core_v1']
+        remediation_service.initialized = True
+        remediation_service.NAMESPACE_CONCURRENCY = 2
+        
+        lock = threading.Lock()
+        in_flight = peak = 0
+        def tracked_delete(**kwargs):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight -= 1
+        mock_k8s_client['core_v1'].on_delete = tracked_delete
+        
+        await remediation_service.terminate_pods([f"pod-{i}" for i in range(6)], "default")
+        
+        assert peak == 2
+    
+    @pytest.mark.asyncio
+    async def test_submit_action_runs_in_background(self, remediation_service, reset_storage):
+        """Test submitted actions are executed by the worker pool"""
+        remediation_service.initialized = False
+        remediation_service.start_workers()
+        
+        threat = make_threat(
+            severity=ThreatSeverity.HIGH,
+            threat_type=ThreatType.REVERSE_SHELL,
+            source_pod="test-pod",
+            source_namespace="default"
+        )
+        actions = [
+            make_action(
+                threat_id=threat.id,
+                action_type=ActionType.TERMINATE_POD,
+                risk_level=RiskLevel.LOW,
+                requires_confirmation=False,
+                confidence=0.9
+            )
+            for _ in range(10)
+        ]
+        
+        for action in actions:
+            await remediation_service.submit_action(action, threat)
+        await remediation_service._queue.join()
+        
+        assert all(action.executed and action.success for action in actions)
+        assert len(actions_db) == 10
+        
+        await remediation_service.stop_workers()
+        assert remediation_service._workers == []
+    
+    @pytest.mark.asyncio
+    async def test_submit_action_without_workers_executes_inline(self, remediation_service, reset_storage):
+        """Test submit falls back to inline execution when workers are not running"""
+        remediation_service.initialized = False
+        
+        threat = make_threat(source_pod="test-pod")
+        action = make_action(
+            threat_id=threat.id,
+            action_type=ActionType.LOG,
+            risk_level=RiskLevel.LOW
+        )
+        
+        await remediation_service.submit_action(action, threat)
+        
+        assert action.executed is True
+    
+    @pytest.mark.asyncio
+    async def test_submit_action_from_other_loop_executes_inline(self, remediation_service, reset_storage):
+        """Test submit runs inline instead of queueing for workers on a different event loop"""
+        remediation_service.initialized = False
+        other_loop = asyncio.new_event_loop()
+        remediation_service._loop = other_loop
+        remediation_service._queue = asyncio.Queue()
+        
+        threat = make_threat(source_pod="test-pod")
+        action = make_action(
+            threat_id=threat.id,
+            action_type=ActionType.LOG,
+            risk_level=RiskLevel.LOW
+        )
+        
+        try:
+            await remediation_service.submit_action(action, threat)
+        finally:
+            other_loop.close()
+        
+        assert action.executed is True
+        assert remediation_service._queue.empty()
+    
+    @pytest.mark.asyncio
+    async def test_isolate_pods_share_one_policy(self, remediation_service, mock_k8s_client):
+        """Test isolation labels each pod and creates the namespace policy only once"""
+        remediation_service.k8s_client = mock_k8s_client['core_v1']
+        remediation_service.networking_client = mock_k8s_client['networking_v1']
+        remediation_service.initialized = True
+        
+        results = await remediation_service.isolate_pods(["pod-a", "pod-b"], "default")
+        await remediation_service._isolate_pod("pod-c", "default")
+        
+        assert results == [True, True]
+        assert len(mock_k8s_client['networking_v1'].policy_calls) == 1
+        policy = mock_k8s_client['networking_v1'].policy_calls[0]["body"]
+        assert policy.metadata.name == "sentinel-isolated"
+        assert policy.spec.pod_selector.match_labels == {"sentinelforge/isolated": "true"}
+        
+        patch_calls = mock_k8s_client['core_v1'].patch_calls
+        assert len(patch_calls) == 3
+        assert patch_calls[-1] == {
+            "name": "pod-c",
+            "namespace": "default",
+            "body": {"metadata": {"labels": {"sentinelforge/isolated": "true"}}}
+        }
+    
+    @pytest.mark.asyncio
+    async def test_existing_isolation_policy_reused(self, remediation_service, mock_k8s_client):
+        """Test a 409 from an existing isolation policy still isolates the pod"""
+        from kubernetes.client import ApiException
+        
+        remediation_service.k8s_client = mock_k8s_client['core_v1']
+        remediation_service.networking_client = mock_k8s_client['networking_v1']
+        remediation_service.initialized = True
+        mock_k8s_client['networking_v1'].error = ApiException(status=409)
+        
+        assert await remediation_service._isolate_pod("pod-a", "default") is True
+        assert len(mock_k8s_client['core_v1'].patch_calls) == 1
@@ -0,0 +1,144 @@
+"""
+Unit tests for the RL training environment
+"""
+import numpy as np
+import pytest
+from app.services.rl_env import CyberSecurityEnv, SEVERITY_LUT, THREAT_TYPE_LUT, SEVERITIES, THREAT_TYPES
+from app.models.threat_event import ThreatEvent, ThreatSeverity, ThreatType
+
+
+@pytest.mark.unit
+class TestCyberSecurityEnv:
+    """Test CyberSecurityEnv"""
+    
+    @pytest.fixture
+    def env(self):
+        """Create CyberSecurityEnv instance"""
+        return CyberSecurityEnv()
+    
+    def test_threat_to_state(self, env):
+        """Test threat encoding into the state vector"""
+        threat = ThreatEvent(
+            severity=ThreatSeverity.HIGH,
+            threat_type=ThreatType.CONTAINER_ESCAPE,
+            source_pod="test-pod",
+            ml_score=0.8,
+            confidence=0.6
+        )
+        
+        state = env._threat_to_state(threat)
+        
+        assert state.dtype == np.float32
+        assert state.tolist() == pytest.approx([0.75, 0.9, 0.8, 1.0, 0.0, 0.6])
+    
+    def test_zero_ml_score_kept(self, env):
+        """Test an ML score of 0.0 is encoded as-is rather than as missing"""
+        assert env._threat_to_state(ThreatEvent(ml_score=0.0))[2] == 0.0
+        assert env._threat_to_state(ThreatEvent())[2] == 0.5
+    
+    def test_lookup_tables_follow_enum_order(self):
+        """Test the ordinal lookup tables match the per-enum encodings"""
+        assert SEVERITY_LUT[SEVERITIES.index(ThreatSeverity.CRITICAL)] == 1.0
+        assert THREAT_TYPE_LUT[THREAT_TYPES.index(ThreatType.UNKNOWN)] == pytest.approx(0.2)
+    
+    def test_observations_not_overwritten_by_later_steps(self, env):
+        """Test returned observations are copies of the reused state buffer"""
+        obs, _ = env.reset(seed=0)
+        first = obs.copy()
+        
+        next_obs, *_ = env.step(0)
+        
+        assert obs.tolist() == first.tolist()
+        assert next_obs is not obs
+        assert env.observation_space.contains(next_obs)
+
+
+@pytest.mark.unit
+class TestBatchCyberSecurityEnv:
+    """Test the vectorized training environment"""
+    
+    @pytest.fixture
+    def vec_env(self):
+        """Create BatchCyberSecurityEnv instance"""
+        from app.services.rl_vec_env import BatchCyberSecurityEnv
+        return BatchCyberSecurityEnv(num_envs=16, seed=0)
+    
+    def test_reset_shapes(self, vec_env):
+        """Test reset returns one float32 observation per env"""
+        obs = vec_env.reset()
+        
+        assert obs.shape == (16, 6)
+        assert obs.dtype == np.float32
+        assert all(vec_env.observation_space.contains(row) for row in obs)
+    
+    def test_rewards_match_single_env(self, vec_env):
+        """Test batched rewards equal CyberSecurityEnv's reward for each threat"""
+        env = CyberSecurityEnv()
+        vec_env.reset()
+        severities = [SEVERITIES[i] for i in vec_env._severity_idx]
+        threat_types = [THREAT_TYPES[i] for i in vec_env._threat_type_idx]
+        actions = np.arange(16) % 8
+        
+        _, rewards, dones, infos = vec_env.step(actions)
+        
+        for i, action in enumerate(actions):
+            threat = ThreatEvent(severity=severities[i], threat_type=threat_types[i])
+            expected = env._calculate_reward(env._action_to_type(int(action)), threat)
+            assert rewards[i] == pytest.approx(expected)
+        assert dones.tolist() == [a in (3, 4, 7) for a in actions]
+        assert all(("terminal_observation" in info) == done for info, done in zip(infos, dones))
+
+
+@pytest.mark.unit
+class TestRewardTable:
+    """Test the precomputed reward table"""
+    
+    def test_table_matches_reward_rules(self):
+        """Test every table entry equals the reward rules it was built from"""
+        from app.services.rl_env import REWARD_TABLE, ACTION_TYPES, _reward_rule
+        
+        for a, action in enumerate(ACTION_TYPES):
+            for s, severity in enumerate(SEVERITIES):
+                for t, threat_type in enumerate(THREAT_TYPES):
+                    assert REWARD_TABLE[a, s, t] == _reward_rule(action, severity, threat_type)
+    
+    def test_calculate_reward_examples(self):
+        """Test representative rewards including the reverse shell bonus and clipping"""
+        from app.models.remediation_action import ActionType
+        
+        env = CyberSecurityEnv()
+        critical_shell = ThreatEvent(severity=ThreatSeverity.CRITICAL, threat_type=ThreatType.REVERSE_SHELL)
+        high_shell = ThreatEvent(severity=ThreatSeverity.HIGH, threat_type=ThreatType.REVERSE_SHELL)
+        low = ThreatEvent(severity=ThreatSeverity.LOW, threat_type=ThreatType.UNKNOWN)
+        
+        assert env._calculate_reward(ActionType.TERMINATE_POD, critical_shell) == 1.0
+        assert env._calculate_reward(ActionType.TERMINATE_POD, high_shell) == pytest.approx(0.8)
+        assert env._calculate_reward(ActionType.MONITOR, critical_shell) == -1.0
+        assert env._calculate_reward(ActionType.TERMINATE_POD, low) == pytest.approx(-0.8)
+
+
+@pytest.mark.unit
+class TestTrainingThreat:
+    """Test the lightweight training threat"""
+    
+    def test_training_threat_encodes_like_threat_event(self):
+        """Test a TrainingThreat produces the same state and reward as the equivalent ThreatEvent"""
+        from app.services.rl_env import TrainingThreat
+        from app.models.remediation_action import ActionType
+        
+        env = CyberSecurityEnv()
+        fields = dict(
+            severity=ThreatSeverity.CRITICAL,
+            threat_type=ThreatType.REVERSE_SHELL,
+            source_pod="pod-1",
+            source_user=None,
+            ml_score=0.7,
+            confidence=0.4
+        )
+        
+        training_state = env._threat_to_state(TrainingThreat(**fields)).copy()
+        event_state = env._threat_to_state(ThreatEvent(**fields))
+        
+        assert training_state.tolist() == event_state.tolist()
+        assert env._calculate_reward(ActionType.TERMINATE_POD, TrainingThreat(**fields)) == \
+            env._calculate_reward(ActionType.TERMINATE_POD, ThreatEvent(**fields))
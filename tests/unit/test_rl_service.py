@@ -1,14 +1,60 @@
 """
 Unit tests for RLService
 """
+import asyncio
+import numpy as np
 import pytest
+from unittest.mock import MagicMock, patch
 from app.services.rl_service import RLService
-from app.models.threat_event import ThreatEvent, ThreatSeverity, ThreatType
+from app.models.threat_event import ThreatSeverity, ThreatType
 from app.models.remediation_action import ActionType, RiskLevel
+from tests.fixtures.models import make_threat
+
+# Read-only decide_action inputs, built once at import
+THREAT_CRITICAL_REVERSE_SHELL = make_threat(
+    severity=ThreatSeverity.CRITICAL,
+    threat_type=ThreatType.REVERSE_SHELL,
+    ml_score=0.9,
+    description="Reverse shell detected"
+)
+THREAT_CRITICAL_NETWORK = make_threat(
+    severity=ThreatSeverity.CRITICAL,
+    threat_type=ThreatType.NETWORK_ANOMALY,
+    ml_score=0.8,
+    description="Network anomaly"
+)
+THREAT_HIGH_REVERSE_SHELL = make_threat(
+    severity=ThreatSeverity.HIGH,
+    threat_type=ThreatType.REVERSE_SHELL,
+    ml_score=0.7
+)
+THREAT_HIGH_CONTAINER_ESCAPE = make_threat(
+    severity=ThreatSeverity.HIGH,
+    threat_type=ThreatType.CONTAINER_ESCAPE,
+    ml_score=0.7
+)
+THREAT_HIGH_FILE = make_threat(
+    severity=ThreatSeverity.HIGH,
+    threat_type=ThreatType.FILE_ANOMALY,
+    ml_score=0.7
+)
+THREAT_MEDIUM_NETWORK = make_threat(
+    severity=ThreatSeverity.MEDIUM,
+    threat_type=ThreatType.NETWORK_ANOMALY,
+    ml_score=0.6
+)
+THREAT_MEDIUM_UNKNOWN = make_threat(
+    severity=ThreatSeverity.MEDIUM,
+    threat_type=ThreatType.UNKNOWN
+)
+THREAT_LOW_UNKNOWN = make_threat(
+    severity=ThreatSeverity.LOW,
+    threat_type=ThreatType.UNKNOWN,
+    ml_score=0.3
+)
 
 
 @pytest.mark.unit
-@pytest.mark.asyncio
 class TestRLService:
     """Test RLService"""
     
@@ -23,20 +69,56 @@ class TestRLService:
         await rl_service.initialize()
         
         assert rl_service.initialized is True
+        assert rl_service.decide_action == rl_service._decide_with_rules
+    
+    @pytest.mark.asyncio
+    async def test_initialize_warms_loaded_agent(self, tmp_path, monkeypatch):
+        """Test a loaded PPO agent runs one warm-up prediction during initialization"""
+        model_path = tmp_path / "rl_agent.zip"
+        model_path.touch()
+        monkeypatch.setenv("USE_RL_AGENT", "true")
+        monkeypatch.setenv("RL_MODEL_PATH", str(model_path))
+        agent = MagicMock()
+        
+        with patch("stable_baselines3.PPO.load", return_value=agent):
+            service = RLService()
+            await service.initialize()
+        
+        assert service.agent is agent
+        assert service.decide_action == service._decide_batched
+        agent.predict.assert_called_once()
+        assert agent.predict.call_args.args[0].shape == (6,)
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_rl_decisions_share_one_predict(self, rl_service):
+        """Test concurrent decide_action calls are micro-batched into one predict"""
+        await rl_service.initialize()
+        rl_service.use_rl_agent = True
+        rl_service.agent = MagicMock()
+        rl_service.agent.predict.return_value = (np.array([0, 2, 3]), None)
+        rl_service._bind_decide_action()
+        threats = [
+            make_threat(severity=severity)
+            for severity in (ThreatSeverity.LOW, ThreatSeverity.HIGH, ThreatSeverity.CRITICAL)
+        ]
+        
+        actions = await asyncio.gather(*(rl_service.decide_action(threat) for threat in threats))
+        
+        rl_service.agent.predict.assert_called_once()
+        states = rl_service.agent.predict.call_args.args[0]
+        assert states.shape == (3, 6)
+        assert len(set(states[:, 0].tolist())) == 3
+        assert [action.threat_id for action in actions] == [threat.id for threat in threats]
+        assert [action.action_type for action in actions] == [
+            rl_service.env._action_to_type(i) for i in (0, 2, 3)
+        ]
     
     @pytest.mark.asyncio
     async def test_decide_action_critical_reverse_shell(self, rl_service):
         """Test decision for critical reverse shell threat"""
         await rl_service.initialize()
         
-        threat = ThreatEvent(
-            severity=ThreatSeverity.CRITICAL,
-            threat_type=ThreatType.REVERSE_SHELL,
-            ml_score=0.9,
-            description="Reverse shell detected"
-        )
-        
-        action = await rl_service.decide_action(threat)
+        action = await rl_service.decide_action(THREAT_CRITICAL_REVERSE_SHELL)
         
         assert action.action_type == ActionType.TERMINATE_POD
         assert action.risk_level == RiskLevel.HIGH
@@ -48,68 +130,33 @@ class TestRLService:
         """Test decision for critical non-reverse-shell threat"""
         await rl_service.initialize()
         
-        threat = ThreatEvent(
-            severity=ThreatSeverity.CRITICAL,
-            threat_type=ThreatType.NETWORK_ANOMALY,
-            ml_score=0.8,
-            description="Network anomaly"
-        )
-        
-        action = await rl_service.decide_action(threat)
+        action = await rl_service.decide_action(THREAT_CRITICAL_NETWORK)
         
         assert action.action_type == ActionType.ISOLATE_POD
         assert action.risk_level == RiskLevel.MEDIUM
         assert action.requires_confirmation is True
     
     @pytest.mark.asyncio
-    async def test_decide_action_high_severity(self, rl_service):
+    @pytest.mark.parametrize("threat,expected_action,expected_risk", [
+        (THREAT_HIGH_REVERSE_SHELL, ActionType.ISOLATE_POD, RiskLevel.MEDIUM),
+        (THREAT_HIGH_CONTAINER_ESCAPE, ActionType.ISOLATE_POD, RiskLevel.MEDIUM),
+        (THREAT_HIGH_FILE, ActionType.ALERT, RiskLevel.LOW),
+    ], ids=["reverse_shell", "container_escape", "other"])
+    async def test_decide_action_high_severity(self, rl_service, threat, expected_action, expected_risk):
         """Test decision for high severity threats"""
         await rl_service.initialize()
         
-        # High severity reverse shell
-        threat1 = ThreatEvent(
-            severity=ThreatSeverity.HIGH,
-            threat_type=ThreatType.REVERSE_SHELL,
-            ml_score=0.7
-        )
-        
-        action1 = await rl_service.decide_action(threat1)
-        assert action1.action_type == ActionType.ISOLATE_POD
-        assert action1.risk_level == RiskLevel.MEDIUM
-        
-        # High severity container escape
-        threat2 = ThreatEvent(
-            severity=ThreatSeverity.HIGH,
-            threat_type=ThreatType.CONTAINER_ESCAPE,
-            ml_score=0.7
-        )
-        
-        action2 = await rl_service.decide_action(threat2)
-        assert action2.action_type == ActionType.ISOLATE_POD
-        
-        # High severity other
-        threat3 = ThreatEvent(
-            severity=ThreatSeverity.HIGH,
-            threat_type=ThreatType.FILE_ANOMALY,
-            ml_score=0.7
-        )
+        action = await rl_service.decide_action(threat)
         
-        action3 = await rl_service.decide_action(threat3)
-        assert action3.action_type == ActionType.ALERT
-        assert action3.risk_level == RiskLevel.LOW
+        assert action.action_type == expected_action
+        assert action.risk_level == expected_risk
     
     @pytest.mark.asyncio
     async def test_decide_action_medium_severity(self, rl_service):
         """Test decision for medium severity threats"""
         await rl_service.initialize()
         
-        threat = ThreatEvent(
-            severity=ThreatSeverity.MEDIUM,
-            threat_type=ThreatType.NETWORK_ANOMALY,
-            ml_score=0.6
-        )
-        
-        action = await rl_service.decide_action(threat)
+        action = await rl_service.decide_action(THREAT_MEDIUM_NETWORK)
         
         assert action.action_type == ActionType.ALERT
         assert action.risk_level == RiskLevel.LOW
@@ -120,29 +167,33 @@ class TestRLService:
         """Test decision for low severity threats"""
         await rl_service.initialize()
         
-        threat = ThreatEvent(
-            severity=ThreatSeverity.LOW,
-            threat_type=ThreatType.UNKNOWN,
-            ml_score=0.3
-        )
-        
-        action = await rl_service.decide_action(threat)
+        action = await rl_service.decide_action(THREAT_LOW_UNKNOWN)
         
         assert action.action_type == ActionType.LOG
         assert action.risk_level == RiskLevel.LOW
         assert action.confidence == 0.5
     
+    def test_rule_table_covers_every_threat(self):
+        """Test the flattened rule table has an entry for each severity and threat type"""
+        assert len(RLService.RULE_TABLE) == len(ThreatSeverity) * len(ThreatType)
+        assert RLService.RULE_TABLE[(ThreatSeverity.CRITICAL, ThreatType.REVERSE_SHELL)] == (
+            ActionType.TERMINATE_POD, RiskLevel.HIGH, 0.9, True
+        )
+        assert RLService.RULE_TABLE[(ThreatSeverity.LOW, ThreatType.REVERSE_SHELL)] == (
+            ActionType.LOG, RiskLevel.LOW, 0.5, False
+        )
+    
     @pytest.mark.asyncio
     async def test_confidence_with_ml_score(self, rl_service):
         """Test that ML score boosts confidence"""
         await rl_service.initialize()
         
-        threat_no_ml = ThreatEvent(
+        threat_no_ml = make_threat(
             severity=ThreatSeverity.MEDIUM,
             threat_type=ThreatType.NETWORK_ANOMALY
         )
         
-        threat_with_ml = ThreatEvent(
+        threat_with_ml = make_threat(
             severity=ThreatSeverity.MEDIUM,
             threat_type=ThreatType.NETWORK_ANOMALY,
             ml_score=0.9
@@ -159,27 +210,15 @@ class TestRLService:
         await rl_service.initialize()
         
         # High risk
-        threat_high = ThreatEvent(
-            severity=ThreatSeverity.CRITICAL,
-            threat_type=ThreatType.REVERSE_SHELL
-        )
-        action_high = await rl_service.decide_action(threat_high)
+        action_high = await rl_service.decide_action(THREAT_CRITICAL_REVERSE_SHELL)
         assert action_high.requires_confirmation is True
         
         # Medium risk
-        threat_medium = ThreatEvent(
-            severity=ThreatSeverity.CRITICAL,
-            threat_type=ThreatType.NETWORK_ANOMALY
-        )
-        action_medium = await rl_service.decide_action(threat_medium)
+        action_medium = await rl_service.decide_action(THREAT_CRITICAL_NETWORK)
         assert action_medium.requires_confirmation is True
         
         # Low risk
-        threat_low = ThreatEvent(
-            severity=ThreatSeverity.MEDIUM,
-            threat_type=ThreatType.UNKNOWN
-        )
-        action_low = await rl_service.decide_action(threat_low)
+        action_low = await rl_service.decide_action(THREAT_MEDIUM_UNKNOWN)
         assert action_low.requires_confirmation is False
     
     @pytest.mark.asyncio
@@ -187,14 +226,9 @@ class TestRLService:
         """Test that action is linked to threat"""
         await rl_service.initialize()
         
-        threat = ThreatEvent(
-            severity=ThreatSeverity.HIGH,
-            threat_type=ThreatType.REVERSE_SHELL
-        )
-        
-        action = await rl_service.decide_action(threat)
+        action = await rl_service.decide_action(THREAT_HIGH_REVERSE_SHELL)
         
-        assert action.threat_id == threat.id
+        assert action.threat_id == THREAT_HIGH_REVERSE_SHELL.id
     
     @pytest.mark.asyncio
     async def test_health_check(self, rl_service):
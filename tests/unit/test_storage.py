@@ -0,0 +1,335 @@
+"""
+Unit tests for the storage module
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app import storage
+from app.database import connection
+from app.models.threat_event import ThreatEvent
+from app.models.remediation_action import RemediationAction, ActionType
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestThreatBatchWriter:
+    """Test batched database inserts for threats"""
+    
+    async def test_threats_flushed_in_one_batch(self):
+        """Test queued threats are inserted together"""
+        with patch.object(storage, "USE_DATABASE", True), \
+             patch.object(storage, "_flush_threats", new_callable=AsyncMock) as mock_flush:
+            storage.start_threat_writer()
+            threats = [ThreatEvent(description=f"threat {i}") for i in range(3)]
+            for threat in threats:
+                storage.add_threat(threat)
+            
+            await storage.stop_threat_writer()
+            
+            mock_flush.assert_awaited_once_with(threats)
+    
+    async def test_batches_split_at_batch_size(self):
+        """Test a burst larger than the batch size is split into several inserts"""
+        with patch.object(storage, "USE_DATABASE", True), \
+             patch.object(storage, "THREAT_BATCH_SIZE", 2), \
+             patch.object(storage, "_flush_threats", new_callable=AsyncMock) as mock_flush:
+            storage.start_threat_writer()
+            for i in range(5):
+                storage.add_threat(ThreatEvent(description=f"threat {i}"))
+            
+            await storage.stop_threat_writer()
+            
+            assert [len(call.args[0]) for call in mock_flush.await_args_list] == [2, 2, 1]
+    
+    async def test_queued_threat_readable_and_resolvable_before_flush(self, reset_storage):
+        """Test a threat waiting in the write queue can be fetched and resolved, and is inserted resolved"""
+        db = AsyncMock()
+        async_session = MagicMock()
+        async_session.return_value.__aenter__.return_value = db
+        threat = ThreatEvent(description="just ingested")
+        with patch.object(storage, "USE_DATABASE", True), \
+             patch.object(storage, "SessionLocal") as mock_factory, \
+             patch.object(storage, "AsyncSessionLocal", async_session):
+            storage.start_threat_writer()
+            storage.add_threat(threat)
+            
+            assert storage.get_threat_by_id(threat.id) is threat
+            assert storage.resolve_pending_threat(threat.id) is threat
+            mock_factory.assert_not_called()
+            
+            await storage.stop_threat_writer()
+        
+        rows = db.execute.await_args_list[0].args[1]
+        assert rows[0]["id"] == threat.id
+        assert rows[0]["resolved"] is True
+        assert storage._pending_threats == {}
+    
+    async def test_threat_resolved_during_flush_is_updated(self, reset_storage):
+        """Test a resolve that lands while the batch insert is in flight is written afterwards"""
+        threat = ThreatEvent(description="resolved mid-flush")
+        db = AsyncMock()
+        db.execute.side_effect = lambda *args: storage.resolve_pending_threat(threat.id)
+        async_session = MagicMock()
+        async_session.return_value.__aenter__.return_value = db
+        with patch.object(storage, "USE_DATABASE", True), \
+             patch.object(storage, "AsyncSessionLocal", async_session):
+            storage.start_threat_writer()
+            storage.add_threat(threat)
+            await storage.stop_threat_writer()
+        
+        assert db.execute.await_count == 2
+        update_statement = db.execute.await_args_list[1].args[0]
+        assert update_statement.compile().params["resolved"] is True
+        assert db.commit.await_count == 2
+    
+    async def test_writer_not_started_for_in_memory_storage(self, reset_storage):
+        """Test in-memory storage keeps writing synchronously"""
+        storage.start_threat_writer()
+        threat = ThreatEvent(description="in memory")
+        storage.add_threat(threat)
+        
+        assert storage.get_threat_by_id(threat.id) is threat
+        await storage.stop_threat_writer()
+
+
+@pytest.mark.unit
+@pytest.mark.asyncio
+class TestActionBatchWriter:
+    """Test batched database inserts for actions"""
+    
+    async def test_actions_flushed_in_one_batch(self):
+        """Test queued actions are inserted together"""
+        with patch.object(storage, "USE_DATABASE", True), \
+             patch.object(storage, "_flush_actions", new_callable=AsyncMock) as mock_flush:
+            storage.start_action_writer()
+            threat = ThreatEvent()
+            actions = [RemediationAction(threat_id=threat.id) for _ in range(3)]
+            for action in actions:
+                storage.add_action(action)
+            
+            await storage.stop_action_writer()
+            
+            mock_flush.assert_awaited_once_with(actions)
+
+
+@pytest.mark.unit
+class TestActionRingBuffer:
+    """Test the bounded in-memory action store"""
+    
+    def test_oldest_actions_evicted_with_indexes(self, reset_storage):
+        """Test a full buffer drops its oldest action from storage and indexes"""
+        threat = ThreatEvent()
+        with patch.object(storage, "_actions_db", storage.deque(maxlen=3)):
+            actions = [
+                RemediationAction(threat_id=threat.id, action_type=ActionType.ALERT)
+                for _ in range(4)
+            ]
+            for action in actions:
+                storage.add_action(action)
+            
+            assert list(storage._actions_db) == actions[1:]
+            assert storage.get_action_by_id(actions[0].id) is None
+            assert actions[0].id not in storage._actions_by_type[ActionType.ALERT]
+            assert storage.query_actions(action_type=ActionType.ALERT) == actions[1:]
+            assert storage.query_actions(limit=2) == actions[1:3]
+
+
+@pytest.mark.unit
+class TestDatabaseFallback:
+    """Test falling back to in-memory storage when the database fails"""
+    
+    def test_failed_insert_logged_and_kept_in_memory(self, reset_storage, caplog):
+        """Test a failed insert is logged as a warning and stored in memory"""
+        threat = ThreatEvent(description="db down")
+        with patch.object(storage, "USE_DATABASE", True), \
+             patch.object(storage, "SessionLocal", side_effect=Exception("connection refused")):
+            storage.add_threat(threat)
+        
+        assert storage._threats_by_id[threat.id] is threat
+        assert "Database insert failed: connection refused" in caplog.text
+        assert caplog.records[-1].exc_info is not None
+
+    
+    def test_injected_session_reused_without_commit(self):
+        """Test a request-scoped session is flushed but left for its owner to commit and close"""
+        session = MagicMock()
+        with patch.object(storage, "USE_DATABASE", True), \
+             patch.object(storage, "SessionLocal") as mock_factory:
+            storage.add_threat(ThreatEvent(description="request scoped"), db=session)
+        
+        mock_factory.assert_not_called()
+        session.add.assert_called_once()
+        session.flush.assert_called_once()
+        session.commit.assert_not_called()
+        session.close.assert_not_called()
+    
+    def test_own_session_committed_and_closed(self):
+        """Test storage commits and closes a session it opened itself"""
+        with patch.object(storage, "USE_DATABASE", True), \
+             patch.object(storage, "SessionLocal") as mock_factory:
+            storage.add_threat(ThreatEvent(description="short lived"))
+        
+        session = mock_factory.return_value
+        session.commit.assert_called_once()
+        session.close.assert_called_once()
+
+
+@pytest.mark.unit
+class TestAsyncEngineUrl:
+    """Test the async engine URL and its non-fatal creation"""
+    
+    @pytest.mark.parametrize("url,expected", [
+        ("postgresql://u:p@db/sentinel", "postgresql+asyncpg://u:p@db/sentinel"),
+        ("postgresql+psycopg2://u:p@db/sentinel", "postgresql+asyncpg://u:p@db/sentinel"),
+        ("postgresql+asyncpg://u:p@db/sentinel", "postgresql+asyncpg://u:p@db/sentinel"),
+        ("sqlite:///./sentinelforge.db", "sqlite+aiosqlite:///./sentinelforge.db"),
+        ("sqlite+pysqlite:///./sentinelforge.db", "sqlite+aiosqlite:///./sentinelforge.db"),
+    ])
+    def test_async_driver_swapped_in(self, url, expected):
+        """Test any driver of a supported backend is replaced by its asyncio driver"""
+        assert connection._async_url(url).render_as_string(hide_password=False) == expected
+    
+    def test_unusable_url_leaves_no_async_engine(self, caplog):
+        """Test an async engine that can't be built is logged instead of failing the import"""
+        with patch.object(connection, "DATABASE_URL", "mysql+pymysql://u:p@db/sentinel"):
+            assert connection._create_async_engine() is None
+        
+        assert "Async database engine unavailable" in caplog.text
+
+
+@pytest.mark.unit
+class TestBulkThreatInsert:
+    """Test batched threat ingestion"""
+    
+    def test_bulk_insert_single_statement_and_commit(self):
+        """Test many threats go to the database in one executemany and one commit"""
+        threats = [ThreatEvent(description=f"bulk {i}") for i in range(100)]
+        with patch.object(storage, "USE_DATABASE", True), \
+             patch.object(storage, "SessionLocal") as mock_factory:
+            storage.add_threats_bulk(threats)
+        
+        session = mock_factory.return_value
+        session.execute.assert_called_once()
+        assert len(session.execute.call_args.args[1]) == 100
+        session.commit.assert_called_once()
+    
+    def test_bulk_insert_in_memory(self, reset_storage):
+        """Test bulk ingestion indexes every threat for in-memory storage"""
+        threats = [ThreatEvent(description=f"bulk {i}") for i in range(3)]
+        
+        storage.threats_db.extend(threats)
+        
+        assert all(storage.get_threat_by_id(threat.id) is threat for threat in threats)
+    
+    def test_bulk_action_insert_single_statement_and_commit(self):
+        """Test many actions go to the database in one executemany and one commit"""
+        threat = ThreatEvent()
+        actions = [RemediationAction(threat_id=threat.id) for _ in range(50)]
+        with patch.object(storage, "USE_DATABASE", True), \
+             patch.object(storage, "SessionLocal") as mock_factory:
+            storage.actions_db.extend(actions)
+        
+        session = mock_factory.return_value
+        session.execute.assert_called_once()
+        assert len(session.execute.call_args.args[1]) == 50
+        session.commit.assert_called_once()
+
+
+@pytest.mark.unit
+class TestListAccessors:
+    """Test the list-like storage accessors"""
+    
+    def test_len_uses_count_query(self):
+        """Test len() issues a COUNT instead of loading every row"""
+        with patch.object(storage, "USE_DATABASE", True), \
+             patch.object(storage, "SessionLocal") as mock_factory:
+            mock_factory.return_value.scalar.return_value = 42
+            
+            assert len(storage.threats_db) == 42
+        
+        mock_factory.return_value.query.assert_not_called()
+    
+    def test_in_memory_indexing_and_iteration(self, reset_storage):
+        """Test in-memory accessors support indexing, slicing and iteration"""
+        threat = ThreatEvent()
+        actions = [RemediationAction(threat_id=threat.id) for _ in range(3)]
+        storage.actions_db.extend(actions)
+        
+        assert len(storage.actions_db) == 3
+        assert storage.actions_db[1] is actions[1]
+        assert storage.actions_db[-1] is actions[2]
+        assert storage.actions_db[:2] == actions[:2]
+        assert list(storage.actions_db) == actions
+    
+    def test_limited_queries_return_oldest_first(self, reset_storage):
+        """Test both storage modes apply LIMIT to the same oldest-first order"""
+        threats = [ThreatEvent() for _ in range(3)]
+        for threat in threats:
+            storage.add_threat(threat)
+        assert storage.query_threats(limit=2) == threats[:2]
+        
+        with patch.object(storage, "USE_DATABASE", True), \
+             patch.object(storage, "SessionLocal") as mock_factory:
+            execute = mock_factory.return_value.execute
+            storage.query_threats(limit=2)
+            storage.query_actions(limit=2)
+        
+        threats_sql, actions_sql = (str(call.args[0]) for call in execute.call_args_list)
+        assert "ORDER BY threat_events.detected_at ASC" in threats_sql
+        assert "ORDER BY remediation_actions.executed_at ASC NULLS LAST, remediation_actions.id" in actions_sql
+    
+    def test_negative_index_in_database_mode(self):
+        """Test a negative index reads the reversed order with OFFSET instead of the empty fallback list"""
+        with patch.object(storage, "USE_DATABASE", True), \
+             patch.object(storage, "SessionLocal") as mock_factory:
+            scalars = mock_factory.return_value.scalars
+            row = scalars.return_value.first.return_value
+            
+            assert storage.actions_db[-1] is row.to_pydantic.return_value
+            assert storage.threats_db[-2] is row.to_pydantic.return_value
+            
+            scalars.return_value.first.return_value = None
+            with pytest.raises(IndexError):
+                storage.actions_db[-5]
+        
+        last_action, second_last_threat, _ = (call.args[0] for call in scalars.call_args_list)
+        assert "ORDER BY remediation_actions.executed_at DESC NULLS FIRST, remediation_actions.id DESC" in str(last_action)
+        assert last_action.compile().params == {"param_1": 1, "param_2": 0}
+        assert "ORDER BY threat_events.detected_at DESC" in str(second_last_threat)
+        assert second_last_threat.compile().params == {"param_1": 1, "param_2": 1}
+    
+    def test_action_accessors_share_query_order(self):
+        """Test indexing and streaming actions use the same ORDER BY as query_actions"""
+        with patch.object(storage, "USE_DATABASE", True), \
+             patch.object(storage, "SessionLocal") as mock_factory:
+            session = mock_factory.return_value
+            storage.actions_db[0]
+            list(storage.actions_db)
+            storage.query_actions(limit=1)
+        
+        order_by = "ORDER BY remediation_actions.executed_at ASC NULLS LAST, remediation_actions.id ASC"
+        assert order_by in str(session.scalars.call_args_list[0].args[0])
+        assert order_by in str(session.scalars.call_args_list[1].args[0])
+        assert order_by in str(session.execute.call_args.args[0])
+
+
+@pytest.mark.unit
+class TestThreatsCache:
+    """Test caching of database threat reads"""
+    
+    def test_repeated_reads_hit_database_once(self):
+        """Test reads within the TTL reuse one query and a write invalidates them"""
+        storage.invalidate_threats_cache()
+        with patch.object(storage, "USE_DATABASE", True), \
+             patch.object(storage, "SessionLocal") as mock_factory:
+            session = mock_factory.return_value
+            session.query.return_value.all.return_value = []
+            
+            storage.get_threats_db()
+            storage.get_threats_db()
+            assert session.query.call_count == 1
+            
+            storage.add_threat(ThreatEvent())
+            storage.get_threats_db()
+            assert session.query.call_count == 2
+        
+        storage.invalidate_threats_cache()